@@ -1,8 +1,25 @@
 import datetime
+import os
 from dateutil.relativedelta import relativedelta
 import pandas as pd
-from collections import defaultdict
 import streamlit as st # Import Streamlit
+import strategy_guide
+from portfolio_core.analytics import SeriesAnalytics
+from portfolio_core.backtest import (SCHEDULES, current_weights, parameter_grid, prepare, run_paths, summarize,
+                                     target_weights)
+from portfolio_core.cache import AnalysisCache, LRUCache, content_hash, provider_key
+from portfolio_core.fx import convert_matrix, make_fx
+from portfolio_core.holdings import Holdings
+from portfolio_core.indicators import INDICATOR_COLUMNS, latest_indicators
+from portfolio_core.instrumentation import Instrumentation, Profiler
+from portfolio_core.ledger import import_ledger
+from portfolio_core.periods import PERFORMANCE_PERIODS, PERIOD_12M, months_before
+from portfolio_core.projection import PROJECTION_YEARS, estimate_parameters, project
+from portfolio_core.providers import make_provider
+from portfolio_core.recommendations import recommend_all, recommend_portfolio
+from portfolio_core.risk import RISKMETRICS_DECAY, RiskModel
+from portfolio_core.sample_data import DEFAULT_PORTFOLIO
+from portfolio_core.shared_cache import SharedCacheProvider, series_cache
 
 # --- Streamlit App Layout ---
 st.set_page_config(layout="wide")
@@ -16,37 +33,34 @@ st.header("Configure Your Portfolio & Analysis")
 st.markdown("### Your Portfolio Holdings (Edit shares as needed)")
 st.info("💡 Edit the 'Shares' column directly in the table below. The current price is for reference; historical prices will be *mocked* unless you integrate a real API.")
 
-# Default portfolio data with a placeholder for shares
-default_portfolio_data = [
-    {"symbol": "CLOV", "stock": "CLOVER HEALTH INVESTMENTS CORP.", "current_price": 2.75, "shares": 100},
-    {"symbol": "PFFA", "stock": "VIRTUS INFRACAP US PFD ETF", "current_price": 20.83, "shares": 50},
-    {"symbol": "ABNB", "stock": "AIRBNB", "current_price": 133.97, "shares": 10},
-    {"symbol": "BABA", "stock": "ALIBABA GROUP", "current_price": 114.05, "shares": 15},
-    {"symbol": "FOUR", "stock": "SHIFT4 PAYMENTS", "current_price": 98.73, "shares": 12},
-    {"symbol": "CTXR", "stock": "CITIUS PHARMACEUTICALS INC.", "current_price": 1.67, "shares": 500},
-    {"symbol": "BIDU", "stock": "BAIDU INC.", "current_price": 85.73, "shares": 20},
-    {"symbol": "LGO", "stock": "LARGO RESOURCS LTD.", "current_price": 1.22, "shares": 800},
-    {"symbol": "EEMA", "stock": "MSCI EMERGING MARKETS ASIA ISHARES", "current_price": 82.74, "shares": 10},
-    {"symbol": "RTX", "stock": "RTX CORP", "current_price": 144.47, "shares": 8},
-    {"symbol": "JD", "stock": "JD COM INC", "current_price": 33.16, "shares": 30},
-    {"symbol": "NOK", "stock": "NOKIA CORP", "current_price": 5.17, "shares": 200},
-    {"symbol": "AMD", "stock": "ADVANCED MICRO DEVICES INC", "current_price": 143.94, "shares": 10},
-    {"symbol": "NXPI", "stock": "NXP SEMICONDUCTORS NV", "current_price": 218.06, "shares": 7},
-    {"symbol": "MOH", "stock": "MOLINA HELTHCARE INC", "current_price": 296.19, "shares": 5},
-    {"symbol": "NVDA", "stock": "NVIDIA CORPORATION", "current_price": 157.49, "shares": 9},
-    {"symbol": "PLD", "stock": "PROLOGIS INC", "current_price": 106.37, "shares": 11},
-    {"symbol": "QCOM", "stock": "QUALCOMM INC", "current_price": 158.94, "shares": 8},
-    {"symbol": "KXIN", "stock": "KAIXIN AUTO HOLDINGS", "current_price": 0.92, "shares": 1000},
-    {"symbol": "KEGN", "stock": "KENGEN", "current_price": 6.84, "currency": "KES", "shares": 500},
-    {"symbol": "KPLC", "stock": "KPLC", "current_price": 11.40, "currency": "KES", "shares": 400},
-    {"symbol": "CABL", "stock": "EAST AFRICA CABLES", "current_price": 1.00, "currency": "KES", "shares": 2000},
-    {"symbol": "UCHM", "stock": "UCHUMI", "current_price": 0.3, "currency": "KES", "shares": 5000},
-    {"symbol": "UNGA", "stock": "UNGA GROUP LTD", "current_price": 20.40, "currency": "KES", "shares": 100},
-    {"symbol": "ORCH", "stock": "KENYA ORCHADS LTD", "current_price": 19.50, "currency": "KES", "shares": 100},
-]
+
+# Default "today" for the analysis (see the end date input below)
+DEFAULT_END_DATE = datetime.date(2025, 6, 27)
+
+# Optional broker ledger: streamed in chunks into FIFO lots (see
+# portfolio_core.ledger); its open positions replace the default holdings.
+# Kept per file and end date, since the cash flows kept depend on the end date.
+ledger_file = st.file_uploader(
+    "Import a transaction ledger (optional)", type=["csv", "parquet"],
+    help="Columns: date, symbol, type (buy/sell/split/dividend), quantity, price; optional fees, amount, currency, name.",
+)
+ledger_book = None
+if ledger_file is not None:
+    ledger_key = (ledger_file.file_id, str(st.session_state.get("analysis_end_date", DEFAULT_END_DATE)))
+    if st.session_state.get("ledger_key") != ledger_key:
+        try:
+            st.session_state["ledger_book"] = import_ledger(
+                ledger_file, datetime.date.fromisoformat(ledger_key[1]),
+                fmt="parquet" if ledger_file.name.endswith(".parquet") else "csv",
+            )
+        except ValueError as e:
+            st.session_state["ledger_book"] = None
+            st.error(f"Could not import the ledger: {e}")
+        st.session_state["ledger_key"] = ledger_key
+    ledger_book = st.session_state["ledger_book"]
 
 # Convert to DataFrame for editing
-portfolio_df = pd.DataFrame(default_portfolio_data)
+portfolio_df = ledger_book.holdings_frame() if ledger_book is not None else pd.DataFrame(DEFAULT_PORTFOLIO)
 
 # Editable dataframe in Streamlit
 edited_portfolio_df = st.data_editor(
@@ -56,23 +70,26 @@ edited_portfolio_df = st.data_editor(
     column_config={
         "symbol": st.column_config.TextColumn("Stock Symbol", help="Enter stock ticker symbol (e.g., NVDA)"),
         "stock": st.column_config.TextColumn("Company Name"),
-        "current_price": st.column_config.NumberColumn("Price in $", format="$%.2f"),
+        "current_price": st.column_config.NumberColumn("Current Price", format="%.2f", help="In the holding's currency"),
         "shares": st.column_config.NumberColumn("Shares", min_value=0, step=1, help="Number of shares you hold for this stock"),
         "currency": st.column_config.TextColumn("Currency")
     },
     key="portfolio_editor"
 )
 
-# Convert edited DataFrame back to list of dicts for processing
-user_portfolio = edited_portfolio_df.to_dict(orient='records')
+# Column store with a symbol index; duplicate symbols are merged by adding shares
+holdings = Holdings.from_frame(edited_portfolio_df, on_duplicate="sum")
+if holdings.duplicates:
+    st.warning(f"Duplicate symbols merged (shares added together): {', '.join(sorted(set(holdings.duplicates)))}")
 
 # Analysis End Date
 analysis_end_date = st.date_input(
     "Select Analysis End Date",
-    value=datetime.date(2025, 6, 27), # Default to fixed date as per previous context
+    value=DEFAULT_END_DATE, # Default to fixed date as per previous context
     min_value=datetime.date(2000, 1, 1),
     max_value=datetime.date.today() + relativedelta(months=12), # Allow slightly future for testing
-    help="This date will be used as the 'today' for performance calculations."
+    help="This date will be used as the 'today' for performance calculations.",
+    key="analysis_end_date",
 )
 
 # API Key Input (Placeholder)
@@ -83,299 +100,424 @@ api_key = st.text_input("Enter your API Key (e.g., for Alpha Vantage)", type="pa
 
 # --- Define Performance Periods ---
 # We'll use the selected analysis_end_date as 'today' for calculations
-performance_periods = {
-    "Last 3 Months (Q4)": lambda end_date: end_date - relativedelta(months=3),
-    "Last 6 Months (Q3-Q4)": lambda end_date: end_date - relativedelta(months=6),
-    "Last 9 Months (Q2-Q4)": lambda end_date: end_date - relativedelta(months=9),
-    "Last 12 Months (Q1-Q4)": lambda end_date: end_date - relativedelta(months=12),
-    "Last 18 Months": lambda end_date: end_date - relativedelta(months=18),
-    "Last 24 Months": lambda end_date: end_date - relativedelta(months=24),
-    "Last 36 Months": lambda end_date: end_date - relativedelta(months=36),
-}
-
-# --- Function to fetch historical data (MOCK/PLACEHOLDER) ---
-def get_historical_data(symbol, start_date, end_date, api_key=None):
-    """
-    *** IMPORTANT: This function is a MOCK and does NOT fetch real data. ***
-    You need to replace this with actual API calls to a financial data provider.
-
-    If api_key is provided, you would use it here.
-    Example (using hypothetical yfinance integration if you uncomment and install yfinance):
-    # import yfinance as yf
-    # try:
-    #     ticker = yf.Ticker(symbol)
-    #     hist = ticker.history(start=start_date.strftime('%Y-%m-%d'), end=end_date.strftime('%Y-%m-%d'))
-    #     if not hist.empty:
-    #         # Get the closing price on the start_date (or closest available)
-    #         # and the closing price on the end_date (or closest available)
-    #         # This requires careful indexing, e.g., hist['Close'].iloc[0] and hist['Close'].iloc[-1]
-    #         # Or look up specific dates.
-    #         # For simplicity, let's assume we take the first and last available dates in the range.
-    #         start_price = hist['Close'].iloc[0]
-    #         end_price = hist['Close'].iloc[-1]
-    #         return {"start_price": start_price, "end_price": end_price}
-    # except Exception as e:
-    #     st.error(f"Error fetching data for {symbol} using yfinance: {e}")
-    #     return None
-    """
-    # MOCK DATA: Simulate different prices for different periods
-    # Get current price from the user_portfolio based on the symbol
-    current_stock_info = next((s for s in user_portfolio if s["symbol"] == symbol), None)
-    if not current_stock_info:
-        return None # Should not happen if data is well-formed
-
-    current_p = current_stock_info["current_price"]
-
-    if symbol == "NVDA":
-        if start_date <= datetime.date(2022, 6, 27): # 36 months ago
-            return {"start_price": 50.0, "end_price": current_p}
-        elif start_date <= datetime.date(2023, 6, 27): # 24 months ago
-            return {"start_price": 80.0, "end_price": current_p}
-        elif start_date <= datetime.date(2024, 6, 27): # 12 months ago
-            return {"start_price": 120.0, "end_price": current_p}
-        elif start_date <= datetime.date(2025, 3, 27): # 3 months ago (Q4)
-            return {"start_price": 140.0, "end_price": current_p}
-        else: # Default for shorter periods if not specified
-            return {"start_price": 0.98 * current_p, "end_price": current_p} # Simulate slight gain
-    elif symbol == "BABA":
-        if start_date <= datetime.date(2022, 6, 27):
-            return {"start_price": 90.0, "end_price": current_p}
-        elif start_date <= datetime.date(2023, 6, 27):
-            return {"start_price": 100.0, "end_price": current_p}
-        elif start_date <= datetime.date(2024, 6, 27):
-            return {"start_price": 110.0, "end_price": current_p}
-        else:
-            return {"start_price": 0.99 * current_p, "end_price": current_p} # Simulate slight gain
-    elif current_stock_info.get("currency") == "KES": # Kenyan Stocks
-        if start_date <= datetime.date(2022, 6, 27):
-            return {"start_price": current_p * 0.8, "end_price": current_p}
-        else:
-            return {"start_price": current_p * 0.95, "end_price": current_p}
-    else: # Generic mock for other stocks
-        if start_date <= datetime.date(2022, 6, 27):
-            return {"start_price": 0.7 * current_p, "end_price": current_p}
-        elif start_date <= datetime.date(2023, 6, 27):
-            return {"start_price": 0.85 * current_p, "end_price": current_p}
-        elif start_date <= datetime.date(2024, 6, 27):
-            return {"start_price": 0.95 * current_p, "end_price": current_p}
-        else:
-            return {"start_price": 0.98 * current_p, "end_price": current_p}
+performance_periods = PERFORMANCE_PERIODS
 
+# --- Price Provider ---
+# A local store of daily price series (one file per symbol) is used when the
+# directory exists; an API key selects the network provider, whose prices are
+# kept in an incremental on-disk cache so only new bars are fetched; otherwise
+# mock data.
+PRICE_STORE_DIR = os.environ.get("PORTFOLIO_PRICE_STORE", "price_store")
+PRICE_CACHE_DIR = os.environ.get("PORTFOLIO_PRICE_CACHE", "price_cache")
 
-# --- Generate Recommendations ---
-def get_recommendation(performance_data):
-    recommendations = []
-    perf_12m = None
-    if "Last 12 Months (Q1-Q4)" in performance_data and "N/A" not in performance_data["Last 12 Months (Q1-Q4)"]:
-        try:
-            perf_12m = float(performance_data["Last 12 Months (Q1-Q4)"].replace('%', ''))
-            if perf_12m > 20:
-                recommendations.append("Strong performer over 12 months. Consider holding or further research.")
-            elif perf_12m > 0:
-                recommendations.append("Positive performance over 12 months. Monitor closely.")
-            else:
-                recommendations.append("Negative performance over 12 months. Review fundamentals and market conditions.")
-        except ValueError:
-            pass
+# One price-series cache per server process, shared read-only by every
+# session: the same symbols are fetched once, not once per analyst, and
+# concurrent misses wait for a single fetch (see portfolio_core.shared_cache).
+SHARED_CACHE_TTL = float(os.environ.get("PORTFOLIO_SHARED_CACHE_TTL", 15 * 60))
+SHARED_CACHE_MB = float(os.environ.get("PORTFOLIO_SHARED_CACHE_MB", 256))
 
-    if "Last 3 Months (Q4)" in performance_data and "N/A" not in performance_data["Last 3 Months (Q4)"]:
-        try:
-            perf_3m = float(performance_data["Last 3 Months (Q4)"].replace('%', ''))
-            if perf_3m < -10:
-                recommendations.append("Recent significant decline. Investigate reasons for the drop.")
-            elif perf_3m > 10 and perf_12m is not None and perf_12m < 0: # Recently recovered but bad long term
-                 recommendations.append("Recent strong recovery; long-term performance is still negative. Evaluate for potential turnaround or continued volatility.")
-        except ValueError:
-            pass
-            
-    if not recommendations:
-        recommendations.append("Performance data inconclusive for specific recommendations. Conduct deeper analysis.")
-
-    return " ".join(recommendations)
 
-# --- Analysis Button ---
-if st.button("Run Analysis", type="primary"):
-    st.markdown("---")
-    st.write(f"Running analysis for: **{analysis_end_date.strftime('%Y-%m-%d')}**")
-
-    # --- Analyze Stock Performance ---
-    individual_stock_performance = []
-
-    # Using Streamlit spinner to show loading
-    with st.spinner("Calculating individual stock performance... (Using mock data)"):
-        for stock_info in user_portfolio:
-            symbol = stock_info["symbol"]
-            stock_name = stock_info["stock"]
-            current_price = stock_info["current_price"]
-            currency = stock_info.get("currency", "$")
-            shares = stock_info.get("shares", 0) # Get shares from user input
-
-            if shares == 0:
-                continue # Skip stocks with 0 shares
-
-            stock_results = {
-                "symbol": symbol,
-                "stock_name": stock_name,
-                "current_price": f"{current_price} {currency}",
-                "shares": shares, # Include shares in results
-                "performance": {},
-                "initial_value": {} # To store initial value for weighted avg
-            }
-
-            for period_name, get_start_date_func in performance_periods.items():
-                start_date = get_start_date_func(analysis_end_date) # Pass end_date to lambda
-                if start_date > analysis_end_date:
-                    start_date = analysis_end_date
-
-                historical_data = get_historical_data(symbol, start_date, analysis_end_date, api_key)
-
-                if historical_data and "start_price" in historical_data and "end_price" in historical_data:
-                    start_price_val = historical_data["start_price"]
-                    end_price_val = historical_data["end_price"]
-
-                    if start_price_val is not None and start_price_val > 0:
-                        percentage_change = ((end_price_val - start_price_val) / start_price_val) * 100
-                        stock_results["performance"][period_name] = f"{percentage_change:.2f}%"
-                        # Store initial value based on shares for weighted average calculation
-                        stock_results["initial_value"][period_name] = start_price_val * shares
-                    else:
-                        stock_results["performance"][period_name] = "N/A (Start price 0 or None)"
-                        stock_results["initial_value"][period_name] = 0
-                else:
-                    stock_results["performance"][period_name] = "N/A (Data not found)"
-                    stock_results["initial_value"][period_name] = 0
-
-            individual_stock_performance.append(stock_results)
-
-    st.header("Individual Stock Performance")
-
-    # Prepare data for a clean DataFrame display
-    display_data = []
-    for stock in individual_stock_performance:
-        row = {
-            "Symbol": stock["symbol"],
-            "Stock Name": stock["stock_name"],
-            "Current Price": stock["current_price"],
-            "Shares Held": stock["shares"]
-        }
-        for period, perf in stock["performance"].items():
-            row[period] = perf
-        row["Recommendation"] = get_recommendation(stock["performance"])
-        display_data.append(row)
-
-    df_individual = pd.DataFrame(display_data)
-    st.dataframe(df_individual, use_container_width=True)
-
-    # --- Visualization ---
-    st.header("Visualizing Performance")
-    # Filter out N/A values for charting
-    chart_data = []
-    for stock in individual_stock_performance:
-        if "Last 12 Months (Q1-Q4)" in stock["performance"] and "N/A" not in stock["performance"]["Last 12 Months (Q1-Q4)"]:
-            try:
-                chart_data.append({
-                    "Stock": stock["stock_name"],
-                    "Performance (%)": float(stock["performance"]["Last 12 Months (Q1-Q4)"].replace('%', ''))
-                })
-            except ValueError:
-                pass # Skip if value cannot be converted
-
-    if chart_data:
-        df_chart = pd.DataFrame(chart_data)
-        df_chart = df_chart.sort_values(by="Performance (%)", ascending=False)
-        st.subheader("Individual Stock Performance (Last 12 Months)")
-        st.bar_chart(df_chart.set_index("Stock"))
-    else:
-        st.info("No valid 12-month performance data to display a chart.")
-
-
-    st.markdown("---")
-
-    # --- Calculate Weighted Average Portfolio Performance ---
-    portfolio_weighted_performance = defaultdict(lambda: {"total_initial_value": 0.0, "total_final_value": 0.0})
-
-    with st.spinner("Calculating weighted average portfolio performance..."):
-        for stock_data in individual_stock_performance:
-            shares = stock_data["shares"]
-            current_price = float(stock_data["current_price"].split(" ")[0]) # Extract numerical part
-            
-            for period, perf_str in stock_data["performance"].items():
-                if "N/A" not in perf_str:
-                    try:
-                        # Extract start price from initial_value for the current stock and period
-                        initial_price_for_period = stock_data["initial_value"].get(period, 0) / shares if shares > 0 else 0
-                        
-                        if initial_price_for_period > 0:
-                            portfolio_weighted_performance[period]["total_initial_value"] += initial_price_for_period * shares
-                            portfolio_weighted_performance[period]["total_final_value"] += current_price * shares
-                        # If start_price was 0 or None, it means no valid data for this stock for this period,
-                        # so we don't include it in the sum for this period.
-                    except (ValueError, TypeError):
-                        pass
-
-        final_portfolio_performance_weighted = {}
-        for period, values in portfolio_weighted_performance.items():
-            if values["total_initial_value"] > 0:
-                weighted_change = ((values["total_final_value"] - values["total_initial_value"]) / values["total_initial_value"]) * 100
-                final_portfolio_performance_weighted[period] = f"{weighted_change:.2f}%"
-            else:
-                final_portfolio_performance_weighted[period] = "N/A (No valid data for weighted avg)"
+@st.cache_resource
+def shared_price_cache():
+    return series_cache(ttl=SHARED_CACHE_TTL, max_bytes=int(SHARED_CACHE_MB * (1 << 20)))
 
-    st.header("Weighted Average Portfolio Performance")
-    st.info("This calculation uses the number of shares you provided, reflecting your actual portfolio weighting.")
 
-    portfolio_weighted_avg_df = pd.DataFrame([
-        {"Period": period, "Weighted Average Performance": avg_perf}
-        for period, avg_perf in final_portfolio_performance_weighted.items()
-    ])
-    st.dataframe(portfolio_weighted_avg_df, use_container_width=True)
+price_provider = SharedCacheProvider(
+    make_provider(api_key, PRICE_STORE_DIR, holdings, cache_dir=PRICE_CACHE_DIR), shared_price_cache()
+)
+
+# --- FX Rates ---
+# Daily rates per currency from a local file (see portfolio_core.fx); without
+# one, constant mock rates are used. Portfolio figures are reported in the
+# selected base currency.
+FX_RATES_FILE = os.environ.get("PORTFOLIO_FX_RATES", "fx_rates.csv")
+
+fx_rates = make_fx(FX_RATES_FILE)
+fx_currencies = sorted(set(fx_rates.currencies) | set(holdings.currency_labels))
+base_currency = st.selectbox(
+    "Base Currency for Portfolio Figures",
+    fx_currencies,
+    index=fx_currencies.index("USD") if "USD" in fx_currencies else 0,
+    help="Holdings in other currencies are converted at the daily FX rate of each period's start and end date.",
+)
+
+# Custom window for the risk & return analytics (next to fixed 1- and 3-year windows)
+analytics_months = st.number_input(
+    "Analytics Window (months)",
+    min_value=1, max_value=360, value=60, step=1,
+    help="E.g. 60 for the rolling 5-year view suggested in the strategy guide.",
+)
 
-    st.markdown("---")
 
-    st.header("General Portfolio Recommendations")
-    st.info("These recommendations are based on simulated data and general market principles. For personalized financial advice, consult a certified financial advisor.")
+# Display formats: values stay numeric and are only formatted on screen.
+percent_column = st.column_config.NumberColumn(format="%.2f%%")
+
+# Results cache survives Streamlit reruns; see portfolio_core.cache.
+if "analysis_cache" not in st.session_state:
+    st.session_state["analysis_cache"] = AnalysisCache(max_results=32)
+analysis_cache = st.session_state["analysis_cache"]
+if "analytics_cache" not in st.session_state:
+    st.session_state["analytics_cache"] = LRUCache(maxsize=8)
+analytics_cache = st.session_state["analytics_cache"]
+# Risk models are updated in place (new days, added/removed holdings); see portfolio_core.risk.
+if "risk_models" not in st.session_state:
+    st.session_state["risk_models"] = LRUCache(maxsize=4)
+risk_models = st.session_state["risk_models"]
+
+# --- Diagnostics Options ---
+with st.expander("🛠️ Diagnostics (optional)"):
+    diagnostics_enabled = st.checkbox("Record performance diagnostics", key="diagnostics_enabled",
+                                      help="Time each stage and provider call, with memory and cache hit/miss counts.")
+    profile_enabled = st.checkbox("Profile the analysis with cProfile", key="profile_enabled",
+                                  help="Slower; offers the profile stats for download.")
 
-    if final_portfolio_performance_weighted:
-        overall_12m_perf = final_portfolio_performance_weighted.get("Last 12 Months (Q1-Q4)", "N/A")
-        if "N/A" not in overall_12m_perf:
+# --- Analysis Button ---
+# Once run, the analysis stays on screen and follows table edits; the cache
+# makes those reruns cheap (shares edits only re-aggregate cached prices).
+if st.button("Run Analysis", type="primary"):
+    st.session_state["analysis_requested"] = True
+
+if st.session_state.get("analysis_requested"):
+    instrumentation = Instrumentation(enabled=diagnostics_enabled, track_memory=diagnostics_enabled)
+    instrumentation.instrument_provider(price_provider)
+    profiler = Profiler(enabled=profile_enabled)
+    # Stops tracing and profiling even if the analysis raises.
+    with instrumentation, profiler:
+        st.markdown("---")
+        st.write(f"Running analysis for: **{analysis_end_date.strftime('%Y-%m-%d')}**")
+
+        # --- Analyze Stock Performance ---
+        # Using Streamlit spinner to show loading
+        with st.spinner(f"Calculating individual stock performance... (Using {price_provider.name} data)"):
+            # One engine call: each symbol's history window is loaded once (only for
+            # symbols not already cached) and all holdings x periods returns are
+            # computed as array operations.
+            with instrumentation.stage("fetch + period returns"):
+                analysis = analysis_cache.analyze(holdings, price_provider, performance_periods, analysis_end_date,
+                                                  fx_rates, base_currency)
+            for symbol, error in price_provider.errors.items():
+                st.warning(f"Could not load prices for {symbol}: {error}")
+
+            # Full daily series (one days x symbols matrix) for the indicators and
+            # the risk & return analytics; kept across reruns.
+            analytics_windows = {"1 Year": 12, "3 Years": 36, f"{analytics_months} Months": int(analytics_months)}
+            history_months = max(analytics_windows.values())
+            analytics_key = content_hash(provider_key(price_provider), str(analysis_end_date), history_months,
+                                         analysis.symbols, analysis.current_prices, analysis.currencies)
+            series_analytics = analytics_cache.get(analytics_key)
+            if series_analytics is None:
+                with instrumentation.stage("daily series load"):
+                    series_analytics = SeriesAnalytics.from_provider(price_provider, analysis.symbols, analysis_end_date,
+                                                                     history_months)
+                analytics_cache.put(analytics_key, series_analytics)
+
+        st.header("Individual Stock Performance")
+
+        with instrumentation.stage("build df_individual"):
+            df_individual = analysis.performance_frame()
+        with instrumentation.stage("recommendations"):
+            df_individual["Recommendation"] = recommend_all(analysis)
+        # Technical indicators on the last day, for every holding in one pass.
+        with instrumentation.stage("technical indicators"):
+            for column, values in latest_indicators(series_analytics.closes).items():
+                df_individual[column] = values
+        st.dataframe(
+            df_individual,
+            use_container_width=True,
+            column_config={
+                **{period: percent_column for period in analysis.period_names},
+                **{column: st.column_config.NumberColumn(format="%.2f") for column in INDICATOR_COLUMNS},
+            },
+        )
+
+        # --- Visualization ---
+        st.header("Visualizing Performance")
+        # Filter out N/A values for charting
+        df_chart = pd.DataFrame({
+            "Stock": analysis.names,
+            "Performance (%)": analysis.period_returns(PERIOD_12M),
+        }).dropna()
+
+        if not df_chart.empty:
+            df_chart = df_chart.sort_values(by="Performance (%)", ascending=False)
+            st.subheader("Individual Stock Performance (Last 12 Months)")
+            with instrumentation.stage("bar chart"):
+                st.bar_chart(df_chart.set_index("Stock"))
+        else:
+            st.info("No valid 12-month performance data to display a chart.")
+
+
+        st.markdown("---")
+
+        # --- Weighted Average Portfolio Performance ---
+        # Computed by the engine from the same price matrices (NaN = no valid data).
+        st.header("Weighted Average Portfolio Performance")
+        st.info("This calculation uses the number of shares you provided, reflecting your actual portfolio weighting.")
+        st.caption(f"Holding values converted to {base_currency} "
+                   f"({'mock constant FX rates' if fx_rates.source == 'constant' else 'daily FX rates from ' + FX_RATES_FILE}).")
+        if analysis.missing_currencies:
+            st.warning(f"No FX rates to {base_currency} for {', '.join(analysis.missing_currencies)}; "
+                       "those holdings are left out of the weighted figures.")
+
+        portfolio_weighted_avg_df = analysis.weighted_frame()
+        st.dataframe(
+            portfolio_weighted_avg_df,
+            use_container_width=True,
+            column_config={"Weighted Average Performance": percent_column},
+        )
+
+        st.markdown("---")
+
+        # --- Risk & Return Analytics ---
+        # Computed from the full daily series; any window length is cheap once the
+        # series are loaded (see portfolio_core.analytics).
+        st.header("Risk & Return Analytics")
+        st.info("CAGR, annualized volatility and maximum drawdown per holding, from daily prices. Values are in each holding's own currency.")
+        with instrumentation.stage("analytics metrics"):
+            df_analytics = series_analytics.metrics_frame(
+                {name: months_before(months) for name, months in analytics_windows.items()},
+                analysis_end_date, names=analysis.names,
+            )
+        st.dataframe(
+            df_analytics,
+            use_container_width=True,
+            hide_index=True,
+            column_config={column: percent_column for column in df_analytics.columns[2:]},
+        )
+
+        st.markdown("---")
+
+        # --- Rebalancing Backtest ---
+        # Replays the holdings at target weights (the current value weights, or
+        # ones entered below) over the loaded history; every schedule/band
+        # combination is simulated in one pass (see portfolio_core.backtest).
+        st.header("Rebalancing Backtest")
+        st.info("Would annual, quarterly or drift-band rebalancing to your target weights have helped? Each row replays the history above under one rule. Values are in the base currency.")
+        backtest_cost_bps = st.number_input("Transaction cost per trade (basis points)", min_value=0.0, max_value=500.0,
+                                            value=10.0, step=5.0)
+        # Base-currency history at the current weights; also used by the risk and projection sections.
+        base_closes, _ = convert_matrix(fx_rates, series_analytics.closes, analysis.holdings.currency_codes,
+                                        analysis.holdings.currency_labels, base_currency, series_analytics.dates)
+        held_weights = current_weights(analysis.holdings, base_closes)
+        held_dates, held_closes, held_targets, held_dropped = prepare(series_analytics.dates, base_closes, held_weights,
+                                                                      analysis.symbols)
+        backtest_weights = held_weights
+        if st.radio("Rebalance to", ["Current weights", "Custom target weights"], horizontal=True,
+                    help="E.g. the allocations suggested in the strategy guide.") == "Custom target weights":
+            df_targets = st.data_editor(
+                pd.DataFrame({"Symbol": analysis.symbols, "Stock": analysis.names,
+                              "Target Weight (%)": held_weights * 100}),
+                hide_index=True,
+                disabled=["Symbol", "Stock"],
+                column_config={"Target Weight (%)": st.column_config.NumberColumn(format="%.2f", min_value=0.0,
+                                                                                  max_value=100.0)},
+            )
             try:
-                overall_12m_value = float(overall_12m_perf.replace('%', ''))
-                if overall_12m_value > 15:
-                    st.success("- Your portfolio shows strong overall growth over the past year. Consider reviewing individual components to maintain momentum.")
-                elif overall_12m_value > 0:
-                    st.info("- Your portfolio has positive overall performance. Continue monitoring and rebalancing as needed.")
+                backtest_weights = target_weights(
+                    dict(zip(analysis.symbols, df_targets["Target Weight (%)"].to_numpy(dtype="float64") / 100)),
+                    analysis.symbols,
+                )
+            except ValueError as e:
+                st.error(f"Using the current weights instead: {e} (in percent, they must add up to 100).")
+        with instrumentation.stage("backtest"):
+            if backtest_weights is held_weights:
+                backtest_dates, backtest_closes, backtest_targets, backtest_dropped = (held_dates, held_closes,
+                                                                                       held_targets, held_dropped)
+            else:
+                backtest_dates, backtest_closes, backtest_targets, backtest_dropped = prepare(
+                    series_analytics.dates, base_closes, backtest_weights, analysis.symbols,
+                )
+            backtest_params = parameter_grid(SCHEDULES, (0, 0.05, 0.10), (backtest_cost_bps,))
+            backtest_equity, backtest_stats = run_paths(backtest_dates, backtest_closes, backtest_targets, backtest_params)
+            df_backtest = summarize(backtest_dates, backtest_params, backtest_equity, backtest_stats)
+        if backtest_dropped:
+            st.warning(f"Left out of the backtest (no prices or no target weight): {', '.join(backtest_dropped)}")
+        if len(backtest_dates) > 1:
+            st.write(f"Replayed {backtest_dates[0]} to {backtest_dates[-1]}, starting from a value of 1.")
+            st.dataframe(
+                df_backtest.rename(columns={"Threshold": "Drift Band (%)"}),
+                use_container_width=True,
+                hide_index=True,
+                column_config={column: percent_column for column in
+                               ("Total Return", "CAGR", "Volatility", "Max Drawdown", "Turnover")},
+            )
+            calendar_only = [i for i, p in enumerate(backtest_params) if not p.threshold]
+            st.line_chart(pd.DataFrame(backtest_equity[:, calendar_only],
+                                       index=pd.to_datetime(backtest_dates),
+                                       columns=[backtest_params[i].schedule for i in calendar_only]))
+        else:
+            st.info("Not enough overlapping price history to run a backtest.")
+
+        st.markdown("---")
+
+        # --- Portfolio Risk ---
+        # Covariance of daily base-currency returns over the same history; the
+        # session's model is synced incrementally rather than rebuilt per run.
+        st.header("Portfolio Risk")
+        st.info("Volatility, correlation and value at risk of the portfolio at your current weights, from daily returns in the base currency. Risk contribution is each holding's share of the portfolio volatility.")
+        risk_estimator = st.selectbox("Covariance estimator", ["EWMA (RiskMetrics, λ = 0.94)", "Sample (equal weights)"],
+                                      help="EWMA reacts faster to recent market moves.")
+        risk_decay = RISKMETRICS_DECAY if risk_estimator.startswith("EWMA") else 1.0
+        risk_symbols = [s for s in analysis.symbols if s not in held_dropped]
+        if len(held_dates) > 2 and risk_symbols:
+            with instrumentation.stage("risk model"):
+                risk_key = content_hash("risk", provider_key(price_provider), base_currency, risk_decay)
+                risk_model = risk_models.get(risk_key)
+                if risk_model is None:
+                    risk_model = RiskModel.from_prices(held_dates, held_closes, risk_symbols, risk_decay)
+                    risk_models.put(risk_key, risk_model)
+                    instrumentation.count("risk model (incremental syncs)", misses=1)
                 else:
-                    st.warning("- Your portfolio has experienced a decline over the past year. This may indicate a need to re-evaluate investment strategies, diversify further, or research underperforming assets.")
-            except ValueError:
-                st.error("- Cannot provide a specific overall recommendation due to data issues.")
+                    incremental = risk_model.sync(held_dates, held_closes, risk_symbols)
+                    instrumentation.count("risk model (incremental syncs)", hits=int(incremental), misses=int(not incremental))
+                risk_summary = risk_model.summary(held_targets)
+                names_by_symbol = dict(zip(analysis.symbols, analysis.names))
+                df_risk = risk_model.risk_frame(held_targets, names=[names_by_symbol[s] for s in risk_symbols])
+            st.write(f"Annualized volatility: **{risk_summary['volatility']:.2f}%**. "
+                     f"1-day VaR 95%: **{risk_summary['var_95%'][0]:.2f}%** (historical {risk_summary['var_95%'][1]:.2f}%), "
+                     f"99%: **{risk_summary['var_99%'][0]:.2f}%** (historical {risk_summary['var_99%'][1]:.2f}%). "
+                     f"Effective number of holdings: {risk_summary['effective_holdings']:.1f} of {len(risk_symbols)}.")
+            st.dataframe(
+                df_risk,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    **{column: percent_column for column in ("Weight", "Volatility", "Marginal Risk", "Risk Contribution")},
+                    "Beta to Portfolio": st.column_config.NumberColumn(format="%.2f"),
+                },
+            )
+            with st.expander("Correlation matrix"):
+                st.dataframe(pd.DataFrame(risk_model.correlation, index=risk_symbols, columns=risk_symbols).round(2),
+                             use_container_width=True)
         else:
-            st.warning("- Not enough valid data to provide a comprehensive overall portfolio recommendation.")
-
-    st.markdown("---")
-
-    # --- Download Buttons ---
-    st.subheader("Download Results")
-
-    # Convert DataFrames to CSV
-    @st.cache_data
-    def convert_df_to_csv(df):
-        return df.to_csv(index=False).encode('utf-8')
-
-    csv_individual = convert_df_to_csv(df_individual)
-    st.download_button(
-        label="Download Individual Stock Performance CSV",
-        data=csv_individual,
-        file_name="individual_stock_performance.csv",
-        mime="text/csv",
-    )
-
-    csv_portfolio_avg = convert_df_to_csv(portfolio_weighted_avg_df)
-    st.download_button(
-        label="Download Weighted Portfolio Performance CSV",
-        data=csv_portfolio_avg,
-        file_name="weighted_portfolio_performance.csv",
-        mime="text/csv",
-    )
+            st.info("Not enough overlapping price history to estimate risk.")
+
+        st.markdown("---")
+
+        # --- 30-Year Monte Carlo Projection ---
+        # Monthly return model estimated from the same base-currency history as the
+        # backtest; paths are simulated in seeded blocks (see
+        # portfolio_core.projection) and the result is kept across reruns.
+        st.header(f"{PROJECTION_YEARS}-Year Monte Carlo Projection")
+        st.info("Simulated growth of today's portfolio value at your current weights, with monthly returns drawn from the mean and covariance of the history above. A projection, not a forecast: mock prices give unrealistically smooth results.")
+        projection_columns = st.columns(3)
+        projection_paths = projection_columns[0].number_input("Simulated paths", min_value=1_000, max_value=100_000,
+                                                              value=10_000, step=1_000)
+        projection_seed = projection_columns[1].number_input("Random seed", min_value=0, value=42, step=1,
+                                                             help="The same seed reproduces the same paths.")
+        projection_rebalance = projection_columns[2].checkbox("Rebalance monthly", value=True,
+                                                              help="Otherwise buy and hold: weights drift with prices.")
+        try:
+            projection_model = estimate_parameters(held_dates, held_closes)
+        except ValueError as e:
+            projection_model = None
+            st.info(f"No projection: {e}.")
+        if projection_model is not None:
+            projection_key = content_hash("projection", *projection_model[:2], held_targets, int(projection_paths),
+                                          int(projection_seed), projection_rebalance)
+            projection = analytics_cache.get(projection_key)
+            if projection is None:
+                with instrumentation.stage("monte carlo projection"):
+                    projection = project(*projection_model[:2], held_targets, paths=int(projection_paths),
+                                         seed=int(projection_seed), rebalance=projection_rebalance,
+                                         months_observed=projection_model[2])
+                analytics_cache.put(projection_key, projection)
+            projection_summary = projection.summary()
+            st.write(f"{projection_summary['paths']:,} paths from {projection.months_observed} months of returns. "
+                     f"Median CAGR: {projection_summary['median_cagr']:.2f}%. Chance of ending below today's value: "
+                     + ", ".join(f"{p:.1f}% after {y} years" for y, p in projection_summary["loss_probability"].items())
+                     + ".")
+            st.line_chart(projection.bands_frame().set_index("Year"))
+            st.markdown("**Probability of a drawdown from the running peak** (percent of paths)")
+            df_drawdowns = projection.drawdown_frame()
+            st.dataframe(df_drawdowns, use_container_width=True, hide_index=True,
+                         column_config={column: percent_column for column in df_drawdowns.columns[1:]})
+
+        st.markdown("---")
+
+        # --- Ledger: Cost Basis & Money-Weighted Returns ---
+        # Only with an imported ledger: FIFO cost basis per symbol, and returns
+        # that account for when shares were actually bought and sold.
+        if ledger_book is not None:
+            st.header("Cost Basis & Money-Weighted Returns")
+            st.info("From the imported ledger. Money-weighted returns are internal rates of return over each period, counting buys, sales and dividends on the day they happened (not annualized; for positions opened or closed within a period, over the time they were held); values are in each holding's currency, the portfolio row in the base currency.")
+            with instrumentation.stage("ledger returns"):
+                ledger_symbols = list(ledger_book.positions)
+                ledger_prices = price_provider.load_window(ledger_symbols, analysis_end_date)
+                df_mwr, portfolio_mwr = ledger_book.money_weighted_returns(ledger_prices, performance_periods,
+                                                                           analysis_end_date, fx_rates, base_currency)
+                df_mwr.loc[len(df_mwr)] = [f"Portfolio ({base_currency})", *portfolio_mwr.values()]
+            if ledger_book.missing_currencies:
+                st.warning(f"No FX rates to {base_currency} for {', '.join(ledger_book.missing_currencies)}; "
+                           "those positions are left out of the portfolio row.")
+            st.write(f"{ledger_book.rows} ledger rows, {len(ledger_book.open_positions())} open positions.")
+            st.dataframe(ledger_book.cost_basis_frame(), use_container_width=True, hide_index=True,
+                         column_config={column: st.column_config.NumberColumn(format="%.2f") for column in
+                                        ("Cost Basis", "Average Cost", "Realized Gain", "Dividends", "Fees")})
+            st.dataframe(df_mwr, use_container_width=True, hide_index=True,
+                         column_config={period: percent_column for period in performance_periods})
+            st.markdown("---")
+
+        st.header("General Portfolio Recommendations")
+        st.info("These recommendations are based on simulated data and general market principles. For personalized financial advice, consult a certified financial advisor.")
+
+        # --- Generate Recommendations ---
+        level, advice = recommend_portfolio(analysis)
+        getattr(st, level)(advice)
+
+        st.markdown("---")
+
+        # --- Download Buttons ---
+        st.subheader("Download Results")
+
+        # Convert DataFrames to CSV
+        @st.cache_data
+        def convert_df_to_csv(df):
+            return df.to_csv(index=False).encode('utf-8')
+
+        with instrumentation.stage("csv encode"):
+            csv_individual = convert_df_to_csv(df_individual)
+        st.download_button(
+            label="Download Individual Stock Performance CSV",
+            data=csv_individual,
+            file_name="individual_stock_performance.csv",
+            mime="text/csv",
+        )
+
+        with instrumentation.stage("csv encode"):
+            csv_portfolio_avg = convert_df_to_csv(portfolio_weighted_avg_df)
+        st.download_button(
+            label="Download Weighted Portfolio Performance CSV",
+            data=csv_portfolio_avg,
+            file_name="weighted_portfolio_performance.csv",
+            mime="text/csv",
+        )
+
+    # --- Diagnostics Panel ---
+    if diagnostics_enabled or profile_enabled:
+        with st.expander("🛠️ Performance diagnostics", expanded=True):
+            if diagnostics_enabled:
+                instrumentation.record_cache("analysis results", analysis_cache.results)
+                instrumentation.record_cache("per-symbol price rows", analysis_cache.rows)
+                instrumentation.record_cache("shared price series (all sessions)", price_provider.cache)
+                st.markdown("**Stages and provider calls** (wall time in seconds)")
+                st.dataframe(pd.DataFrame(instrumentation.rows()), use_container_width=True, hide_index=True)
+                st.markdown("**Caches** (session totals)")
+                st.dataframe(pd.DataFrame.from_dict(instrumentation.caches, orient="index"), use_container_width=True)
+                st.download_button(
+                    label="Download diagnostics JSON",
+                    data=instrumentation.to_json(),
+                    file_name="analysis_diagnostics.json",
+                    mime="application/json",
+                )
+            if profile_enabled:
+                st.code(profiler.stats_text(limit=25), language="text")
+                st.download_button(
+                    label="Download cProfile stats (.prof)",
+                    data=profiler.dump(),
+                    file_name="analysis.prof",
+                    mime="application/octet-stream",
+                )
 
 else:
     st.info("Click 'Run Analysis' to see your portfolio performance.")
@@ -384,115 +526,15 @@ else:
 # --- 🧠 30-Year Portfolio Strategy Guide ---
 st.markdown("---")
 st.header("🧠 30-Year Portfolio Strategy Guide")
-st.markdown("""
-Inspired by: Warren Buffett (value investing, compounding) and Jim Simons (quantitative, data-driven rebalancing)
-
-### 🔍 1. Core Strategic Foundations
-
-| Principle       | Warren Buffett                          | Jim Simons                                    |
-| :-------------- | :-------------------------------------- | :-------------------------------------------- |
-| **Investment Philosophy** | Buy wonderful companies at fair prices  | Exploit short-term inefficiencies via data    |
-| **Holding Period** | Decades (compound over time)            | Often short-term, but repeatable patterns     |
-| **Focus** | Value, fundamentals, moat               | Math, signals, quantitative models            |
-
-### 🏗️ 2. Recommended Structure for a Long-Term Portfolio
-
-| Component             | Suggested Allocation | Strategy                                             |
-| :-------------------- | :------------------- | :--------------------------------------------------- |
-| **U.S. Blue-Chip Stocks** | 30–40%               | Long-term compounding (NVDA, AMD, MOH, QCOM)         |
-| **Dividend-Paying Stocks**| 10–15%               | Steady income (PFFA, PLD, RTX)                       |
-| **ETFs (U.S. + Emerging)** | 20–25%               | Broad diversification (EEMA, SPY, QQQ)               |
-| **Global Growth Stocks** | 10–15%               | Alibaba, JD for exposure to Asia’s growth            |
-| **Speculative or Small Caps** | 5–10%                | CTXR, CLOV, LGO—high-risk, monitor closely           |
-| **Kenyan Stocks** | <5% (or watchlist)   | Opportunistic; small allocation unless FX risk managed |
-
-### 📈 3. Return Optimization Tactics
-
-* Rebalance annually to maintain target weights
-* Add capital during dips in high-quality names (NVDA, ABNB, MOH)
-* Avoid overtrading: Let winners run unless fundamentals deteriorate
-* Monitor key metrics: PE ratios, ROE, earnings trends
-* Use rolling 5-year performance metrics to evaluate ETF or sector shifts
-
-### ⚠️ 4. Risk Management
-
-* Limit exposure to low-liquidity stocks (e.g. Kenyan microcaps)
-* Cap speculative holdings to <10% of total portfolio
-* Keep at least 20–25% in ETFs or blue-chips for downside protection
-* Consider FX exposure if investing in emerging markets directly
-
-### 🧭 5. Signals to Buy/Sell Based on Simons/Buffett Ideas
-
-**BUY when:**
-* Price dips >20% in high-quality stock (and fundamentals are intact)
-* Strong earnings revisions or momentum (Simons-style signal)
-* Long-term competitive moat remains intact (Buffett-style)
-
-**SELL/REDUCE when:**
-* Momentum breaks down + deteriorating earnings (Simons)
-* PE ratios extremely overextended vs. sector
-* Company loses moat or faces structural disruption (Buffett-style)
-
-### 📅 6. 30-Year Mindset
-
-* Think in 10-year blocks, not quarters
-* Focus on compound annual growth rate (CAGR), not absolute returns
-* Assume cyclical downturns every 7–10 years; position accordingly
-* Build core around high-quality, repeatable business models
-""")
+st.markdown(strategy_guide.STRATEGY_GUIDE)
 
 st.markdown("---")
 
 # --- Advanced Strategy & Research Insights (Conceptual) ---
 st.header("🔬 Advanced Strategy & Research Insights (Conceptual)")
-st.info("This section outlines advanced concepts used by professional investors. Implementing these fully requires integrating real-time data, complex models, and significant expertise. It serves as a guide for deeper exploration.")
-
-with st.expander("Quantitative Signals (Requires Real Data)"):
-    st.markdown("""
-    Quantitative strategies rely on mathematical and statistical models to identify trading opportunities.
-    These typically require vast amounts of historical data (price, volume, fundamental, alternative data).
-
-    **Common Indicators (Conceptual - not calculated here):**
-    * **Relative Strength Index (RSI):** Measures the speed and change of price movements to identify overbought or oversold conditions.
-    * **Moving Average Convergence Divergence (MACD):** Reveals changes in the strength, direction, momentum, and duration of a trend.
-    * **Bollinger Bands:** Measures market volatility and identify overbought or oversold levels.
-    * **Volume Analysis:** Identifying patterns in trading volume that correlate with price movements.
-    * **Factor Investing:** Screening stocks based on factors like Value (low P/E), Growth (high earnings growth), Quality (high ROE), Momentum (recent price trends), and Low Volatility.
-    * **Machine Learning Models:** Predicting future price movements, volatility, or sentiment using supervised or unsupervised learning.
-    """)
-    st.warning("To implement these, you would need to: 1) Fetch full historical daily data for each stock, 2) Calculate these indicators using libraries like `TA-Lib` or `pandas-ta`, and 3) Develop a backtesting framework.")
-
-with st.expander("Fundamental Analysis Factors"):
-    st.markdown("""
-    Fundamental analysis involves evaluating a company's financial health and intrinsic value.
-
-    **Key Metrics to Monitor:**
-    * **P/E Ratio (Price-to-Earnings):** Valuation metric comparing current share price to per-share earnings.
-    * **PEG Ratio (Price/Earnings to Growth):** Relates P/E to expected earnings growth.
-    * **ROE (Return on Equity):** Measures profitability in relation to shareholder equity.
-    * **Debt-to-Equity Ratio:** Indicates a company's leverage.
-    * **Revenue and Earnings Growth:** Tracking the rate at which a company's sales and profits are increasing.
-    * **Free Cash Flow:** Cash generated after accounting for capital expenditures.
-    * **Competitive Moat:** Sustainable competitive advantages (e.g., brand, patents, network effects).
-    * **Management Quality:** Experience, track record, and alignment with shareholder interests.
-    """)
-    st.warning("Integrating these metrics requires financial statement data from APIs (e.g., Yahoo Finance's detailed financials, Alpha Vantage, Finnhub's fundamental data endpoints).")
-
-with st.expander("Sentiment Analysis (Conceptual)"):
-    st.markdown("""
-    Sentiment analysis attempts to gauge the market's or public's emotional tone towards a stock or sector.
-
-    **Sources of Sentiment Data:**
-    * **News Headlines & Articles:** Analyzing financial news for positive, negative, or neutral sentiment.
-    * **Social Media (e.g., X/Twitter, Reddit):** Monitoring discussions for mentions and sentiment trends.
-    * **Analyst Ratings:** Aggregating buy/sell/hold recommendations from financial analysts.
-    * **Earnings Call Transcripts:** Analyzing language for management's tone and forward-looking statements.
-    """)
-    st.warning("Implementing sentiment analysis requires access to text-based data feeds and natural language processing (NLP) capabilities.")
-
-with st.expander("Global Macro & Event-Driven Analysis"):
-    st.markdown("""
-    * **Global Macro:** Investing based on broad economic trends, interest rate changes, currency movements, and geopolitical events.
-    * **Event-Driven:** Exploiting opportunities arising from specific corporate events like mergers, acquisitions, bankruptcies, or spin-offs.
-    """)
-    st.warning("These strategies require deep understanding of economics, geopolitics, and corporate finance, often relying on expert analysis rather than purely automated signals.")
+st.info(strategy_guide.RESEARCH_INTRO)
+
+for title, body, note in strategy_guide.RESEARCH_SECTIONS:
+    with st.expander(title):
+        st.markdown(body)
+        st.warning(note)
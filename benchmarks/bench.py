@@ -0,0 +1,212 @@
+"""
+Benchmark suite for the analysis pipeline.
+
+Generates deterministic synthetic books (mixed USD/KES holdings like the app's
+defaults) with matching daily price histories and times each stage on its
+own. Results are written as JSON so runs of different versions can be
+compared::
+
+    python -m benchmarks.bench --sizes 10 1000 100000 1000000 --out bench.json
+    python -m benchmarks.bench --compare old.json new.json
+
+Stages:
+
+* ``provider_load``  - ``load_window`` for every holding
+* ``store_load``     - ``load_window`` from an on-disk ``LocalPriceStore``
+* ``period_returns`` - price matrix lookup and per-period returns
+* ``weighted_aggregation`` - the share-weighted portfolio return per period,
+  converted to USD like the app (``AnalysisResult.to_currency``)
+* ``recommendations`` - the recommendation rules for every holding
+* ``csv_export``     - building the results table and encoding it as CSV
+
+Price histories are generated for a universe of at most ``--universe``
+symbols; larger books reuse those series (as zero-copy views) so a million
+holdings fit in memory.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from portfolio_core.engine import AnalysisResult, compute_returns, lookup_prices, period_start_dates
+from portfolio_core.fx import make_fx
+from portfolio_core.holdings import Holdings
+from portfolio_core.periods import PERFORMANCE_PERIODS
+from portfolio_core.providers import HISTORY_MONTHS, LocalPriceStore, PriceProvider, PriceSeries, window_start
+from portfolio_core.recommendations import recommend_all
+
+DEFAULT_SIZES = (10, 1_000, 100_000, 1_000_000)
+END_DATE = datetime.date(2025, 6, 27)
+# Share of KES holdings in the app's default book (6 of 25).
+KES_SHARE = 0.24
+
+
+class SyntheticPriceProvider(PriceProvider):
+    """Serves symbol ``S<i>`` from column ``i % universe`` of a shared price matrix."""
+
+    name = "synthetic"
+
+    def __init__(self, dates, closes):
+        super().__init__()
+        self.dates = dates
+        # Fortran order keeps each symbol's column contiguous.
+        self.closes = np.asfortranarray(closes)
+
+    def load_series(self, symbol, start_date, end_date):
+        column = int(symbol[1:]) % self.closes.shape[1]
+        return PriceSeries(symbol, self.dates, self.closes[:, column])
+
+
+def generate_prices(universe, end_date=END_DATE, seed=0):
+    """Business-day random walks covering the longest performance period."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(window_start(end_date, HISTORY_MONTHS + 1), "D")
+    dates = np.arange(start, np.datetime64(end_date, "D") + 1)
+    dates = dates[np.is_busday(dates)]
+    drift = rng.normal(0.0003, 0.0002, universe)
+    vol = rng.uniform(0.01, 0.04, universe)
+    steps = rng.standard_normal((len(dates), universe)) * vol + drift
+    levels = rng.uniform(0.3, 300.0, universe)
+    closes = levels * np.exp(np.cumsum(steps, axis=0))
+    return dates, closes
+
+
+def generate_holdings(n, closes, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    universe = closes.shape[1]
+    symbols = [f"S{i}" for i in range(n)]
+    currencies = np.where(rng.random(n) < KES_SHARE, "KES", "USD").tolist()
+    shares = rng.integers(1, 1000, n).astype("float64")
+    prices = closes[-1, np.arange(n) % universe]
+    return Holdings(symbols, symbols, prices, shares, currencies)
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, {"best": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def run_size(n, universe, repeat, seed):
+    dates, closes = generate_prices(min(n, universe), seed=seed)
+    holdings = generate_holdings(n, closes, seed=seed)
+    provider = SyntheticPriceProvider(dates, closes)
+    periods = PERFORMANCE_PERIODS
+    stages = {}
+
+    window, stages["provider_load"] = timed(lambda: provider.load_window(holdings.symbols, END_DATE), repeat)
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = LocalPriceStore(store_dir)
+        store_symbols = [f"S{i}" for i in range(closes.shape[1])]
+        for i, symbol in enumerate(store_symbols):
+            store.write_series(PriceSeries(symbol, dates, closes[:, i]))
+        _, stages["store_load"] = timed(lambda: store.load_window(store_symbols, END_DATE), repeat)
+
+    start_dates = period_start_dates(periods, END_DATE)
+    query_dates = start_dates + [END_DATE]
+
+    def period_returns():
+        prices = lookup_prices(window, list(holdings.symbols), query_dates)
+        return prices, compute_returns(prices[:, :-1], prices[:, -1:], holdings.shares)
+
+    (prices, _), stages["period_returns"] = timed(period_returns, repeat)
+    del window # the largest structure at 1M holdings; not needed past this point
+
+    result = AnalysisResult(holdings, periods.keys(), prices[:, :-1],
+                            np.repeat(prices[:, -1:], len(periods), axis=1))
+    fx = make_fx()
+    _, stages["weighted_aggregation"] = timed(
+        lambda: result.to_currency(fx, "USD", start_dates, END_DATE), repeat
+    )
+    recommendations, stages["recommendations"] = timed(lambda: recommend_all(result), repeat)
+
+    def csv_export():
+        frame = result.performance_frame()
+        frame["Recommendation"] = recommendations
+        return frame.to_csv(index=False).encode("utf-8")
+
+    csv_bytes, stages["csv_export"] = timed(csv_export, repeat)
+    return {
+        "holdings": n,
+        "universe": int(closes.shape[1]),
+        "days": int(len(dates)),
+        "csv_bytes": len(csv_bytes),
+        "stages": stages,
+    }
+
+
+def environment():
+    import pandas as pd
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare(old_path, new_path):
+    """Print new/old ratios of the best time per stage (>1 means slower)."""
+    with open(old_path) as f:
+        old = {r["holdings"]: r["stages"] for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["holdings"]: r["stages"] for r in json.load(f)["results"]}
+    print(f"{'holdings':>10} {'stage':<22} {'old (s)':>10} {'new (s)':>10} {'ratio':>7}")
+    for n in sorted(set(old) & set(new)):
+        for stage, timing in new[n].items():
+            if stage in old[n]:
+                before, after = old[n][stage]["best"], timing["best"]
+                ratio = after / before if before else float("inf")
+                print(f"{n:>10} {stage:<22} {before:>10.4f} {after:>10.4f} {ratio:>7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio analysis stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--universe", type=int, default=2_000,
+                        help="Distinct price series to generate (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    results = []
+    for n in args.sizes:
+        print(f"benchmarking {n} holdings...", file=sys.stderr)
+        results.append(run_size(n, args.universe, args.repeat, args.seed))
+    report = {
+        "environment": environment(),
+        "config": {"universe": args.universe, "repeat": args.repeat, "seed": args.seed,
+                   "end_date": END_DATE.isoformat()},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Computation core of the Stock Portfolio Performance Analyzer (no Streamlit).
+
+Importing the package is cheap: submodules, NumPy, pandas and dateutil are
+only loaded when one of the names below is first used.
+"""
+import importlib
+
+_EXPORTS = {
+    "HISTORY_MONTHS": "providers",
+    "AlphaVantageProvider": "providers",
+    "LocalPriceStore": "providers",
+    "MockPriceProvider": "providers",
+    "NetworkPriceProvider": "providers",
+    "PriceProvider": "providers",
+    "PriceSeries": "providers",
+    "IncrementalPriceStore": "ingest",
+    "SharedCache": "shared_cache",
+    "SharedCacheProvider": "shared_cache",
+    "make_provider": "providers",
+    "AnalysisResult": "engine",
+    "analyze": "engine",
+    "run_analysis": "engine",
+    "DEFAULT_CURRENCY": "holdings",
+    "Holdings": "holdings",
+    "LedgerBook": "ledger",
+    "import_ledger": "ledger",
+    "AnalysisCache": "cache",
+    "LRUCache": "cache",
+    "content_hash": "cache",
+    "PERFORMANCE_PERIODS": "periods",
+    "get_recommendation": "recommendations",
+    "get_portfolio_recommendation": "recommendations",
+    "RuleSet": "rules",
+    "DEFAULT_PORTFOLIO": "sample_data",
+    "SeriesAnalytics": "analytics",
+    "RiskModel": "risk",
+    "Projection": "projection",
+    "project": "projection",
+    "FxRates": "fx",
+    "latest_indicators": "indicators",
+    "make_fx": "fx",
+    "Instrumentation": "instrumentation",
+    "Profiler": "instrumentation",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
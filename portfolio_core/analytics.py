@@ -0,0 +1,183 @@
+"""
+Risk and return analytics over full daily series.
+
+All holdings are put on one (days x symbols) price matrix, forward-filled
+on the union of their trading dates. Daily log returns are summed once into
+prefix (cumulative) sums of returns, squared returns and valid-day counts.
+Days a symbol did not trade (its exchange was closed) are left out of its
+sums and counts, so each symbol's volatility is over its own trading days;
+after that the return and annualized volatility of *any* window, for every
+symbol at once, is a difference of two rows, so extra windows cost almost
+nothing. Max drawdown needs the path, so it is one running-maximum pass
+over the window's rows (still vectorized across symbols).
+"""
+import numpy as np
+
+from portfolio_core.engine import lookup_prices
+
+TRADING_DAYS = 252
+DAYS_PER_YEAR = 365.25
+
+
+def price_matrix(price_window, symbols, dates=None):
+    """
+    ``(dates, closes)``: closes is a (len(dates) x len(symbols)) matrix of
+    the close on or before each date (NaN before a series starts). Without
+    ``dates`` the union of all series' dates is used.
+    """
+    if dates is None:
+        present = [s.dates for s in price_window.values() if s is not None and len(s)]
+        dates = np.unique(np.concatenate(present)) if present else np.array([], dtype="datetime64[D]")
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    closes = np.ascontiguousarray(lookup_prices(price_window, list(symbols), dates).T)
+    return dates, closes
+
+
+def traded_days(price_window, symbols, dates):
+    """(len(dates) x len(symbols)) mask of the dates each symbol's series has a close on."""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    traded = np.zeros((len(dates), len(symbols)), dtype=bool)
+    for j, symbol in enumerate(symbols):
+        series = price_window.get(symbol)
+        if series is not None and len(series):
+            idx = np.minimum(np.searchsorted(series.dates, dates), len(series) - 1)
+            traded[:, j] = series.dates[idx] == dates
+    return traded
+
+
+class SeriesAnalytics:
+    """
+    Windowed returns, volatility, CAGR and drawdown for a price matrix.
+    ``traded`` (see ``traded_days``) marks the rows that are real closes
+    rather than forward-filled ones; without it every row counts.
+    """
+
+    def __init__(self, dates, closes, symbols=None, traded=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.closes = np.asarray(closes, dtype="float64")
+        self.symbols = symbols
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_prices = np.log(np.where(self.closes > 0, self.closes, np.nan))
+        returns = np.diff(log_prices, axis=0)
+        valid = np.isfinite(returns)
+        if traded is not None:
+            # A forward-filled day is a zero return; the next traded day
+            # carries the whole move since the last close.
+            valid &= np.asarray(traded, dtype=bool)[1:]
+        returns = np.where(valid, returns, 0.0)
+        # Row t holds the sum over returns[0:t], i.e. over prices 0..t.
+        zeros = np.zeros((1, self.closes.shape[1]))
+        self._sum = np.concatenate([zeros, np.cumsum(returns, axis=0)])
+        self._sum_sq = np.concatenate([zeros, np.cumsum(returns * returns, axis=0)])
+        self._count = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+
+    @classmethod
+    def from_provider(cls, provider, symbols, end_date, months):
+        """Load ``months`` of history for ``symbols`` (each once) and build the matrix."""
+        symbols = list(symbols)
+        price_window = provider.load_window(symbols, end_date, months)
+        dates, closes = price_matrix(price_window, symbols)
+        return cls(dates, closes, symbols, traded_days(price_window, symbols, dates))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def row_at(self, date):
+        """Index of the last row on or before ``date`` (-1 if none)."""
+        return int(np.searchsorted(self.dates, np.datetime64(date, "D"), side="right")) - 1
+
+    # --- Point-to-point metrics between two rows, for every symbol ---
+
+    def _total_return(self, lo, hi):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.closes[hi] / self.closes[lo] - 1
+
+    def _volatility(self, lo, hi):
+        """Annualized standard deviation of the daily log returns in rows ``lo..hi``."""
+        n = self._count[hi] - self._count[lo]
+        s1 = self._sum[hi] - self._sum[lo]
+        s2 = self._sum_sq[hi] - self._sum_sq[lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.where(n > 1, (s2 - s1 * s1 / n) / (n - 1), np.nan)
+        return np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS)
+
+    def _years(self, lo, hi):
+        return (self.dates[hi] - self.dates[lo]).astype("float64") / DAYS_PER_YEAR
+
+    def _cagr(self, total, years):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where((years > 0) & (total > -1), np.power(1 + total, 1 / years) - 1, np.nan)
+
+    def max_drawdown(self, lo, hi):
+        """Largest peak-to-trough fall in rows ``lo..hi`` (a negative fraction)."""
+        path = self.closes[lo:hi + 1]
+        peaks = np.fmax.accumulate(path, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdowns = np.where(np.isnan(path), np.inf, path / peaks - 1)
+        worst = drawdowns.min(axis=0)
+        return np.where(np.isinf(worst), np.nan, worst)
+
+    def window_metrics(self, start_date, end_date):
+        """
+        ``{metric: array per symbol}`` for ``start_date``..``end_date``:
+        ``return``, ``cagr``, ``volatility`` (annualized) and
+        ``max_drawdown``, all as fractions. NaN where there is no data, and
+        for symbols (or the whole matrix) whose history starts after
+        ``start_date``: a window is never quietly shortened.
+        """
+        lo, hi = self.row_at(start_date), self.row_at(end_date)
+        n = self.closes.shape[1]
+        if lo < 0 or hi <= lo:
+            empty = np.full(n, np.nan)
+            return {"return": empty, "cagr": empty, "volatility": empty, "max_drawdown": empty}
+        covered = np.isfinite(self.closes[lo])
+        total = self._total_return(lo, hi)
+        return {
+            "return": total,
+            "cagr": self._cagr(total, self._years(lo, hi)),
+            "volatility": np.where(covered, self._volatility(lo, hi), np.nan),
+            "max_drawdown": np.where(covered, self.max_drawdown(lo, hi), np.nan),
+        }
+
+    # --- Rolling metrics: one value per row, for every symbol ---
+
+    def rolling_returns(self, window):
+        """Return over the trailing ``window`` rows; NaN for the first rows."""
+        out = np.full(self.closes.shape, np.nan)
+        if 0 < window < len(self):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[window:] = self.closes[window:] / self.closes[:-window] - 1
+        return out
+
+    def rolling_volatility(self, window):
+        """Annualized volatility of the trailing ``window`` daily returns."""
+        out = np.full(self.closes.shape, np.nan)
+        if 1 < window < len(self):
+            out[window:] = self._volatility(slice(None, -window), slice(window, None))
+        return out
+
+    def rolling_cagr(self, window):
+        """Trailing ``window``-row return, annualized by calendar time."""
+        out = np.full(self.closes.shape, np.nan)
+        if 0 < window < len(self):
+            years = self._years(slice(None, -window), slice(window, None))[:, None]
+            out[window:] = self._cagr(self.rolling_returns(window)[window:], years)
+        return out
+
+    def metrics_frame(self, periods, end_date, names=None):
+        """
+        One row per symbol and one column per (period, metric), in percent.
+        ``periods`` maps a name to a start-date function, like
+        ``PERFORMANCE_PERIODS``.
+        """
+        import pandas as pd
+        columns = {"Symbol": self.symbols}
+        if names is not None:
+            columns["Stock Name"] = names
+        for period, get_start_date in periods.items():
+            metrics = self.window_metrics(get_start_date(end_date), end_date)
+            columns[f"{period} Return"] = metrics["return"] * 100
+            columns[f"{period} CAGR"] = metrics["cagr"] * 100
+            columns[f"{period} Volatility"] = metrics["volatility"] * 100
+            columns[f"{period} Max Drawdown"] = metrics["max_drawdown"] * 100
+        return pd.DataFrame(columns)
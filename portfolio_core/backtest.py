@@ -0,0 +1,282 @@
+"""
+Rebalancing backtester.
+
+Replays the holdings over daily history: the book starts at the target
+weights (the current value weights unless others are chosen, such as the
+strategy guide's allocations), drifts with prices, and is traded back to
+the targets on a calendar schedule (``never``, ``monthly``, ``quarterly``,
+``annual``), when any weight drifts more than a threshold from its target,
+or both. Every trade pays ``cost_bps`` of the traded value.
+
+Each parameter combination is one *path*. ``run_paths`` advances all paths
+together, one day at a time, with (paths x assets) array operations, so a
+sweep over hundreds of combinations costs little more than a single run.
+``sweep`` splits larger grids across a ``ProcessPoolExecutor``::
+
+    python -m portfolio_core.backtest portfolio.csv --prices price_store --months 120 \\
+        --thresholds 0 0.05 0.10 --costs-bps 0 10 25 --workers 4 --out sweep.csv \\
+        --targets NVDA=0.4,PFFA=0.3,EEMA=0.3
+"""
+import argparse
+import datetime
+import itertools
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from portfolio_core.analytics import SeriesAnalytics, price_matrix
+
+SCHEDULES = ("never", "monthly", "quarterly", "annual")
+# How far chosen target weights may sum from 1
+TARGET_TOLERANCE = 1e-4
+
+# A threshold of 0 (or None) means no drift band: rebalance on the calendar only.
+BacktestParams = namedtuple("BacktestParams", ["schedule", "threshold", "cost_bps"])
+
+# Price matrix shared by the worker processes; set by _init_worker.
+_shared = None
+
+
+def schedule_mask(dates, schedule):
+    """True on the first trading day of each new month/quarter/year."""
+    if schedule not in SCHEDULES:
+        raise ValueError(f"schedule must be one of {SCHEDULES}, got {schedule!r}")
+    due = np.zeros(len(dates), dtype=bool)
+    if schedule == "never" or len(dates) < 2:
+        return due
+    months = np.asarray(dates, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    key = {"monthly": months, "quarterly": months // 3, "annual": months // 12}[schedule]
+    due[1:] = key[1:] != key[:-1]
+    return due
+
+
+def parameter_grid(schedules=SCHEDULES, thresholds=(0,), costs_bps=(0,)):
+    return [BacktestParams(*combo) for combo in itertools.product(schedules, thresholds, costs_bps)]
+
+
+def prepare(dates, closes, targets, symbols=None):
+    """
+    Trim a price matrix to the days on which every usable asset has a price.
+    Assets without any price are dropped and the remaining targets are
+    rescaled to sum to 1. Returns ``(dates, closes, targets, dropped)``.
+    """
+    closes = np.asarray(closes, dtype="float64")
+    targets = np.asarray(targets, dtype="float64")
+    usable = ~np.isnan(closes).all(axis=0) & (targets > 0)
+    dropped = [] if symbols is None else [s for s, ok in zip(symbols, usable) if not ok]
+    closes, targets = closes[:, usable], targets[usable]
+    complete = np.flatnonzero(np.isfinite(closes).all(axis=1) & (closes > 0).all(axis=1))
+    start = complete[0] if len(complete) else len(dates)
+    total = targets.sum()
+    return np.asarray(dates)[start:], closes[start:], targets / total if total > 0 else targets, dropped
+
+
+def run_paths(dates, closes, targets, params, initial_value=1.0):
+    """
+    Simulate every ``BacktestParams`` in ``params`` at once.
+
+    ``targets`` is one weight vector or one per path. Returns
+    ``(equity, stats)``: the (days x paths) portfolio value and a dict of
+    per-path arrays (``rebalances``, ``turnover`` as a multiple of the
+    portfolio, ``costs`` in currency).
+    """
+    n_paths = len(params)
+    targets = np.broadcast_to(np.atleast_2d(np.asarray(targets, dtype="float64")), (n_paths, closes.shape[1]))
+    masks = {s: schedule_mask(dates, s) for s in {p.schedule for p in params}}
+    due = np.array([masks[p.schedule] for p in params]).T if n_paths else np.zeros((len(dates), 0), bool)
+    thresholds = np.array([p.threshold if p.threshold else np.inf for p in params], dtype="float64")
+    cost_rate = np.array([p.cost_bps for p in params], dtype="float64") / 10_000
+    check_drift = np.isfinite(thresholds).any()
+
+    equity = np.empty((len(dates), n_paths))
+    rebalances = np.zeros(n_paths, dtype=np.int64)
+    turnover = np.zeros(n_paths)
+    costs = np.zeros(n_paths)
+    if not len(dates):
+        return equity, {"rebalances": rebalances, "turnover": turnover, "costs": costs}
+
+    units = initial_value * targets / closes[0]
+    for t in range(len(dates)):
+        values = units * closes[t]
+        total = values.sum(axis=1)
+        equity[t] = total
+        if t == 0:
+            continue
+        trade = due[t]
+        if check_drift:
+            drift = np.abs(values / total[:, None] - targets).max(axis=1)
+            trade = trade | (drift > thresholds)
+        if not trade.any():
+            continue
+        rows = np.flatnonzero(trade)
+        traded = np.abs(targets[rows] * total[rows, None] - values[rows]).sum(axis=1)
+        cost = traded * cost_rate[rows]
+        after = total[rows] - cost
+        units[rows] = targets[rows] * after[:, None] / closes[t]
+        equity[t, rows] = after
+        rebalances[rows] += 1
+        turnover[rows] += traded / total[rows]
+        costs[rows] += cost
+    return equity, {"rebalances": rebalances, "turnover": turnover, "costs": costs}
+
+
+def summarize(dates, params, equity, stats):
+    """One row per path with the parameters and performance metrics (percent)."""
+    import pandas as pd
+    columns = {
+        "Schedule": [p.schedule for p in params],
+        "Threshold": [(p.threshold or 0) * 100 for p in params],
+        "Cost (bps)": [p.cost_bps for p in params],
+    }
+    if len(dates) > 1:
+        metrics = SeriesAnalytics(dates, equity).window_metrics(dates[0], dates[-1])
+        final = equity[-1]
+    else:
+        metrics = {k: np.full(len(params), np.nan) for k in ("return", "cagr", "volatility", "max_drawdown")}
+        final = np.full(len(params), np.nan)
+    columns.update({
+        "Final Value": final,
+        "Total Return": metrics["return"] * 100,
+        "CAGR": metrics["cagr"] * 100,
+        "Volatility": metrics["volatility"] * 100,
+        "Max Drawdown": metrics["max_drawdown"] * 100,
+        "Rebalances": stats["rebalances"],
+        "Turnover": stats["turnover"] * 100,
+        "Costs": stats["costs"],
+    })
+    return pd.DataFrame(columns)
+
+
+def _init_worker(dates, closes, targets):
+    global _shared
+    _shared = (dates, closes, targets)
+
+
+def _run_chunk(params):
+    dates, closes, targets = _shared
+    equity, stats = run_paths(dates, closes, targets, params)
+    return summarize(dates, params, equity, stats)
+
+
+def sweep(dates, closes, targets, params, workers=1, chunk_size=64):
+    """
+    Summary frame for every parameter combination. Paths are simulated in
+    chunks of ``chunk_size``; with ``workers`` > 1 the chunks run in worker
+    processes that each receive the price matrix once.
+    """
+    import pandas as pd
+    chunks = [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(dates, closes, targets)
+        frames = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dates, closes, targets)) as pool:
+            frames = list(pool.map(_run_chunk, chunks))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def current_weights(holdings, closes):
+    """Value weights of ``holdings`` at the last row of a (days x holdings) ``closes`` matrix."""
+    if not len(closes):
+        return np.zeros(len(holdings.shares))
+    values = np.nan_to_num(holdings.shares * closes[-1])
+    total = values.sum()
+    return values / total if total > 0 else values
+
+
+def parse_targets(text):
+    """``{symbol: weight}`` from ``"SYMBOL=WEIGHT,..."`` (weights as fractions)."""
+    targets = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        symbol, _, weight = (part.strip() for part in item.partition("="))
+        try:
+            if not symbol:
+                raise ValueError
+            targets[symbol] = float(weight)
+        except ValueError:
+            raise ValueError(f"target {item!r} is not SYMBOL=WEIGHT") from None
+    return targets
+
+
+def target_weights(targets, symbols):
+    """
+    Weight vector for ``symbols`` from a ``{symbol: weight}`` mapping; symbols
+    it leaves out get 0. Raises ``ValueError`` for unknown symbols, negative
+    or non-finite weights, or weights that do not sum to 1.
+    """
+    symbols = list(symbols)
+    unknown = [s for s in targets if s not in symbols]
+    if unknown:
+        raise ValueError(f"target weights for symbols not in the portfolio: {', '.join(unknown)}")
+    weights = np.array([targets.get(s, 0.0) for s in symbols], dtype="float64")
+    if not np.isfinite(weights).all() or (weights < 0).any():
+        raise ValueError("target weights must be non-negative numbers")
+    if abs(weights.sum() - 1) > TARGET_TOLERANCE:
+        raise ValueError(f"target weights must sum to 1, not {weights.sum():.4g}")
+    return weights
+
+
+def main(argv=None):
+    import pandas as pd
+    from portfolio_core.fx import convert_matrix, make_fx
+    from portfolio_core.holdings import DEFAULT_CURRENCY, Holdings
+    from portfolio_core.providers import make_provider
+
+    parser = argparse.ArgumentParser(description="Backtest rebalancing schedules for a portfolio.")
+    parser.add_argument("portfolio", help="Portfolio .csv/.parquet with the app's columns")
+    parser.add_argument("--prices", help="Local price store directory (mock prices when omitted)")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--months", type=int, default=60, help="History to replay (default: 60)")
+    parser.add_argument("--schedules", nargs="+", choices=SCHEDULES, default=list(SCHEDULES))
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0],
+                        help="Drift bands as weight fractions, e.g. 0.05 (0: calendar only)")
+    parser.add_argument("--costs-bps", type=float, nargs="+", default=[10.0])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--fx-rates", help="Local FX rate file (mock constant rates when omitted)")
+    parser.add_argument("--base-currency", default=DEFAULT_CURRENCY)
+    parser.add_argument("--targets", help="Target weights as SYMBOL=WEIGHT,... summing to 1, for any portfolio "
+                                          "row (even with 0 shares); rows left out get 0 "
+                                          "(default: current value weights)")
+    parser.add_argument("--out", help="Write the results CSV here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    path = args.portfolio
+    frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    holdings = Holdings.from_frame(frame)
+    if not args.targets:
+        holdings = holdings.active()
+    provider = make_provider(None, args.prices, holdings)
+    symbols = list(holdings.symbols)
+    if args.targets:
+        try:
+            targets = target_weights(parse_targets(args.targets), symbols)
+        except ValueError as e:
+            parser.error(str(e))
+    dates, closes = price_matrix(provider.load_window(symbols, args.end_date, args.months), symbols)
+    closes, missing = convert_matrix(make_fx(args.fx_rates), closes, holdings.currency_codes,
+                                     holdings.currency_labels, args.base_currency, dates)
+    for currency in missing:
+        print(f"no FX rates for {currency}; its holdings are left out", file=sys.stderr)
+    if not args.targets:
+        targets = current_weights(holdings, closes)
+    dates, closes, targets, dropped = prepare(dates, closes, targets, symbols)
+    if dropped:
+        print(f"left out (no prices): {', '.join(dropped)}", file=sys.stderr)
+    params = parameter_grid(args.schedules, args.thresholds, args.costs_bps)
+    result = sweep(dates, closes, targets, params, workers=args.workers)
+    text = result.to_csv(index=False)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text, end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
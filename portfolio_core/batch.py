@@ -0,0 +1,307 @@
+"""
+Headless batch runner: analyze many client portfolios without Streamlit.
+
+Usage::
+
+    python -m portfolio_core.batch portfolios/ --prices price_store --out reports/ \\
+        --end-date 2025-06-27 --workers 8 --format parquet
+
+The input is a directory of ``.csv``/``.parquet`` files or a single file. Each
+file has the app's portfolio columns (``symbol``, ``stock``,
+``current_price``, ``shares`` and optionally ``currency``) plus an account
+column; files without one are treated as a single account named after the
+file. Accounts are analyzed in chunks across a ``ProcessPoolExecutor``, each chunk
+with one vectorized pass of the same returns, weighted-average and
+recommendation logic the app uses.
+Portfolio figures are reported in ``--base-currency`` using the rates in
+``--fx-rates`` (mock constant rates when omitted; see ``portfolio_core.fx``).
+Workers open the ``.npy`` price store memory-mapped, so all of them share
+the operating system's page cache instead of each copying the prices. A
+store with ``.csv``/``.parquet`` series is converted once, in the parent, to
+a temporary ``.npy`` store before the workers start.
+Results are streamed to ``holdings.<fmt>`` and ``portfolios.<fmt>`` as
+chunks complete.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from portfolio_core.engine import compute_returns, lookup_prices, period_start_dates, weighted_return
+from portfolio_core.fx import apply_rates, conversion_rates, make_fx
+from portfolio_core.holdings import DEFAULT_CURRENCY, Holdings
+from portfolio_core.periods import PERFORMANCE_PERIODS
+from portfolio_core.providers import LocalPriceStore, MockPriceProvider
+from portfolio_core.recommendations import default_rules
+
+INPUT_EXTENSIONS = (".csv", ".parquet")
+
+# Per-process price store, FX rates and rules; set by _init_worker (or directly when workers=1).
+_store = None
+_fx = None
+_rules_path = None
+
+
+class _SharedStore(LocalPriceStore):
+    """LocalPriceStore that keeps each symbol's memory-mapped series open."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self._series = {}
+
+    def read_series(self, symbol):
+        if symbol not in self._series:
+            self._series[symbol] = super().read_series(symbol)
+        return self._series[symbol]
+
+
+def _init_worker(store_dir, fx_path=None, rules_path=None):
+    global _store, _fx, _rules_path
+    _store = _SharedStore(store_dir) if store_dir else None
+    _fx = make_fx(fx_path)
+    _rules_path = rules_path
+
+
+def _npy_store(store_dir, scratch):
+    """``store_dir`` if every series is ``.npy``, else a ``.npy`` copy written under ``scratch``."""
+    store = LocalPriceStore(store_dir)
+    symbols = store.symbols()
+    if all(os.path.exists(store._path(symbol, "npy")) for symbol in symbols):
+        return store_dir
+    converted = LocalPriceStore(os.path.join(scratch, "prices"))
+    for symbol in symbols:
+        converted.write_series(store.read_series(symbol))
+    return converted.root
+
+
+def input_files(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(INPUT_EXTENSIONS))
+    return [path]
+
+
+def read_portfolios(path, account_column):
+    """Yield one DataFrame per input file, with the account id in ``Account``."""
+    import pandas as pd
+    for file in input_files(path):
+        frame = pd.read_parquet(file) if file.endswith(".parquet") else pd.read_csv(file)
+        if account_column in frame:
+            account = frame.pop(account_column).astype(str)
+        else:
+            account = os.path.splitext(os.path.basename(file))[0]
+        frame.insert(0, "Account", account)
+        yield frame
+
+
+def account_chunks(frames, size):
+    """Regroup portfolio frames into frames of ``size`` whole accounts each."""
+    import pandas as pd
+    buffer, buffered = [], 0
+    for frame in frames:
+        codes, accounts = pd.factorize(frame["Account"], sort=False)
+        order = np.argsort(codes, kind="stable")
+        frame, codes = frame.iloc[order], codes[order]
+        start = 0
+        while start < len(accounts):
+            take = min(size - buffered, len(accounts) - start)
+            lo, hi = np.searchsorted(codes, [start, start + take])
+            buffer.append(frame.iloc[lo:hi])
+            buffered += take
+            start += take
+            if buffered == size:
+                yield pd.concat(buffer, ignore_index=True)
+                buffer, buffered = [], 0
+    if buffer:
+        yield pd.concat(buffer, ignore_index=True)
+
+
+def analyze_chunk(frame, end_date, periods=PERFORMANCE_PERIODS, base_currency=DEFAULT_CURRENCY):
+    """
+    Worker entry point: analyze every account in ``frame`` at once.
+
+    Holdings of all accounts share one price lookup and one returns
+    computation; per-account weighted returns are grouped sums. Duplicate
+    symbols within an account are merged by adding shares, as in the app.
+    Weighted returns are in ``base_currency``; accounts' holdings in
+    currencies without FX rates are left out of them.
+    Returns ``(holding_rows, portfolio_rows)`` DataFrames.
+    """
+    import pandas as pd
+    frame = frame[frame["symbol"].notna() & (frame["symbol"].astype(str).str.strip() != "")]
+    frame = frame.assign(
+        symbol=frame["symbol"].astype(str).str.strip(),
+        shares=frame["shares"].fillna(0).astype("float64"),
+        currency=(frame["currency"].fillna(DEFAULT_CURRENCY).astype(str).str.strip().str.upper()
+                  .replace("", DEFAULT_CURRENCY) if "currency" in frame else DEFAULT_CURRENCY),
+    )
+    if "stock" not in frame:
+        frame = frame.assign(stock=frame["symbol"])
+    merged = frame.groupby(["Account", "symbol"], sort=False).agg(
+        stock=("stock", "first"),
+        current_price=("current_price", "first"),
+        currency=("currency", "first"),
+        shares=("shares", "sum"),
+    ).reset_index()
+    codes, accounts = pd.factorize(merged["Account"], sort=False)
+    active = (merged["shares"] != 0).to_numpy()
+    merged, codes = merged[active].reset_index(drop=True), codes[active]
+
+    symbols = merged["symbol"].to_numpy(dtype=object)
+    if _store is not None:
+        provider = _store
+    else:
+        # Mock prices are derived from the first current price seen per symbol.
+        provider = MockPriceProvider(Holdings.from_frame(merged, on_duplicate="first"))
+    price_window = provider.load_window(symbols, end_date)
+    start_dates = period_start_dates(periods, end_date)
+    prices = lookup_prices(price_window, list(symbols), start_dates + [end_date])
+    _, returns, initial_values, final_values = compute_returns(
+        prices[:, :-1], prices[:, -1:], merged["shares"].to_numpy()
+    )
+    currency_codes, currency_labels = pd.factorize(merged["currency"], sort=True)
+    start_rates, end_rates, _ = conversion_rates(
+        _fx or make_fx(), currency_codes, list(currency_labels), base_currency, start_dates, end_date
+    )
+    initial_values, final_values = apply_rates(initial_values, final_values, start_rates, end_rates)
+    period_names = list(periods)
+
+    holding_rows = pd.DataFrame({
+        "Account": merged["Account"],
+        "Symbol": merged["symbol"],
+        "Stock Name": merged["stock"],
+        "Current Price": merged["current_price"],
+        "Currency": merged["currency"],
+        "Shares Held": merged["shares"],
+    })
+    holding_rows[period_names] = returns
+    rules = default_rules(period_names, _rules_path)
+    holding_rows["Recommendation Code"], holding_rows["Recommendation"] = rules.classify(returns)
+
+    n = len(accounts)
+    weighted = np.column_stack([
+        weighted_return(np.bincount(codes, initial_values[:, j], minlength=n),
+                        np.bincount(codes, final_values[:, j], minlength=n))
+        for j in range(len(period_names))
+    ]) if n else np.empty((0, len(period_names)))
+    portfolio_rows = pd.DataFrame({"Account": accounts, "Holdings": np.bincount(codes, minlength=n),
+                                   "Base Currency": base_currency})
+    portfolio_rows[period_names] = weighted
+    levels, codes, texts = rules.classify_portfolios(weighted)
+    portfolio_rows["Recommendation Level"] = levels
+    portfolio_rows["Recommendation Code"] = codes
+    portfolio_rows["Recommendation"] = [text.lstrip("- ") for text in texts]
+    return holding_rows, portfolio_rows
+
+
+class ResultWriter:
+    """Append DataFrames to one CSV or Parquet file as they arrive."""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self._parquet = None
+        self._schema = None
+        self._wrote_header = False
+        self.rows = 0
+
+    def write(self, frame):
+        if frame.empty:
+            return
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._parquet is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._schema = table.schema
+                self._parquet = pq.ParquetWriter(self.path, self._schema)
+            else:
+                table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="a" if self._wrote_header else "w",
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def run_batch(input_path, out_dir, end_date, store_dir=None, workers=None, fmt="csv",
+              account_column="account", chunk_accounts=256, fx_path=None, base_currency=DEFAULT_CURRENCY,
+              rules_path=None):
+    """Analyze every account under ``input_path``; returns (holding rows, accounts) written."""
+    os.makedirs(out_dir, exist_ok=True)
+    holdings_out = ResultWriter(os.path.join(out_dir, f"holdings.{fmt}"), fmt)
+    portfolios_out = ResultWriter(os.path.join(out_dir, f"portfolios.{fmt}"), fmt)
+    chunks = account_chunks(read_portfolios(input_path, account_column), chunk_accounts)
+    try:
+        if workers == 1:
+            _init_worker(store_dir, fx_path, rules_path)
+            results = (analyze_chunk(chunk, end_date, base_currency=base_currency) for chunk in chunks)
+            for holdings, portfolios in results:
+                holdings_out.write(holdings)
+                portfolios_out.write(portfolios)
+        else:
+            workers = workers or os.cpu_count() or 1
+            with tempfile.TemporaryDirectory(prefix="portfolio-prices-") as scratch:
+                if store_dir:
+                    store_dir = _npy_store(store_dir, scratch)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(store_dir, fx_path, rules_path)) as pool:
+                    # Keep a bounded number of chunks in flight so input is read lazily.
+                    pending = []
+                    in_flight = 2 * workers
+                    for chunk in chunks:
+                        pending.append(pool.submit(analyze_chunk, chunk, end_date, base_currency=base_currency))
+                        if len(pending) >= in_flight:
+                            holdings, portfolios = pending.pop(0).result()
+                            holdings_out.write(holdings)
+                            portfolios_out.write(portfolios)
+                    for future in pending:
+                        holdings, portfolios = future.result()
+                        holdings_out.write(holdings)
+                        portfolios_out.write(portfolios)
+    finally:
+        holdings_out.close()
+        portfolios_out.close()
+    return holdings_out.rows, portfolios_out.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many portfolios without the Streamlit UI.")
+    parser.add_argument("input", help="Directory of .csv/.parquet portfolio files, or a single file")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--prices", help="Local price store directory (mock prices when omitted); workers share "
+                        "a .npy store memory-mapped, other formats are converted to one first")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="Analysis end date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--fx-rates", help="Local FX rate file (mock constant rates when omitted)")
+    parser.add_argument("--base-currency", default=DEFAULT_CURRENCY,
+                        help=f"Currency of the portfolio figures (default: {DEFAULT_CURRENCY})")
+    parser.add_argument("--rules", help="Recommendation rule file (default: $PORTFOLIO_RULES or the bundled rules)")
+    parser.add_argument("--account-column", default="account")
+    parser.add_argument("--chunk-accounts", type=int, default=256, help="Accounts per worker task")
+    args = parser.parse_args(argv)
+
+    if args.prices and not os.path.isdir(args.prices):
+        parser.error(f"price store not found: {args.prices}")
+    if args.fx_rates and not os.path.isfile(args.fx_rates):
+        parser.error(f"FX rate file not found: {args.fx_rates}")
+    holding_rows, accounts = run_batch(
+        args.input, args.out, args.end_date, args.prices, args.workers, args.format,
+        args.account_column, args.chunk_accounts, args.fx_rates, args.base_currency, args.rules,
+    )
+    print(f"Analyzed {accounts} accounts ({holding_rows} holdings) -> {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
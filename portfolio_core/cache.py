@@ -0,0 +1,138 @@
+"""
+Result memoization for the analysis engine.
+
+Streamlit re-executes the whole script on every widget interaction, so the
+app keeps one ``AnalysisCache`` in ``st.session_state``. Price matrices are
+cached under a content hash of the price inputs (symbols, current prices,
+currencies, provider, period start dates and ``analysis_end_date``); shares
+are deliberately not part of the key, so editing shares (or the base
+currency) only re-aggregates the cached matrices. Per-symbol rows are
+cached as well, so adding or removing a holding computes just that symbol.
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from portfolio_core.engine import AnalysisResult, lookup_prices, period_start_dates
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+def content_hash(*parts):
+    """Stable digest of strings, numbers and NumPy arrays."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray) and part.dtype != object:
+            h.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, (list, tuple, np.ndarray)):
+            h.update("\0".join(map(str, part)).encode("utf-8"))
+        else:
+            h.update(str(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def provider_key(provider):
+    """Identify a provider's data source (instances are recreated on every rerun)."""
+    return (provider.name, getattr(provider, "root", None))
+
+
+class AnalysisCache:
+    """
+    Incremental front-end to ``engine.analyze``.
+
+    ``results`` maps a content hash of the whole book's price inputs to its
+    (start, end) price matrices; ``rows`` maps a single holding's price
+    inputs to its row of those matrices. Symbols whose load failed are not
+    cached, so they are retried on the next run.
+    """
+
+    def __init__(self, max_results=32, max_rows=100_000):
+        self.results = LRUCache(max_results)
+        self.rows = LRUCache(max_rows)
+
+    def clear(self):
+        self.results.clear()
+        self.rows.clear()
+
+    def analyze(self, holdings, provider, periods, end_date, fx=None, base_currency=None):
+        holdings = holdings.active()
+        start_dates = period_start_dates(periods, end_date)
+        dates = start_dates + [end_date]
+        source = provider_key(provider)
+        date_key = tuple(str(d) for d in dates)
+        key = content_hash(source, date_key, list(periods), holdings.symbols,
+                           holdings.prices, holdings.currencies)
+
+        cached = self.results.get(key)
+        if cached is None:
+            cached = self._price_matrix(holdings, provider, source, date_key, dates)
+            if not provider.errors:
+                self.results.put(key, cached)
+        start_prices, end_prices = cached
+        result = AnalysisResult(holdings, periods.keys(), start_prices, end_prices)
+        if fx is not None and base_currency:
+            # Cheap: rates are looked up once per currency, not per holding.
+            result.to_currency(fx, base_currency, start_dates, end_date)
+        return result
+
+    def _price_matrix(self, holdings, provider, source, date_key, dates):
+        currencies = holdings.currencies
+        row_keys = [(source, date_key, symbol, float(price), currency)
+                    for symbol, price, currency in zip(holdings.symbols, holdings.prices, currencies)]
+        prices = np.empty((len(holdings), len(dates)))
+        missing = []
+        for i, row_key in enumerate(row_keys):
+            row = self.rows.get(row_key)
+            if row is None:
+                missing.append(i)
+            else:
+                prices[i] = row
+
+        provider.errors = {}
+        if missing:
+            symbols = [holdings.symbols[i] for i in missing]
+            price_window = provider.load_window(symbols, dates[-1])
+            fetched = lookup_prices(price_window, symbols, dates)
+            prices[missing] = fetched
+            for i, row in zip(missing, fetched):
+                if holdings.symbols[i] not in provider.errors:
+                    self.rows.put(row_keys[i], row)
+
+        start_prices = prices[:, :-1]
+        end_prices = np.repeat(prices[:, -1:], len(dates) - 1, axis=1)
+        return start_prices, end_prices
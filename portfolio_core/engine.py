@@ -0,0 +1,233 @@
+"""
+Vectorized returns engine.
+
+All holdings and periods are computed at once: prices are looked up into
+(symbols x periods) start/end matrices, and returns, initial/final values and
+the share-weighted portfolio return per period are plain array operations.
+Results stay numeric (NaN marks N/A); formatting is left to the display layer.
+"""
+import numpy as np
+
+# Per-cell status codes for AnalysisResult.status
+OK = 0
+NO_DATA = 1 # N/A (Data not found)
+BAD_START_PRICE = 2 # N/A (Start price 0 or None)
+
+STATUS_LABELS = {
+    NO_DATA: "N/A (Data not found)",
+    BAD_START_PRICE: "N/A (Start price 0 or None)",
+}
+
+_KEY_BIAS = np.int64(2 ** 31)
+
+# Upper bound on prices concatenated per lookup_prices block (~100 MB of temporaries).
+LOOKUP_BLOCK_POINTS = 1 << 22
+
+
+def period_start_dates(periods, end_date):
+    """Evaluate each period's start-date function, clipped to ``end_date``."""
+    return [min(get_start_date(end_date), end_date) for get_start_date in periods.values()]
+
+
+def lookup_prices(price_window, symbols, dates):
+    """
+    Closing price on or before each of ``dates`` for every symbol, as a
+    (len(symbols) x len(dates)) float matrix with NaN where there is no data.
+
+    Series are concatenated into one array keyed by (symbol, date) so a whole
+    block of symbols is answered by a single ``searchsorted`` call. Blocks are
+    capped at ``LOOKUP_BLOCK_POINTS`` prices to bound the temporary memory.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    unique = list(dict.fromkeys(symbols))
+    series = [price_window.get(s) for s in unique]
+    lengths = np.array([0 if s is None else len(s) for s in series], dtype=np.int64)
+    out = np.full((len(unique), len(dates)), np.nan)
+    block_ends = np.searchsorted(np.cumsum(lengths), np.arange(1, 1 + lengths.sum() // LOOKUP_BLOCK_POINTS)
+                                 * LOOKUP_BLOCK_POINTS, side="right")
+    lo = 0
+    for hi in list(block_ends) + [len(unique)]:
+        if hi > lo:
+            out[lo:hi] = _lookup_block(series[lo:hi], lengths[lo:hi], dates)
+            lo = hi
+    if len(unique) == len(symbols):
+        return out
+    row_of = {s: i for i, s in enumerate(unique)}
+    return out[[row_of[s] for s in symbols]]
+
+
+def _lookup_block(series, lengths, dates):
+    out = np.full((len(series), len(dates)), np.nan)
+    if lengths.sum() == 0:
+        return out
+    present = [s for s in series if s is not None and len(s) > 0]
+    flat_dates = np.concatenate([s.dates.astype(np.int64) for s in present])
+    flat_closes = np.concatenate([s.closes for s in present])
+    row_ids = np.arange(len(series), dtype=np.int64)
+    keys = (np.repeat(row_ids, lengths) << 32) + (flat_dates + _KEY_BIAS)
+    query = (row_ids[:, None] << 32) + (dates[None, :] + _KEY_BIAS)
+    pos = np.searchsorted(keys, query, side="right") - 1
+    block_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    valid = pos >= block_start[:, None]
+    out[valid] = flat_closes[pos[valid]]
+    return out
+
+
+def compute_returns(start_prices, end_prices, shares):
+    """
+    Element-wise returns for (holdings x periods) price matrices.
+
+    Returns ``(status, returns, initial_values, final_values)``; returns are
+    percentages (NaN where N/A) and values are 0 where the cell is invalid.
+    """
+    start, end = start_prices, end_prices
+    has_data = ~np.isnan(start) & ~np.isnan(end)
+    valid = has_data & (start > 0)
+    status = np.where(valid, OK, np.where(has_data, BAD_START_PRICE, NO_DATA)).astype(np.int8)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(valid, (end - start) / start * 100, np.nan)
+    shares = np.asarray(shares, dtype="float64")[:, None]
+    initial_values = np.where(valid, start * shares, 0.0)
+    final_values = np.where(valid, end * shares, 0.0)
+    return status, returns, initial_values, final_values
+
+
+def weighted_return(total_initial, total_final):
+    """Percentage change of summed values; NaN where nothing was invested."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total_initial > 0, (total_final - total_initial) / total_initial * 100, np.nan)
+
+
+class AnalysisResult:
+    """
+    Numeric (holdings x periods) analysis output for a ``Holdings`` store.
+
+    Returns are in each holding's own currency. ``initial_values``,
+    ``final_values`` and ``weighted_returns`` are in ``base_currency`` once
+    ``to_currency`` has been applied; until then values are summed as-is.
+    """
+
+    def __init__(self, holdings, period_names, start_prices, end_prices):
+        self.holdings = holdings
+        self.period_names = list(period_names)
+        self.start_prices = start_prices
+        self.end_prices = end_prices
+        self.base_currency = None
+        self.missing_currencies = []
+        self._compute()
+
+    @property
+    def symbols(self):
+        return self.holdings.symbols
+
+    @property
+    def names(self):
+        return self.holdings.names
+
+    @property
+    def currencies(self):
+        return self.holdings.currencies
+
+    @property
+    def current_prices(self):
+        return self.holdings.prices
+
+    @property
+    def shares(self):
+        return self.holdings.shares
+
+    def _compute(self):
+        self.status, self.returns, self.local_initial_values, self.local_final_values = compute_returns(
+            self.start_prices, self.end_prices, self.shares
+        )
+        self._aggregate(self.local_initial_values, self.local_final_values)
+
+    def _aggregate(self, initial_values, final_values):
+        self.initial_values, self.final_values = initial_values, final_values
+        self.weighted_returns = weighted_return(initial_values.sum(axis=0), final_values.sum(axis=0))
+
+    def to_currency(self, fx, base_currency, start_dates, end_date):
+        """
+        Re-aggregate the portfolio figures in ``base_currency``: start values
+        are converted at each period's start-date rate and end values at the
+        ``end_date`` rate. Holdings in currencies without rates are left out
+        and listed in ``missing_currencies``.
+        """
+        from portfolio_core.fx import apply_rates, conversion_rates
+        start_rates, end_rates, self.missing_currencies = conversion_rates(
+            fx, self.holdings.currency_codes, self.holdings.currency_labels,
+            base_currency, start_dates, end_date,
+        )
+        self.base_currency = base_currency
+        self._aggregate(*apply_rates(self.local_initial_values, self.local_final_values, start_rates, end_rates))
+        return self
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def period_returns(self, period_name):
+        return self.returns[:, self.period_names.index(period_name)]
+
+    def row_performance(self, i):
+        """``{period_name: return}`` for one holding (NaN where N/A)."""
+        return dict(zip(self.period_names, self.returns[i].tolist()))
+
+    def status_notes(self):
+        """
+        Per holding, why its N/A returns are N/A, e.g. ``"N/A (Data not
+        found): Last 36 Months"``; empty when every period has a return.
+        """
+        notes = [""] * len(self)
+        for i in np.flatnonzero((self.status != OK).any(axis=1)):
+            parts = []
+            for code, label in STATUS_LABELS.items():
+                periods = [p for p, s in zip(self.period_names, self.status[i]) if s == code]
+                if periods:
+                    parts.append(f"{label}: {'all periods' if len(periods) == len(self.period_names) else ', '.join(periods)}")
+            notes[i] = "; ".join(parts)
+        return notes
+
+    def performance_frame(self):
+        """Holdings with one numeric return column per period and a ``Data Status`` note."""
+        import pandas as pd
+        frame = pd.DataFrame({
+            "Symbol": self.symbols,
+            "Stock Name": self.names,
+            "Current Price": self.current_prices,
+            "Currency": self.currencies,
+            "Shares Held": self.shares,
+        })
+        returns = pd.DataFrame(self.returns, columns=self.period_names, index=frame.index)
+        frame = pd.concat([frame, returns], axis=1)
+        frame["Data Status"] = self.status_notes()
+        return frame
+
+    def weighted_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "Period": self.period_names,
+            "Weighted Average Performance": self.weighted_returns,
+        })
+
+
+def analyze(holdings, price_window, periods, end_date, fx=None, base_currency=None):
+    """
+    Compute returns for every holding and period. Holdings with zero shares
+    are dropped, matching the UI's behaviour. With ``fx`` and
+    ``base_currency`` the portfolio figures are reported in that currency.
+    """
+    holdings = holdings.active()
+    start_dates = period_start_dates(periods, end_date)
+    prices = lookup_prices(price_window, list(holdings.symbols), start_dates + [end_date])
+    start_prices = prices[:, :-1]
+    end_prices = np.repeat(prices[:, -1:], len(start_dates), axis=1)
+    result = AnalysisResult(holdings, periods.keys(), start_prices, end_prices)
+    if fx is not None and base_currency:
+        result.to_currency(fx, base_currency, start_dates, end_date)
+    return result
+
+
+def run_analysis(holdings, provider, periods, end_date, fx=None, base_currency=None):
+    """Load the price window once and analyze ``holdings``."""
+    price_window = provider.load_window(holdings.symbols[holdings.shares != 0], end_date)
+    return analyze(holdings, price_window, periods, end_date, fx, base_currency)
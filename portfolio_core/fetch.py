@@ -0,0 +1,285 @@
+"""
+Asynchronous fetch stage for network price providers.
+
+``AsyncFetcher`` downloads many symbols concurrently while staying inside the
+provider's rate limit:
+
+* HTTP/1.1 keep-alive connections are pooled per host (``HttpClient``),
+* symbols are grouped into one request where the provider supports batches,
+* a token bucket enforces the provider's requests-per-minute limit; the
+  bucket is shared by every fetch against the same API (``provider_bucket``),
+  whichever call, thread or event loop it comes from,
+* throttled or failed requests are retried with exponential backoff.
+
+Concurrent loads of the same symbol from different sessions are merged one
+level up, by the single-flight ``shared_cache.SharedCache``.
+
+Only the standard library is used, so the stage can be exercised against a
+local stub HTTP server by pointing the provider's ``base_url`` at it.
+"""
+import asyncio
+import json
+import random
+import ssl
+import threading
+import time
+import urllib.parse
+
+USER_AGENT = "portfolio-analyzer/1.0"
+
+
+class HttpError(Exception):
+    def __init__(self, status, reason, body=b""):
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+        self.body = body
+
+
+class Throttled(Exception):
+    """The provider answered but asked us to slow down."""
+
+
+class TokenBucket:
+    """
+    Allow ``rate`` requests per second with bursts of up to ``capacity``.
+
+    Thread-safe and not tied to an event loop: each caller reserves a token
+    under a lock and then sleeps until it is due.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; returns the seconds to wait before using it."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# rate_limit_key -> TokenBucket, shared by every provider instance in the process
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def provider_bucket(provider):
+    """The ``TokenBucket`` for ``provider.rate_limit_key()``, created on first use."""
+    key = provider.rate_limit_key()
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(provider.requests_per_minute / 60.0,
+                                                 capacity=getattr(provider, "burst", 1))
+        return bucket
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single host."""
+
+    def __init__(self, host, port, use_ssl, max_connections=4, timeout=30):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    async def _connect(self):
+        self.opened += 1
+        return await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout
+        )
+
+    async def request(self, path):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = await self._connect()
+            try:
+                status, reason, headers, body, keep_alive = await asyncio.wait_for(
+                    self._exchange(conn, path), self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                conn[1].close()
+                if not reused:
+                    raise ConnectionError(str(e)) from e
+                # The server dropped an idle connection; retry once on a fresh one.
+                conn = await self._connect()
+                try:
+                    status, reason, headers, body, keep_alive = await asyncio.wait_for(
+                        self._exchange(conn, path), self.timeout
+                    )
+                except BaseException:
+                    conn[1].close()
+                    raise
+            except BaseException:
+                conn[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return status, reason, headers, body
+
+    async def _exchange(self, conn, path):
+        reader, writer = conn
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\nUser-Agent: {USER_AGENT}\r\n"
+            "Accept: application/json\r\nAccept-Encoding: identity\r\nConnection: keep-alive\r\n\r\n"
+            .encode("latin-1")
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        version, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), reason[0] if reason else "", headers, body, keep_alive
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class HttpClient:
+    """Routes GET requests to one ``ConnectionPool`` per scheme/host/port."""
+
+    def __init__(self, max_connections_per_host=4, timeout=30):
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.pools = {}
+
+    async def get(self, url):
+        parts = urllib.parse.urlsplit(url)
+        use_ssl = parts.scheme == "https"
+        port = parts.port or (443 if use_ssl else 80)
+        key = (parts.scheme, parts.hostname, port)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = ConnectionPool(
+                parts.hostname, port, use_ssl, self.max_connections_per_host, self.timeout
+            )
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        status, reason, headers, body = await pool.request(path)
+        if status >= 400:
+            raise HttpError(status, reason, body)
+        return body
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+
+class AsyncFetcher:
+    """
+    Fetch full daily series for many symbols from a ``NetworkPriceProvider``.
+
+    The provider supplies ``request_url(symbols)``, ``parse(symbols, payload)``
+    (returning ``{symbol: PriceSeries}``), ``is_throttled(payload)``,
+    ``batch_size`` and ``requests_per_minute``.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, provider, max_connections=4, retries=4, backoff=1.0, timeout=30):
+        self.provider = provider
+        self.client = HttpClient(max_connections, timeout)
+        self.bucket = provider_bucket(provider)
+        self.retries = retries
+        self.backoff = backoff
+        self.requests = 0
+        self.errors = {}
+
+    async def fetch_many(self, symbols):
+        """``{symbol: PriceSeries or None}``; failures are recorded in ``self.errors``."""
+        symbols = list(dict.fromkeys(symbols))
+        size = max(1, self.provider.batch_size)
+        batches = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+        fetched = {}
+        await asyncio.gather(*(self._fetch_batch(batch, fetched) for batch in batches))
+        return {symbol: fetched[symbol] for symbol in symbols}
+
+    async def _fetch_batch(self, batch, fetched):
+        try:
+            series = await self._request_with_retry(batch)
+        except Exception as e:
+            for symbol in batch:
+                fetched[symbol] = None
+                self.errors[symbol] = str(e)
+        else:
+            for symbol in batch:
+                fetched[symbol] = series.get(symbol)
+
+    async def _request_with_retry(self, batch):
+        url = self.provider.request_url(batch)
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            self.requests += 1
+            try:
+                payload = json.loads(await self.client.get(url))
+                if self.provider.is_throttled(payload):
+                    raise Throttled(f"rate limited while fetching {', '.join(batch)}")
+                return self.provider.parse(batch, payload)
+            except HttpError as e:
+                if e.status not in self.RETRY_STATUSES or attempt == self.retries:
+                    raise
+            except (Throttled, ConnectionError, asyncio.TimeoutError, OSError):
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+
+    def close(self):
+        self.client.close()
+
+
+def fetch_all(provider, symbols, **options):
+    """Run ``AsyncFetcher.fetch_many`` from synchronous code."""
+    async def run():
+        fetcher = AsyncFetcher(provider, **options)
+        try:
+            return await fetcher.fetch_many(symbols), fetcher.errors
+        finally:
+            fetcher.close()
+    return asyncio.run(run())
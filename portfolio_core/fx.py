@@ -0,0 +1,187 @@
+"""
+Currency conversion for mixed-currency books.
+
+Daily FX rates come from one local file (no network needed), laid out with
+a ``date`` column and one column per currency holding the units of that
+currency per one unit of the pivot currency (``FX_PIVOT``), e.g.::
+
+    date,KES,EUR
+    2025-06-26,129.25,0.856
+    2025-06-27,129.20,0.853
+
+``FxRates`` keeps each currency as a date-indexed ``PriceSeries`` and builds
+(and caches) the cross series for a currency pair the first time it is
+asked for. Conversion is done per currency, not per holding: every holding
+in a currency shares one vector of rates at the period dates.
+"""
+import csv
+import functools
+import os
+
+import numpy as np
+
+from portfolio_core.providers import PriceSeries
+
+FX_PIVOT = "USD"
+
+# Used when no rate file is available, like the mock price data: constant
+# units per USD, so mixed books are at least summed in one currency.
+MOCK_RATES_PER_USD = {"USD": 1.0, "KES": 129.0}
+
+_EPOCH = np.datetime64("1900-01-01", "D")
+
+
+class FxRates:
+    """Daily rates per currency against ``pivot``, with cached cross pairs."""
+
+    def __init__(self, series, pivot=FX_PIVOT, source=None):
+        self.pivot = pivot
+        self.source = source
+        self.series = dict(series)
+        self._pairs = {}
+
+    @property
+    def currencies(self):
+        return sorted(set(self.series) | {self.pivot})
+
+    @classmethod
+    def constant(cls, rates_per_pivot, pivot=FX_PIVOT):
+        """Flat rates, valid for every date."""
+        series = {
+            currency: PriceSeries(currency, [_EPOCH], [rate])
+            for currency, rate in rates_per_pivot.items() if currency != pivot
+        }
+        return cls(series, pivot, source="constant")
+
+    @classmethod
+    def from_file(cls, path, pivot=FX_PIVOT):
+        """Read a wide ``.csv`` or ``.parquet`` rate file (see module docstring)."""
+        if path.endswith(".parquet"):
+            import pandas as pd
+            frame = pd.read_parquet(path)
+            columns = {name: frame[name].to_numpy() for name in frame.columns}
+        else:
+            with open(path, newline="") as f:
+                reader = csv.reader(f)
+                header = [name.strip() for name in next(reader)]
+                rows = [row for row in reader if row]
+            columns = {name: [row[i] for row in rows] for i, name in enumerate(header)}
+        if "date" not in columns:
+            raise ValueError(f"{path}: rate file needs a 'date' column")
+        dates = np.asarray(columns.pop("date"), dtype="datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        series = {}
+        for currency, values in columns.items():
+            rates = np.array([np.nan if v in ("", None) else v for v in values], dtype="float64")[order]
+            keep = np.isfinite(rates) & (rates > 0)
+            series[currency.upper()] = PriceSeries(currency.upper(), dates[order][keep], rates[keep])
+        series.pop(pivot, None)
+        return cls(series, pivot, source=path)
+
+    def _per_pivot(self, currency):
+        if currency == self.pivot:
+            return None
+        try:
+            return self.series[currency]
+        except KeyError:
+            raise KeyError(f"No FX rates for {currency}") from None
+
+    def pair(self, source, target):
+        """
+        ``PriceSeries`` of ``target`` units per ``source`` unit, or None when
+        the currencies are the same. Built once per pair and cached.
+        """
+        if source == target:
+            return None
+        key = (source, target)
+        if key not in self._pairs:
+            src, dst = self._per_pivot(source), self._per_pivot(target)
+            if dst is None:
+                series = PriceSeries(key, src.dates, 1.0 / src.closes)
+            elif src is None:
+                series = dst
+            else:
+                dates = np.union1d(src.dates, dst.dates)
+                series = PriceSeries(key, dates, dst.prices_at(dates) / src.prices_at(dates))
+            self._pairs[key] = series
+        return self._pairs[key]
+
+    def rates_at(self, source, target, dates):
+        """Rate on or before each date (NaN before the first quote)."""
+        series = self.pair(source, target)
+        if series is None:
+            return np.ones(len(dates))
+        return series.prices_at(dates)
+
+
+@functools.lru_cache(maxsize=8)
+def _load(path, mtime):
+    return FxRates.from_file(path)
+
+
+def load_rates(path):
+    """``FxRates`` for ``path``, read once per file version."""
+    return _load(os.path.abspath(path), os.path.getmtime(path))
+
+
+def make_fx(path=None):
+    """Rates from ``path`` when the file exists, otherwise the mock constants."""
+    if path and os.path.isfile(path):
+        return load_rates(path)
+    return FxRates.constant(MOCK_RATES_PER_USD)
+
+
+def conversion_rates(fx, currency_codes, currency_labels, target, start_dates, end_date):
+    """
+    ``(start_rates, end_rates, missing)`` for (holdings x periods) values in
+    each row's currency (``currency_labels[currency_codes]``): multiply by
+    the rates to get ``target`` amounts. Rates are looked up once per
+    currency; rows in a currency without rates stay NaN and the currency is
+    listed in ``missing``.
+    """
+    n, p = len(currency_codes), len(start_dates)
+    start_rates = np.full((n, p), np.nan)
+    end_rates = np.full((n, p), np.nan)
+    dates = np.asarray(list(start_dates) + [end_date], dtype="datetime64[D]")
+    missing = []
+    for code, currency in enumerate(currency_labels):
+        rows = currency_codes == code
+        if not rows.any():
+            continue
+        try:
+            rates = fx.rates_at(currency, target, dates)
+        except KeyError:
+            missing.append(currency)
+            continue
+        start_rates[rows] = rates[:-1]
+        end_rates[rows] = rates[-1]
+    return start_rates, end_rates, missing
+
+
+def apply_rates(initial_values, final_values, start_rates, end_rates):
+    """Convert value matrices; cells without both rates count as 0 (N/A)."""
+    ok = np.isfinite(start_rates) & np.isfinite(end_rates)
+    return (np.where(ok, initial_values * start_rates, 0.0),
+            np.where(ok, final_values * end_rates, 0.0))
+
+
+def convert_matrix(fx, closes, currency_codes, currency_labels, target, dates):
+    """
+    Convert a (days x symbols) close matrix to ``target`` with each day's
+    rate, one rate lookup per currency. Columns in a currency without rates
+    become NaN and the currency is returned in ``missing``.
+    """
+    out = np.array(closes, dtype="float64")
+    missing = []
+    for code, currency in enumerate(currency_labels):
+        columns = np.flatnonzero(currency_codes == code)
+        if not len(columns):
+            continue
+        try:
+            rates = fx.rates_at(currency, target, dates)
+        except KeyError:
+            missing.append(currency)
+            out[:, columns] = np.nan
+            continue
+        out[:, columns] *= rates[:, None]
+    return out, missing
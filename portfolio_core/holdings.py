@@ -0,0 +1,120 @@
+"""
+Compact, symbol-indexed holdings store.
+
+Holdings are kept as typed column arrays (price, shares, currency codes) with
+a symbol -> row hash index, so lookups are O(1) and no per-row dicts are
+built. The analysis engine and the price providers both read this directly.
+"""
+import numpy as np
+
+DEFAULT_CURRENCY = "USD"
+
+# How rows sharing a symbol are combined
+DUPLICATE_POLICIES = ("sum", "first", "last", "error")
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value)) or str(value).strip() == ""
+
+
+class Holdings:
+    """
+    Column-oriented holdings with one row per distinct symbol.
+
+    ``on_duplicate`` decides what happens when a symbol appears more than
+    once: ``"sum"`` adds the shares into the first row (keeping its name,
+    price and currency), ``"first"``/``"last"`` keep a single row and
+    ``"error"`` raises ``ValueError``. Rows without a symbol are dropped;
+    symbols are stripped and currency codes stripped and upper-cased.
+    """
+
+    def __init__(self, symbols, names, prices, shares, currencies=None, on_duplicate="sum"):
+        if on_duplicate not in DUPLICATE_POLICIES:
+            raise ValueError(f"on_duplicate must be one of {DUPLICATE_POLICIES}, got {on_duplicate!r}")
+        n = len(symbols)
+        if currencies is None:
+            currencies = [None] * n
+        keep = [i for i in range(n) if not _is_missing(symbols[i])]
+        symbols = [str(symbols[i]).strip() for i in keep]
+        names = [names[i] for i in keep]
+        keep_rows = np.asarray(keep, dtype=np.intp)
+        prices = np.asarray(prices, dtype="float64").reshape(-1)[keep_rows]
+        shares = np.nan_to_num(np.asarray(shares, dtype="float64").reshape(-1))[keep_rows]
+        currencies = [DEFAULT_CURRENCY if _is_missing(currencies[i]) else str(currencies[i]).strip().upper()
+                      for i in keep]
+
+        self.index = {}
+        self.duplicates = []
+        rows = []
+        for i, symbol in enumerate(symbols):
+            row = self.index.get(symbol)
+            if row is None:
+                self.index[symbol] = len(rows)
+                rows.append(i)
+                continue
+            if on_duplicate == "error":
+                raise ValueError(f"Duplicate symbol in holdings: {symbol}")
+            self.duplicates.append(symbol)
+            if on_duplicate == "sum":
+                shares[rows[row]] += shares[i]
+            elif on_duplicate == "last":
+                rows[row] = i
+
+        self.symbols = np.array([symbols[i] for i in rows], dtype=object)
+        self.names = np.array([names[i] for i in rows], dtype=object)
+        self.prices = prices[rows]
+        self.shares = shares[rows]
+        self.currency_labels = sorted(set(currencies[i] for i in rows))
+        code_of = {c: k for k, c in enumerate(self.currency_labels)}
+        self.currency_codes = np.array([code_of[currencies[i]] for i in rows], dtype=np.int16)
+
+    @classmethod
+    def from_frame(cls, frame, on_duplicate="sum"):
+        """Build from a portfolio DataFrame (symbol, stock, current_price, shares[, currency])."""
+        return cls(
+            frame["symbol"].tolist(),
+            frame["stock"].tolist() if "stock" in frame else frame["symbol"].tolist(),
+            frame["current_price"].to_numpy(dtype="float64", na_value=np.nan),
+            frame["shares"].to_numpy(dtype="float64", na_value=0.0),
+            frame["currency"].tolist() if "currency" in frame else None,
+            on_duplicate=on_duplicate,
+        )
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    @property
+    def currencies(self):
+        """Currency label per row."""
+        return np.asarray(self.currency_labels, dtype=object)[self.currency_codes]
+
+    def row(self, symbol):
+        """Row number for ``symbol`` or None."""
+        return self.index.get(symbol)
+
+    def price_of(self, symbol):
+        """``(current_price, currency)`` for ``symbol`` or None."""
+        row = self.index.get(symbol)
+        if row is None:
+            return None
+        return float(self.prices[row]), self.currency_labels[self.currency_codes[row]]
+
+    def take(self, rows):
+        """New Holdings with only ``rows`` (an index array or boolean mask)."""
+        subset = object.__new__(Holdings)
+        subset.symbols = self.symbols[rows]
+        subset.names = self.names[rows]
+        subset.prices = self.prices[rows]
+        subset.shares = self.shares[rows]
+        subset.currency_codes = self.currency_codes[rows]
+        subset.currency_labels = self.currency_labels
+        subset.index = {s: i for i, s in enumerate(subset.symbols)}
+        subset.duplicates = []
+        return subset
+
+    def active(self):
+        """Holdings with a non-zero share count."""
+        return self.take(self.shares != 0)
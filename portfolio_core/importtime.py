@@ -0,0 +1,76 @@
+"""
+Import-time budget check.
+
+Workers import the core many times, so cold-start cost matters. This runs
+``python -X importtime -c "import <module>"`` in a fresh interpreter and
+reports the module's cumulative import time and any heavy dependencies it
+pulled in::
+
+    python -m portfolio_core.importtime                 # import portfolio_core
+    python -m portfolio_core.importtime portfolio_core.engine --budget-ms 250
+
+Exits with status 1 when the budget is exceeded or a forbidden module
+(Streamlit always; pandas and dateutil unless allowed) was imported.
+``tests/test_importtime.py`` runs the same check for the package and every
+submodule.
+"""
+import argparse
+import subprocess
+import sys
+
+# Modules the core must never pull in at import time.
+FORBIDDEN = ("streamlit", "pandas", "dateutil")
+
+# The package itself is lazy; submodules are dominated by NumPy's own import.
+PACKAGE_BUDGET_MS = 20
+SUBMODULE_BUDGET_MS = 400
+
+
+def measure(module="portfolio_core"):
+    """
+    Import ``module`` in a fresh interpreter.
+    Returns ``(cumulative_us, {imported module: cumulative_us})``.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    imported = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported[name.strip()] = int(cumulative)
+    return imported.get(module, 0), imported
+
+
+def check(module="portfolio_core", budget_ms=None, allow=()):
+    """Return ``(cumulative_us, problems)``; problems is empty when within budget."""
+    if budget_ms is None:
+        budget_ms = PACKAGE_BUDGET_MS if module == "portfolio_core" else SUBMODULE_BUDGET_MS
+    total_us, imported = measure(module)
+    problems = []
+    if total_us > budget_ms * 1000:
+        problems.append(f"import {module} took {total_us / 1000:.1f} ms (budget {budget_ms} ms)")
+    for name in FORBIDDEN:
+        if name not in allow and name in imported:
+            problems.append(f"import {module} pulled in {name}")
+    return total_us, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the core package.")
+    parser.add_argument("module", nargs="?", default="portfolio_core")
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--allow", action="append", default=[], help="Forbidden module to allow (repeatable)")
+    args = parser.parse_args(argv)
+
+    total_us, problems = check(args.module, args.budget_ms, args.allow)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms")
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
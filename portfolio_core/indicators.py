@@ -0,0 +1,104 @@
+"""
+Technical indicators for the whole book at once.
+
+Every function takes a (days x symbols) close matrix, such as
+``SeriesAnalytics.closes``, and returns matrices of the same shape. The
+EMA and rolling kernels are pandas' compiled column-wise implementations
+run on the whole matrix, so there is no per-symbol Python loop. Leading
+NaNs (a series that starts later) are skipped.
+"""
+import numpy as np
+
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WINDOW, BOLLINGER_WIDTH = 20, 2.0
+
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+# Numeric columns added by latest_indicators (plus a "Technical Signal" text column)
+INDICATOR_COLUMNS = (f"RSI ({RSI_PERIOD})", "MACD", "MACD Signal", "MACD Histogram", "Bollinger %B")
+
+
+def _frame(closes):
+    import pandas as pd # deferred: keeps import cheap
+    return pd.DataFrame(np.asarray(closes, dtype="float64"))
+
+
+def ema(closes, span=None, alpha=None):
+    """Exponential moving average down each column (recursive form, like most charting tools)."""
+    return _frame(closes).ewm(span=span, alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def rsi(closes, period=RSI_PERIOD):
+    """Wilder's Relative Strength Index, 0-100 (50 where the price has not moved)."""
+    change = _frame(closes).diff()
+    gains = change.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+    losses = (-change).clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100 - 100 / (1 + gains / losses)
+    value = np.where(losses == 0, np.where(gains > 0, 100.0, 50.0), value)
+    return np.where(np.isnan(gains) | np.isnan(losses), np.nan, value)
+
+
+def macd(closes, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """``(macd, signal, histogram)`` matrices."""
+    line = ema(closes, span=fast) - ema(closes, span=slow)
+    signal_line = ema(line, span=signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(closes, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+    """``(middle, upper, lower)`` bands: rolling mean +/- ``width`` population std devs."""
+    rolling = _frame(closes).rolling(window)
+    middle = rolling.mean().to_numpy()
+    spread = width * rolling.std(ddof=0).to_numpy()
+    return middle, middle + spread, middle - spread
+
+
+def percent_b(closes, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+    """Position within the bands: 0 at the lower band, 1 at the upper band."""
+    _, upper, lower = bollinger(closes, window, width)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = (np.asarray(closes) - lower) / (upper - lower)
+    return np.where(upper == lower, 0.5, value)
+
+
+def signal_labels(rsi_values, histogram, pct_b):
+    """Short text signal per symbol from the latest indicator values."""
+    labels = []
+    for r, h, b in zip(rsi_values.tolist(), histogram.tolist(), pct_b.tolist()):
+        parts = []
+        if r > RSI_OVERBOUGHT:
+            parts.append("RSI overbought")
+        elif r < RSI_OVERSOLD:
+            parts.append("RSI oversold")
+        if h > 0:
+            parts.append("MACD bullish")
+        elif h < 0:
+            parts.append("MACD bearish")
+        if b > 1:
+            parts.append("above upper band")
+        elif b < 0:
+            parts.append("below lower band")
+        labels.append("; ".join(parts) if parts else ("N/A" if np.isnan(r) else "Neutral"))
+    return labels
+
+
+def latest_indicators(closes, row=-1):
+    """
+    ``{column: array per symbol}`` with every indicator at ``row`` (by
+    default the last day), ready to be added to the performance table.
+    All NaN (signal "N/A") when there is no such row, e.g. nothing loaded.
+    """
+    closes = np.asarray(closes, dtype="float64")
+    if not -len(closes) <= row < len(closes):
+        missing = np.full(closes.shape[1], np.nan)
+        values = {column: missing.copy() for column in INDICATOR_COLUMNS}
+        values["Technical Signal"] = ["N/A"] * len(missing)
+        return values
+    line, signal_line, histogram = macd(closes)
+    rsi_values, pct_b = rsi(closes)[row], percent_b(closes)[row]
+    values = dict(zip(INDICATOR_COLUMNS, (rsi_values, line[row], signal_line[row], histogram[row], pct_b)))
+    values["Technical Signal"] = signal_labels(rsi_values, histogram[row], pct_b)
+    return values
@@ -0,0 +1,320 @@
+"""
+Incremental, append-only price store in front of a network provider.
+
+Layout under ``root``::
+
+    manifest.json          per symbol: first/last stored date, the earliest
+                           date covered, the end date it is up to date for
+                           (never later than the day it was fetched),
+                           and its chunk files
+    <SYMBOL>/000000.npy    structured date/close chunks (memory-mapped)
+    <SYMBOL>/000001.npy    ...
+
+``load_window`` first asks the upstream provider only for symbols whose
+manifest entry does not already cover the requested window, and only for the
+missing range; the new bars are appended as a new chunk. Once a symbol has
+more than ``compact_after`` chunks they are merged into one. The manifest and
+the series read so far are kept in memory per store directory, so a run
+where everything is up to date only checks whether ``manifest.json`` changed
+on disk. Several processes (say the app and a top-up) can share a store:
+the manifest is re-read whenever another process has replaced it, and every
+change to it is made under ``manifest.json.lock`` from the latest copy on
+disk. Morning top-up::
+
+    python -m portfolio_core.ingest NVDA AMD QCOM --store price_cache --api-key $ALPHAVANTAGE_API_KEY
+"""
+import argparse
+import datetime
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from portfolio_core.providers import HISTORY_MONTHS, PriceProvider, PriceSeries, window_start
+
+MANIFEST = "manifest.json"
+COMPACT_AFTER = 16
+# A lock file older than this is left over from a crashed process.
+LOCK_STALE_SECONDS = 60
+
+
+class _StoreState:
+    """Manifest and series cache shared by every store object on one directory."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.manifest = None
+        # (mtime, size, inode) of manifest.json when it was last read or written
+        self.stamp = None
+        self.series = {}
+        self.lock_depth = 0
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def _state_for(root):
+    with _states_lock:
+        return _states.setdefault(os.path.abspath(root), _StoreState())
+
+
+def _months_spanning(start_date, end_date):
+    """Whole months back from ``end_date`` needed to reach ``start_date``."""
+    return max(1, (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1)
+
+
+class IncrementalPriceStore(PriceProvider):
+    """Caches ``upstream``'s daily series on disk and only fetches new bars."""
+
+    def __init__(self, root, upstream, compact_after=COMPACT_AFTER):
+        super().__init__()
+        self.root = root
+        self.upstream = upstream
+        self.compact_after = compact_after
+        self.name = f"{upstream.name}+store"
+        self._state = _state_for(root)
+        # Symbols requested from upstream by the most recent update
+        self.fetched = []
+
+    # --- Manifest ---
+
+    @property
+    def manifest(self):
+        if self._state.manifest is None:
+            self.refresh()
+        return self._state.manifest
+
+    def refresh(self):
+        """Re-read the manifest if another process has replaced it since it was read."""
+        state = self._state
+        path = os.path.join(self.root, MANIFEST)
+        with state.lock:
+            stamp = _stamp(path)
+            if state.manifest is not None and stamp == state.stamp:
+                return
+            manifest = {}
+            if stamp is not None:
+                with open(path) as f:
+                    manifest = json.load(f)
+            old = state.manifest or {}
+            for symbol in list(state.series):
+                if manifest.get(symbol, {}).get("chunks") != old.get(symbol, {}).get("chunks"):
+                    del state.series[symbol]
+            state.manifest, state.stamp = manifest, stamp
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Hold the store's lock file (re-entrant within a process) and work on
+        the latest manifest.
+        """
+        state = self._state
+        path = os.path.join(self.root, MANIFEST + ".lock")
+        with state.lock:
+            if state.lock_depth == 0:
+                os.makedirs(self.root, exist_ok=True)
+                while True:
+                    try:
+                        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                        break
+                    except FileExistsError:
+                        try:
+                            if time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS:
+                                os.remove(path)
+                                continue
+                        except FileNotFoundError:
+                            continue
+                        time.sleep(0.05)
+            state.lock_depth += 1
+            try:
+                self.refresh()
+                yield
+            finally:
+                state.lock_depth -= 1
+                if state.lock_depth == 0:
+                    os.remove(path)
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+        self._state.stamp = _stamp(path)
+
+    def is_current(self, symbol, start_date, end_date):
+        entry = self.manifest.get(symbol)
+        return (entry is not None and entry["checked"] >= end_date.isoformat()
+                and entry["covered_from"] <= start_date.isoformat())
+
+    # --- Chunks ---
+
+    def _chunk_path(self, symbol, name):
+        return os.path.join(self.root, symbol, name)
+
+    def _append(self, symbol, entry, dates, closes):
+        os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+        name = f"{entry['next_chunk']:06d}.npy"
+        tmp = self._chunk_path(symbol, name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, PriceSeries(symbol, dates, closes).to_records())
+        os.replace(tmp, self._chunk_path(symbol, name))
+        entry["next_chunk"] += 1
+        entry["chunks"].append(name)
+        entry["rows"] += len(dates)
+        self._state.series.pop(symbol, None)
+
+    def read_series(self, symbol):
+        """Full stored series for ``symbol`` (sorted by date) or None."""
+        state = self._state
+        with state.lock:
+            if symbol in state.series:
+                return state.series[symbol]
+            entry = self.manifest.get(symbol)
+            if entry is None or not entry["chunks"]:
+                return None
+            try:
+                chunks = [np.load(self._chunk_path(symbol, name), mmap_mode="r") for name in entry["chunks"]]
+            except FileNotFoundError:
+                # Compacted by another process since the manifest was read
+                stamp = state.stamp
+                self.refresh()
+                if state.stamp == stamp:
+                    raise
+                return self.read_series(symbol)
+            records = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+            if len(chunks) > 1:
+                # Back-filled chunks can precede earlier ones.
+                records = records[np.argsort(records["date"], kind="stable")]
+            series = state.series[symbol] = PriceSeries.from_records(symbol, records)
+            return series
+
+    def compact(self, symbol):
+        """Merge a symbol's chunks into one file."""
+        with self._locked():
+            entry = self.manifest.get(symbol)
+            if entry is None or len(entry["chunks"]) <= 1:
+                return False
+            series = self.read_series(symbol)
+            old = list(entry["chunks"])
+            entry["chunks"], entry["rows"] = [], 0
+            self._append(symbol, entry, series.dates, series.closes)
+            self._save_manifest()
+            for name in old:
+                os.remove(self._chunk_path(symbol, name))
+            return True
+
+    # --- Loading ---
+
+    def update(self, symbols, end_date, months=HISTORY_MONTHS):
+        """
+        Bring ``symbols`` up to date for the window ending at ``end_date``.
+        Returns the symbols that had to be requested from upstream.
+        """
+        start_date = window_start(end_date, months)
+        state = self._state
+        with state.lock:
+            self.refresh()
+            stale = [s for s in dict.fromkeys(symbols) if not self.is_current(s, start_date, end_date)]
+            self.fetched = stale
+            if not stale:
+                return stale
+            need_from = end_date
+            for symbol in stale:
+                entry = self.manifest.get(symbol)
+                if entry is None or entry["last"] is None or entry["covered_from"] > start_date.isoformat():
+                    need_from = start_date
+                    break
+                need_from = min(need_from, datetime.date.fromisoformat(entry["last"]))
+            fetched = self.upstream.load_window(stale, end_date, _months_spanning(need_from, end_date))
+            checked = min(end_date, datetime.date.today()).isoformat()
+            compact = []
+            # Applied to the manifest as it is now on disk: another process
+            # may have stored some of these bars while they were fetched.
+            with self._locked():
+                for symbol in stale:
+                    if symbol in self.upstream.errors:
+                        self.errors[symbol] = self.upstream.errors[symbol]
+                        continue
+                    entry = self.manifest.setdefault(symbol, {
+                        "first": None, "last": None, "covered_from": start_date.isoformat(),
+                        "checked": "", "chunks": [], "next_chunk": 0, "rows": 0,
+                    })
+                    series = fetched.get(symbol)
+                    if series is not None and len(series):
+                        new = np.ones(len(series), dtype=bool)
+                        if entry["last"] is not None:
+                            new = ((series.dates > np.datetime64(entry["last"], "D"))
+                                   | (series.dates < np.datetime64(entry["first"], "D")))
+                        if new.any():
+                            self._append(symbol, entry, series.dates[new], series.closes[new])
+                            stored = self.read_series(symbol)
+                            entry["first"], entry["last"] = str(stored.dates[0]), str(stored.dates[-1])
+                    entry["covered_from"] = min(entry["covered_from"], start_date.isoformat())
+                    # Never mark days that have not happened yet as checked.
+                    entry["checked"] = max(entry["checked"], checked)
+                    if len(entry["chunks"]) > self.compact_after:
+                        compact.append(symbol)
+                self._save_manifest()
+                for symbol in compact:
+                    self.compact(symbol)
+            return stale
+
+    def load_window(self, symbols, end_date, months=HISTORY_MONTHS):
+        self.errors = {}
+        self.update(symbols, end_date, months)
+        start_date = window_start(end_date, months)
+        window = {}
+        for symbol in symbols:
+            series = self.read_series(symbol)
+            window[symbol] = None if series is None else series.window(start_date, end_date)
+            if symbol in self.errors and series is not None:
+                self.errors[symbol] += f" (using stored prices through {series.dates[-1]})"
+        return window
+
+    def load_series(self, symbol, start_date, end_date):
+        return self.load_window([symbol], end_date, _months_spanning(start_date, end_date)).get(symbol)
+
+
+def main(argv=None):
+    from portfolio_core.providers import AlphaVantageProvider
+
+    parser = argparse.ArgumentParser(description="Top up the incremental price store.")
+    parser.add_argument("symbols", nargs="*", help="Symbols to update (default: every stored symbol)")
+    parser.add_argument("--store", required=True, help="Store directory")
+    parser.add_argument("--api-key", default=os.environ.get("ALPHAVANTAGE_API_KEY"),
+                        help="Alpha Vantage key (default: $ALPHAVANTAGE_API_KEY)")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--months", type=int, default=HISTORY_MONTHS)
+    parser.add_argument("--compact", action="store_true", help="Merge every symbol's chunks afterwards")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or $ALPHAVANTAGE_API_KEY)")
+    store = IncrementalPriceStore(args.store, AlphaVantageProvider(args.api_key))
+    symbols = args.symbols or sorted(store.manifest)
+    fetched = store.update(symbols, args.end_date, args.months)
+    if args.compact:
+        for symbol in symbols:
+            store.compact(symbol)
+    for symbol, error in store.errors.items():
+        print(f"{symbol}: {error}", file=sys.stderr)
+    print(f"{len(fetched)} of {len(symbols)} symbols fetched, {len(store.errors)} failed", file=sys.stderr)
+    return 1 if store.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Hot-path instrumentation.
+
+``Instrumentation`` records wall time, call counts and (optionally) peak
+traced memory per named stage and per provider call, and cache hit/miss
+counters. A disabled instance costs next to nothing, so the
+app can always thread one through. ``Profiler`` runs a block under cProfile
+and returns the stats as text or as a ``.prof`` dump.
+"""
+import cProfile
+import functools
+import io
+import json
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# tracemalloc is process-global: it stays on while any Instrumentation uses it
+# and is only stopped if it was started here.
+_tracing_users = 0
+_tracing_started = False
+_tracing_lock = threading.Lock()
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+class Instrumentation:
+    """
+    Use as a context manager (or call ``stop``) so memory tracing is
+    released even when the instrumented code raises. Peak memory is
+    process-wide, so it also counts other sessions' allocations made at the
+    same time.
+    """
+
+    def __init__(self, enabled=True, track_memory=False):
+        self.enabled = enabled
+        self.track_memory = track_memory and enabled
+        self.stages = {}
+        self.calls = {}
+        self.caches = {}
+        self._tracing = False
+        # Peak of each open measurement, so nested ones do not hide the outer peak
+        self._peaks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _entry(self, table, name):
+        entry = table.get(name)
+        if entry is None:
+            entry = table[name] = {"calls": 0, "wall_s": 0.0, "max_wall_s": 0.0}
+        return entry
+
+    @contextmanager
+    def _measure(self, table, name):
+        if self.track_memory:
+            if not self._tracing:
+                _acquire_tracing()
+                self._tracing = True
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            self._peaks.append(0)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            entry = self._entry(table, name)
+            entry["calls"] += 1
+            entry["wall_s"] += elapsed
+            entry["max_wall_s"] = max(entry["max_wall_s"], elapsed)
+            if self.track_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                entry["peak_mem_kb"] = max(entry.get("peak_mem_kb", 0), (peak - base) // 1024)
+
+    def stage(self, name):
+        """
+        Time a block. With ``track_memory`` the peak memory allocated inside
+        the block (including nested stages and calls) is recorded too.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(self.stages, name)
+
+    def wrap(self, fn, name):
+        """Return ``fn`` wrapped to count calls, time and (with ``track_memory``) peak memory under ``name``."""
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self._measure(self.calls, name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def instrument_provider(self, provider):
+        """Record every ``load_window``/``load_series`` call on ``provider``."""
+        if self.enabled:
+            for method in ("load_window", "load_series"):
+                setattr(provider, method, self.wrap(getattr(provider, method), f"{provider.name}.{method}"))
+        return provider
+
+    def record_cache(self, name, cache):
+        """Snapshot hit/miss counters of an ``LRUCache``-like object."""
+        if self.enabled:
+            self.caches[name] = {"hits": cache.hits, "misses": cache.misses, "size": len(cache)}
+
+    def count(self, name, hits=0, misses=0):
+        """Add to hit/miss counters of a cache without its own counters."""
+        if self.enabled:
+            entry = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            entry["hits"] += hits
+            entry["misses"] += misses
+
+    def stop(self):
+        if self._tracing:
+            self._tracing = False
+            _release_tracing()
+
+    def to_dict(self):
+        return {"stages": self.stages, "calls": self.calls, "caches": self.caches}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def rows(self):
+        """Flat rows for display: one per stage and per instrumented call."""
+        rows = []
+        for kind, table in (("stage", self.stages), ("call", self.calls)):
+            for name, entry in table.items():
+                rows.append({"Kind": kind, "Name": name, **entry})
+        return rows
+
+
+class Profiler:
+    """Context manager that runs a block under cProfile."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.profile = cProfile.Profile() if enabled else None
+
+    def start(self):
+        if self.enabled:
+            self.profile.enable()
+
+    def stop(self):
+        if self.enabled:
+            self.profile.disable()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def stats_text(self, limit=40, sort="cumulative"):
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self):
+        """Stats in the ``.prof`` format read by ``pstats``/snakeviz."""
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
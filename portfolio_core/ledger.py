@@ -0,0 +1,488 @@
+"""
+Broker transaction-ledger import with FIFO cost-basis lots.
+
+A ledger is a CSV or Parquet file with one row per transaction:
+
+==========  ==========================================================
+date        trade date (a ledger must be in date order per symbol)
+symbol      ticker
+type        ``buy``, ``sell``, ``split`` or ``dividend``
+quantity    shares bought/sold; for splits the ratio (2 for 2-for-1); a buy
+            or sell of 0 shares is a fee-only row
+price       price per share (buys and sells of more than 0 shares)
+fees        optional commission, added to buys and taken from sells
+amount      optional cash amount for dividends (else quantity x price)
+ratio       optional split ratio (else ``quantity``)
+currency    optional, defaults to USD
+name        optional company name
+==========  ==========================================================
+
+The file is streamed in chunks (``read_csv(chunksize=...)`` or Parquet
+``iter_batches``) into per-symbol FIFO lot queues, so memory depends on the
+open lots and on one aggregated event per symbol and day inside the
+analysis window, not on the ledger size. Prices are taken as unadjusted,
+so share counts are not split-adjusted back in time. ::
+
+    python -m portfolio_core.ledger ledger.parquet --out reports/ --end-date 2025-06-27
+"""
+import argparse
+import collections
+import datetime
+import os
+import sys
+
+import numpy as np
+
+from portfolio_core.holdings import DEFAULT_CURRENCY
+
+LEDGER_TYPES = ("buy", "sell", "split", "dividend")
+BUY, SELL, SPLIT, DIVIDEND = range(4)
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Share quantities below this are treated as zero.
+EPSILON = 1e-9
+
+_TYPE_ALIASES = {
+    "buy": BUY, "bought": BUY, "purchase": BUY,
+    "sell": SELL, "sold": SELL, "sale": SELL,
+    "split": SPLIT, "stock split": SPLIT,
+    "dividend": DIVIDEND, "div": DIVIDEND, "cash dividend": DIVIDEND,
+}
+_COLUMN_ALIASES = {
+    "ticker": "symbol", "action": "type", "transaction": "type", "shares": "quantity",
+    "qty": "quantity", "commission": "fees", "fee": "fees", "stock": "name", "company": "name",
+}
+_KEY_BIAS = np.int64(2 ** 31)
+
+
+def read_ledger(source, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None):
+    """Yield DataFrames of at most ``chunk_rows`` rows from a ledger path or file object."""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    fmt = fmt or ("parquet" if str(name).endswith(".parquet") else "csv")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def _column(frame, name, default):
+    if name in frame:
+        return frame[name].to_numpy(dtype="float64", na_value=default)
+    return np.full(len(frame), default)
+
+
+def _normalize(frame, first_row=0):
+    """
+    Column arrays for one ledger chunk. Raises ValueError naming the first
+    row (counted from 1 over the whole ledger) with a missing required value.
+    """
+    frame = frame.rename(columns=lambda c: _COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+    missing = {"date", "symbol", "type"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"ledger is missing column(s): {', '.join(sorted(missing))}")
+    import pandas as pd
+    days = pd.to_datetime(frame["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    kinds = frame["type"].astype(str).str.strip().str.lower()
+    codes = kinds.map(_TYPE_ALIASES)
+    if codes.isna().any():
+        raise ValueError(f"unknown transaction type(s): {', '.join(sorted(set(kinds[codes.isna()])))}")
+    codes = codes.to_numpy(dtype=np.int64)
+    quantity = _column(frame, "quantity", np.nan)
+    price = _column(frame, "price", np.nan)
+    fees = _column(frame, "fees", 0.0)
+    amount = _column(frame, "amount", np.nan)
+    ratio = _column(frame, "ratio", np.nan)
+    ratio = np.where(np.isnan(ratio), quantity, ratio)
+    trade = (codes == BUY) | (codes == SELL)
+    with np.errstate(invalid="ignore"):
+        problems = (
+            (days == np.datetime64("NaT").astype(np.int64), "the date is missing"),
+            (frame["symbol"].isna().to_numpy(), "the symbol is missing"),
+            (trade & ~(quantity >= 0), "the quantity is missing or negative"),
+            (trade & (quantity > 0) & ~np.isfinite(price), "the price is missing"),
+            ((codes == SPLIT) & ~(ratio > 0), "the split ratio is missing"),
+            ((codes == DIVIDEND) & ~np.isfinite(amount) & ~np.isfinite(quantity * price),
+             "the dividend has neither an amount nor a quantity and price"),
+            (~np.isfinite(fees), "the fees are not a number"),
+        )
+    for bad, message in problems:
+        if bad.any():
+            i = int(np.argmax(bad))
+            raise ValueError(f"ledger row {first_row + i + 1} ({frame['symbol'].iloc[i]}, "
+                             f"{frame['date'].iloc[i]}): {message}")
+    return {
+        "day": days.tolist(),
+        "symbol": frame["symbol"].astype(str).str.strip().tolist(),
+        "kind": codes.tolist(),
+        "quantity": quantity.tolist(),
+        "price": price.tolist(),
+        "fees": fees.tolist(),
+        "amount": amount.tolist(),
+        "ratio": ratio.tolist(),
+        "currency": frame["currency"].fillna(DEFAULT_CURRENCY).astype(str).str.strip().str.upper()
+        .replace("", DEFAULT_CURRENCY).tolist() if "currency" in frame
+        else [DEFAULT_CURRENCY] * len(frame),
+        "name": frame["name"].tolist() if "name" in frame else [None] * len(frame),
+    }
+
+
+class Position:
+    """Open FIFO lots and running totals for one symbol."""
+
+    __slots__ = ("symbol", "name", "currency", "lots", "quantity", "realized", "dividends", "fees",
+                 "last_price", "last_day", "window_quantity", "event_days", "event_quantity", "event_flows")
+
+    def __init__(self, symbol, name, currency):
+        self.symbol = symbol
+        self.name = name
+        self.currency = currency
+        # Each lot is [quantity, cost per share, day]; the oldest lot is on the left.
+        self.lots = collections.deque()
+        self.quantity = 0.0
+        self.realized = 0.0
+        self.dividends = 0.0
+        self.fees = 0.0
+        self.last_price = np.nan
+        self.last_day = None
+        # Shares held when the analysis window starts, then one entry per
+        # day inside the window: shares held after the day and the net cash
+        # put in (buys positive, sales and dividends negative).
+        self.window_quantity = 0.0
+        self.event_days = []
+        self.event_quantity = []
+        self.event_flows = []
+
+    @property
+    def cost_basis(self):
+        return sum(q * c for q, c, _ in self.lots)
+
+    def buy(self, day, quantity, price, fees):
+        self.lots.append([quantity, (quantity * price + fees) / quantity, day])
+        self.quantity += quantity
+        self.fees += fees
+        return quantity * price + fees
+
+    def sell(self, day, quantity, price, fees):
+        if quantity > self.quantity + EPSILON:
+            raise ValueError(f"{self.symbol}: selling {quantity:g} shares on "
+                             f"{np.datetime64(day, 'D')} but only {self.quantity:g} are held")
+        remaining, cost = quantity, 0.0
+        while remaining > EPSILON:
+            lot = self.lots[0]
+            take = min(lot[0], remaining)
+            cost += take * lot[1]
+            lot[0] -= take
+            remaining -= take
+            if lot[0] <= EPSILON:
+                self.lots.popleft()
+        self.quantity = max(self.quantity - quantity, 0.0)
+        proceeds = quantity * price - fees
+        self.realized += proceeds - cost
+        self.fees += fees
+        return -proceeds
+
+    def fee(self, fees):
+        """A fee-only row (0 shares): an expense, no lot."""
+        self.realized -= fees
+        self.fees += fees
+        return fees
+
+    def split(self, ratio):
+        for lot in self.lots:
+            lot[0] *= ratio
+            lot[1] /= ratio
+        self.quantity *= ratio
+        return 0.0
+
+    def dividend(self, amount):
+        self.dividends += amount
+        return -amount
+
+    def record(self, day, window_day, flow):
+        if day <= window_day:
+            self.window_quantity = self.quantity
+        elif self.event_days and self.event_days[-1] == day:
+            self.event_quantity[-1] = self.quantity
+            self.event_flows[-1] += flow
+        else:
+            self.event_days.append(day)
+            self.event_quantity.append(self.quantity)
+            self.event_flows.append(flow)
+
+
+class LedgerBook:
+    """
+    Positions built from a ledger stream. ``window_start`` bounds how far
+    back per-day cash flows are kept for money-weighted returns.
+    """
+
+    def __init__(self, window_start=None):
+        self.window_day = (np.datetime64(window_start, "D").astype(np.int64) if window_start is not None
+                           else np.iinfo(np.int64).min)
+        self.positions = {}
+        self.rows = 0
+        # Currencies without FX rates in the last money_weighted_returns call
+        self.missing_currencies = []
+
+    def add(self, frame):
+        """Apply one chunk of ledger rows."""
+        columns = _normalize(frame, self.rows)
+        positions, window_day = self.positions, self.window_day
+        for day, symbol, kind, quantity, price, fees, amount, ratio, currency, name in zip(
+            columns["day"], columns["symbol"], columns["kind"], columns["quantity"], columns["price"],
+            columns["fees"], columns["amount"], columns["ratio"], columns["currency"], columns["name"],
+        ):
+            position = positions.get(symbol)
+            if position is None:
+                position = positions[symbol] = Position(symbol, name, currency)
+            elif day < position.last_day:
+                raise ValueError(f"{symbol}: ledger rows are not in date order at {np.datetime64(day, 'D')}")
+            if kind == BUY and quantity <= EPSILON:
+                flow = position.fee(fees)
+            elif kind == BUY:
+                flow = position.buy(day, quantity, price, fees)
+            elif kind == SELL:
+                flow = position.sell(day, quantity, price, fees)
+            elif kind == SPLIT:
+                flow = position.split(ratio)
+            else:
+                flow = position.dividend(amount if amount == amount else quantity * price)
+            if kind in (BUY, SELL) and quantity > EPSILON:
+                position.last_price = price
+            position.last_day = day
+            position.record(day, window_day, flow)
+        self.rows += len(columns["day"])
+        return self
+
+    def open_positions(self):
+        return [p for p in self.positions.values() if p.quantity > EPSILON]
+
+    def holdings_frame(self):
+        """Open positions in the app's portfolio columns (last trade price as current price)."""
+        import pandas as pd
+        positions = self.open_positions()
+        return pd.DataFrame({
+            "symbol": [p.symbol for p in positions],
+            "stock": [p.name if isinstance(p.name, str) and p.name else p.symbol for p in positions],
+            "current_price": [p.last_price for p in positions],
+            "shares": [p.quantity for p in positions],
+            "currency": [p.currency for p in positions],
+        })
+
+    def holdings(self):
+        from portfolio_core.holdings import Holdings
+        return Holdings.from_frame(self.holdings_frame())
+
+    def cost_basis_frame(self):
+        """Per-symbol cost basis, realized gains, dividends and fees (every symbol traded)."""
+        import pandas as pd
+        positions = list(self.positions.values())
+        cost = np.array([p.cost_basis for p in positions])
+        quantity = np.array([p.quantity for p in positions])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(quantity > EPSILON, cost / quantity, np.nan)
+        return pd.DataFrame({
+            "Symbol": [p.symbol for p in positions],
+            "Currency": [p.currency for p in positions],
+            "Shares Held": quantity,
+            "Cost Basis": cost,
+            "Average Cost": average,
+            "Realized Gain": [p.realized for p in positions],
+            "Dividends": [p.dividends for p in positions],
+            "Fees": [p.fees for p in positions],
+            "Open Lots": [len(p.lots) for p in positions],
+            "Oldest Lot": [np.datetime64(p.lots[0][2], "D") if p.lots else np.datetime64("NaT")
+                           for p in positions],
+        })
+
+    def _events(self, positions):
+        """Flat (symbol id, day, shares after, flow) arrays, grouped by symbol and sorted by day."""
+        counts = np.array([len(p.event_days) for p in positions], dtype=np.int64)
+        ids = np.repeat(np.arange(len(positions), dtype=np.int64), counts)
+        days = np.fromiter((d for p in positions for d in p.event_days), np.int64, counts.sum())
+        shares = np.fromiter((q for p in positions for q in p.event_quantity), np.float64, counts.sum())
+        flows = np.fromiter((f for p in positions for f in p.event_flows), np.float64, counts.sum())
+        return ids, days, shares, flows, np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    def money_weighted_returns(self, price_window, periods, end_date, fx=None, base_currency=None):
+        """
+        Money-weighted (internal rate of) return per symbol and period, in
+        percent over the period (not annualized; for a position opened
+        during the period, over the time it was held), plus the same for the
+        whole book in ``base_currency`` when ``fx`` is given. Returns
+        ``(frame, portfolio)`` with ``portfolio`` mapping period -> return.
+        Positions in a currency ``fx`` has no rates for are left out of the
+        book-level return and their currency listed in ``missing_currencies``.
+        Positions need the window to start no later than the longest period.
+        """
+        import pandas as pd
+        from portfolio_core.engine import lookup_prices, period_start_dates
+
+        positions = [p for p in self.positions.values() if p.window_quantity > EPSILON or p.event_days]
+        symbols = [p.symbol for p in positions]
+        start_dates = period_start_dates(periods, end_date)
+        dates = start_dates + [end_date]
+        prices = lookup_prices(price_window, symbols, dates)
+        ids, days, shares, flows, first = self._events(positions)
+        keys = (ids << 32) + (days + _KEY_BIAS)
+        base = np.array([p.window_quantity for p in positions])
+        n = len(positions)
+
+        def shares_at(date):
+            day = np.datetime64(date, "D").astype(np.int64)
+            query = (np.arange(n, dtype=np.int64) << 32) + (day + _KEY_BIAS)
+            pos = np.searchsorted(keys, query, side="right") - 1
+            found = pos >= first
+            return np.where(found, shares[np.maximum(pos, 0)] if len(shares) else 0.0, base)
+
+        end_day = np.datetime64(end_date, "D").astype(np.int64)
+        end_shares = shares_at(end_date)
+        end_values = np.where(end_shares > EPSILON, end_shares * prices[:, -1], 0.0)
+
+        convert = fx is not None and bool(base_currency)
+        self.missing_currencies = []
+        if convert:
+            codes, labels = pd.factorize(pd.Series([p.currency for p in positions], dtype=object), sort=True)
+            codes = np.asarray(codes)
+
+        frame = pd.DataFrame({"Symbol": symbols})
+        portfolio = {}
+        for j, (period, start) in enumerate(zip(periods, start_dates)):
+            start_day = np.datetime64(start, "D").astype(np.int64)
+            start_shares = shares_at(start)
+            start_values = np.where(start_shares > EPSILON, start_shares * prices[:, j], 0.0)
+            inside = (days > start_day) & (days <= end_day)
+            years = (end_day - start_day) / 365.25
+            tau = (end_day - days[inside]) / 365.25
+            frame[period] = irr_period_returns(start_values, end_values, ids[inside], flows[inside], tau, years) * 100
+            if convert:
+                # Book-level return: values and flows at each day's rate into base_currency
+                v0, v1, cf = start_values.copy(), end_values.copy(), flows[inside].copy()
+                flow_days = days[inside].astype("datetime64[D]")
+                for code, label in enumerate(labels):
+                    rows = codes == code
+                    in_rows = rows[ids[inside]]
+                    try:
+                        start_rate, end_rate = fx.rates_at(label, base_currency,
+                                                           np.array([start, end_date], dtype="datetime64[D]"))
+                        flow_rates = fx.rates_at(label, base_currency, flow_days[in_rows])
+                    except KeyError:
+                        if label not in self.missing_currencies:
+                            self.missing_currencies.append(label)
+                        start_rate = end_rate = flow_rates = np.nan
+                    v0[rows] *= start_rate
+                    v1[rows] *= end_rate
+                    cf[in_rows] *= flow_rates
+                # Positions without prices or rates are left out together with their flows.
+                priced = ~(np.isnan(v0) | np.isnan(v1))
+                keep = priced[ids[inside]]
+                value = irr_period_returns(np.array([v0[priced].sum()]), np.array([v1[priced].sum()]),
+                                           np.zeros(keep.sum(), dtype=np.int64), cf[keep], tau[keep], years)
+                portfolio[period] = float(value[0]) * 100
+        return frame, portfolio
+
+
+def irr_period_returns(start_values, end_values, ids, flows, tau, years, iterations=100):
+    """
+    Money-weighted return over a period of ``years`` for many positions at
+    once: the period growth ``G`` solving ``V0 G + sum(c_i G^(tau_i/T)) = V1``
+    (``tau_i`` = years from the flow to the period end). Solved in log space
+    by Newton steps, falling back to bisection whenever a step leaves the
+    bracket; flows are summed per position with ``bincount``. Returns
+    ``G - 1`` - or, for positions opened (``V0`` = 0) or closed (``V1`` =
+    0) during the period, the growth over the time they were held, from
+    the first flow and to the last flow respectively, rather than
+    compounded up to the whole period. NaN where nothing was invested, a
+    price is missing or no root lies between -99.9999% and +1,000,000%.
+    """
+    n = len(start_values)
+    v0, v1 = np.asarray(start_values, dtype="float64"), np.asarray(end_values, dtype="float64")
+    ids, flows = np.asarray(ids, dtype=np.int64), np.asarray(flows, dtype="float64")
+    u = np.asarray(tau, dtype="float64") / years if years > 0 else np.zeros(len(flows))
+    scale = np.bincount(ids, np.abs(flows), minlength=n) + np.abs(v0) + np.abs(v1)
+
+    def value(x):
+        grown = np.exp(x[ids] * u)
+        f = v0 * np.exp(x) + np.bincount(ids, flows * grown, minlength=n) - v1
+        df = v0 * np.exp(x) + np.bincount(ids, flows * u * grown, minlength=n)
+        return f, df
+
+    lo, hi = np.full(n, np.log(1e-6)), np.full(n, np.log(1e4))
+    f_lo, _ = value(lo)
+    f_hi, _ = value(hi)
+    bad = ~(scale > 0) | np.isnan(v0) | np.isnan(v1) | (years <= 0) | (np.sign(f_lo) == np.sign(f_hi))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Modified Dietz as the starting point
+        dietz = (v1 - v0 - np.bincount(ids, flows, minlength=n)) / (v0 + np.bincount(ids, flows * u, minlength=n))
+        x = np.clip(np.log1p(np.nan_to_num(dietz, nan=0.0, posinf=0.0, neginf=0.0).clip(-0.99)), lo, hi)
+        for _ in range(iterations):
+            f, df = value(x)
+            if np.max(np.where(bad, 0.0, np.abs(f) / np.where(scale > 0, scale, 1.0)), initial=0.0) < 1e-12:
+                break
+            below = np.sign(f) == np.sign(f_lo)
+            lo, f_lo = np.where(below, x, lo), np.where(below, f, f_lo)
+            hi = np.where(below, hi, x)
+            step = x - f / df
+            x = np.where((step > lo) & (step < hi), step, (lo + hi) / 2)
+    # Fraction of the period the position was held
+    opened, closed = np.where(v0 == 0, 0.0, 1.0), np.where(v1 == 0, 1.0, 0.0)
+    np.maximum.at(opened, ids, u)
+    np.minimum.at(closed, ids, u)
+    return np.where(bad, np.nan, np.expm1(x * (opened - closed)))
+
+
+def import_ledger(source, end_date=None, months=None, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None):
+    """
+    Stream ``source`` into a ``LedgerBook``. Per-day flows are kept from
+    ``months`` (default: the longest performance period) before ``end_date``.
+    """
+    from portfolio_core.providers import HISTORY_MONTHS, window_start
+    end_date = end_date or datetime.date.today()
+    book = LedgerBook(window_start(end_date, HISTORY_MONTHS if months is None else months))
+    for chunk in read_ledger(source, chunk_rows, fmt):
+        book.add(chunk)
+    return book
+
+
+def main(argv=None):
+    from portfolio_core.fx import make_fx
+    from portfolio_core.periods import PERFORMANCE_PERIODS
+    from portfolio_core.providers import make_provider
+
+    parser = argparse.ArgumentParser(description="Import a transaction ledger: holdings, cost basis and money-weighted returns.")
+    parser.add_argument("ledger", help="Ledger .csv or .parquet")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--prices", help="Local price store directory (mock prices when omitted)")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--fx-rates", help="Local FX rate file (mock constant rates when omitted)")
+    parser.add_argument("--base-currency", default=DEFAULT_CURRENCY)
+    args = parser.parse_args(argv)
+
+    book = import_ledger(args.ledger, args.end_date, chunk_rows=args.chunk_rows)
+    os.makedirs(args.out, exist_ok=True)
+    holdings_frame = book.holdings_frame()
+    holdings_frame.to_csv(os.path.join(args.out, "ledger_holdings.csv"), index=False)
+    book.cost_basis_frame().to_csv(os.path.join(args.out, "cost_basis.csv"), index=False)
+
+    holdings = book.holdings()
+    provider = make_provider(None, args.prices, holdings)
+    symbols = [p.symbol for p in book.positions.values() if p.window_quantity > EPSILON or p.event_days]
+    price_window = provider.load_window(symbols, args.end_date)
+    frame, portfolio = book.money_weighted_returns(price_window, PERFORMANCE_PERIODS, args.end_date,
+                                                   make_fx(args.fx_rates), args.base_currency)
+    frame.to_csv(os.path.join(args.out, "money_weighted_returns.csv"), index=False)
+    for currency in book.missing_currencies:
+        print(f"no FX rates for {currency}; its positions are left out of the portfolio return", file=sys.stderr)
+    print(f"{book.rows} ledger rows, {len(holdings_frame)} open positions -> {args.out}", file=sys.stderr)
+    for period, value in portfolio.items():
+        print(f"{period}: {value:.2f}% ({args.base_currency}, money-weighted)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""Performance period definitions shared by the app and the batch runner."""
+
+
+def months_before(months):
+    """Start-date function for a period of ``months`` ending at ``end_date``."""
+    def start_date(end_date):
+        from dateutil.relativedelta import relativedelta # deferred: keeps import cheap
+        return end_date - relativedelta(months=months)
+    return start_date
+
+
+PERIOD_MONTHS = {
+    "Last 3 Months (Q4)": 3,
+    "Last 6 Months (Q3-Q4)": 6,
+    "Last 9 Months (Q2-Q4)": 9,
+    "Last 12 Months (Q1-Q4)": 12,
+    "Last 18 Months": 18,
+    "Last 24 Months": 24,
+    "Last 36 Months": 36,
+}
+
+# We'll use the selected analysis_end_date as 'today' for calculations
+PERFORMANCE_PERIODS = {name: months_before(months) for name, months in PERIOD_MONTHS.items()}
+
+PERIOD_12M = "Last 12 Months (Q1-Q4)"
+PERIOD_3M = "Last 3 Months (Q4)"
@@ -0,0 +1,264 @@
+"""
+Monte Carlo projection of the portfolio over the long term (30 years by default).
+
+Monthly log returns of the holdings are modelled as multivariate normal, with
+the mean vector and covariance estimated from their daily price history
+(``estimate_parameters``). ``project`` simulates many paths at the current
+weights, rebalanced monthly or bought and held, and summarizes them as
+percentile bands per year and drawdown probabilities per 10-year block.
+A monthly rebalanced book has fixed weights, so its monthly gross return is
+simulated directly as one lognormal with the same mean and variance
+(``portfolio_moments``): one draw per path and month instead of one per
+holding. Buy-and-hold paths simulate every holding.
+
+Paths are simulated in blocks of ``BLOCK_PATHS``, each with its own generator
+spawned from one ``SeedSequence``. Within a block, returns are drawn a slice
+of months at a time, sized so the (months x paths x assets) arrays stay within
+``memory_budget``, and summed month by month from the level carried over from
+the previous slice. A seed therefore gives bit-identical results for any
+memory budget and number of workers.
+With ``workers`` > 1 the blocks run in a ``ProcessPoolExecutor``::
+
+    python -m portfolio_core.projection portfolio.csv --prices price_store --months 120 \\
+        --paths 50000 --seed 42 --workers 4 --out bands.csv
+"""
+import argparse
+import datetime
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from portfolio_core.analytics import price_matrix
+
+PROJECTION_YEARS = 30
+MONTHS_PER_YEAR = 12
+BLOCK_PATHS = 1024
+DEFAULT_MEMORY_BUDGET = 64 << 20
+PERCENTILES = (5, 25, 50, 75, 95)
+DRAWDOWN_LEVELS = (0.2, 0.3, 0.5)
+# Length of the blocks drawdown probabilities are reported for ("think in 10-year blocks")
+DECADE_YEARS = 10
+
+# Model shared by the worker processes; set by _init_worker.
+_shared = None
+
+
+def estimate_parameters(dates, closes):
+    """
+    Mean vector and covariance of monthly log returns from a (days x assets)
+    matrix of daily closes without gaps (see ``backtest.prepare``), sampled
+    at each month's last trading day. Returns ``(mean, cov, months)``;
+    ``ValueError`` when there are no assets or fewer than three months.
+    """
+    closes = np.asarray(closes, dtype="float64")
+    months = np.asarray(dates, dtype="datetime64[D]").astype("datetime64[M]")
+    if closes.shape[1] == 0:
+        raise ValueError("no holdings with prices to estimate returns from")
+    if len(np.unique(months)) < 3:
+        raise ValueError("at least three months of prices are needed to estimate returns")
+    last = np.flatnonzero(np.append(months[1:] != months[:-1], True))
+    returns = np.diff(np.log(closes[last]), axis=0)
+    return returns.mean(axis=0), np.atleast_2d(np.cov(returns, rowvar=False)), len(returns)
+
+
+def _factor(cov):
+    """Matrix ``A`` with ``A @ A.T == cov``; falls back to eigenvalues for singular covariances."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def portfolio_moments(mean, cov, weights):
+    """
+    ``(mean, variance)`` of the lognormal matching the mean and variance of
+    a monthly rebalanced portfolio's gross return ``sum(w_i exp(r_i))``.
+    """
+    mean, cov, weights = (np.asarray(a, dtype="float64") for a in (mean, cov, weights))
+    var = np.diag(cov)
+    growth = weights * np.exp(mean + var / 2)
+    expected = growth.sum()
+    variance = growth @ np.expm1(cov) @ growth
+    log_variance = np.log1p(variance / expected ** 2)
+    return np.log(expected) - log_variance / 2, log_variance
+
+
+def _slice_months(paths, assets, memory_budget):
+    # About three (months x paths x assets) float temporaries are alive at once.
+    return max(1, int(memory_budget // (3 * 8 * paths * max(assets, 1))))
+
+
+def simulate_block(seed, paths, mean, factor, weights, years=PROJECTION_YEARS,
+                   memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Simulate ``paths`` buy-and-hold paths from one ``SeedSequence`` (or int)
+    ``seed``: monthly log returns ``mean + factor @ z``. Returns ``(values,
+    drawdowns)``: the (paths x years + 1) value at each year end, starting
+    at 1, and the (paths x decades) deepest drawdown from the running peak
+    within each ``DECADE_YEARS`` block, as fractions.
+    """
+    rng = np.random.Generator(np.random.PCG64(seed))
+    n_months = years * MONTHS_PER_YEAR
+    decades = -(-years // DECADE_YEARS)
+    step = _slice_months(paths, len(weights), memory_budget)
+
+    values = np.empty((paths, years + 1))
+    values[:, 0] = 1.0
+    drawdowns = np.zeros((paths, decades))
+    peak = np.ones(paths)
+    # Cumulative log return of each holding so far
+    level = np.zeros((1, paths, len(weights)))
+    for start in range(0, n_months, step):
+        k = min(step, n_months - start)
+        # Drawn months-first, and summed on from the carried level in month
+        # order, so the results do not depend on the slice size at all.
+        steps = mean + rng.standard_normal((k, paths, len(weights))) @ factor.T
+        levels = np.cumsum(np.concatenate([level, steps]), axis=0)[1:]
+        path = (weights * np.exp(levels)).sum(axis=2)
+        level = levels[-1:]
+        peaks = np.maximum(peak, np.maximum.accumulate(path, axis=0))
+        depth = 1 - path / peaks
+        month = np.arange(start, start + k)
+        decade = month // (DECADE_YEARS * MONTHS_PER_YEAR)
+        for d in np.unique(decade):
+            drawdowns[:, d] = np.maximum(drawdowns[:, d], depth[decade == d].max(axis=0))
+        year_end = (month + 1) % MONTHS_PER_YEAR == 0
+        values[:, (month[year_end] + 1) // MONTHS_PER_YEAR] = path[year_end].T
+        peak = peaks[-1]
+    return values, drawdowns
+
+
+def _init_worker(mean, factor, weights, years, memory_budget):
+    global _shared
+    _shared = (mean, factor, weights, years, memory_budget)
+
+
+def _run_block(task):
+    seed, paths = task
+    return simulate_block(seed, paths, *_shared)
+
+
+class Projection:
+    """Simulated year-end values (multiples of today's value) and drawdowns of every path."""
+
+    def __init__(self, values, drawdowns, entropy, months_observed=None):
+        self.values = values
+        self.drawdowns = drawdowns
+        # SeedSequence entropy: pass it back as ``seed`` to reproduce the run.
+        self.entropy = entropy
+        self.months_observed = months_observed
+
+    @property
+    def years(self):
+        return self.values.shape[1] - 1
+
+    def bands_frame(self, percentiles=PERCENTILES):
+        """Value percentiles at each year end."""
+        import pandas as pd
+        bands = np.percentile(self.values, percentiles, axis=0)
+        frame = pd.DataFrame({f"P{p}": band for p, band in zip(percentiles, bands)})
+        frame.insert(0, "Year", np.arange(self.years + 1))
+        return frame
+
+    def drawdown_frame(self, levels=DRAWDOWN_LEVELS):
+        """Probability (percent) of a drawdown of at least each level, per 10-year block and overall."""
+        import pandas as pd
+        columns = {"Drawdown": [f"≥ {level:.0%}" for level in levels]}
+        for d in range(self.drawdowns.shape[1]):
+            first, last = d * DECADE_YEARS + 1, min((d + 1) * DECADE_YEARS, self.years)
+            columns[f"Years {first}-{last}"] = [(self.drawdowns[:, d] >= level).mean() * 100 for level in levels]
+        deepest = self.drawdowns.max(axis=1)
+        columns[f"Any time ({self.years} years)"] = [(deepest >= level).mean() * 100 for level in levels]
+        return pd.DataFrame(columns)
+
+    def summary(self):
+        """Median CAGR and the chance of ending below today's value, per decade mark."""
+        marks = [y for y in range(DECADE_YEARS, self.years + 1, DECADE_YEARS)] or [self.years]
+        return {
+            "paths": len(self.values),
+            "median_cagr": (np.median(self.values[:, -1]) ** (1 / self.years) - 1) * 100 if self.years else np.nan,
+            "loss_probability": {y: (self.values[:, y] < 1).mean() * 100 for y in marks},
+        }
+
+
+def project(mean, cov, weights, paths=10_000, years=PROJECTION_YEARS, seed=None, rebalance=True,
+            memory_budget=DEFAULT_MEMORY_BUDGET, workers=1, months_observed=None):
+    """Simulate ``paths`` paths for the model ``(mean, cov)`` at ``weights``; see ``Projection``."""
+    weights = np.asarray(weights, dtype="float64")
+    if rebalance:
+        log_mean, log_variance = portfolio_moments(mean, cov, weights)
+        mean, cov, weights = np.array([log_mean]), np.array([[log_variance]]), np.ones(1)
+    factor = _factor(np.atleast_2d(np.asarray(cov, dtype="float64")))
+    sequence = np.random.SeedSequence(seed)
+    sizes = [min(BLOCK_PATHS, paths - i) for i in range(0, paths, BLOCK_PATHS)]
+    tasks = list(zip(sequence.spawn(len(sizes)), sizes))
+    initargs = (np.asarray(mean, dtype="float64"), factor, weights, years, memory_budget)
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(*initargs)
+        blocks = [_run_block(task) for task in tasks]
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            blocks = list(pool.map(_run_block, tasks))
+    values = np.concatenate([b[0] for b in blocks]) if blocks else np.ones((0, years + 1))
+    drawdowns = np.concatenate([b[1] for b in blocks]) if blocks else np.zeros((0, -(-years // DECADE_YEARS)))
+    return Projection(values, drawdowns, sequence.entropy, months_observed)
+
+
+def main(argv=None):
+    import pandas as pd
+    from portfolio_core.backtest import current_weights, prepare
+    from portfolio_core.fx import convert_matrix, make_fx
+    from portfolio_core.holdings import DEFAULT_CURRENCY, Holdings
+    from portfolio_core.providers import make_provider
+
+    parser = argparse.ArgumentParser(description="Monte Carlo projection of a portfolio.")
+    parser.add_argument("portfolio", help="Portfolio .csv/.parquet with the app's columns")
+    parser.add_argument("--prices", help="Local price store directory (mock prices when omitted)")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--months", type=int, default=60, help="History to estimate from (default: 60)")
+    parser.add_argument("--paths", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=PROJECTION_YEARS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--buy-and-hold", action="store_true", help="Do not rebalance to the current weights monthly")
+    parser.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_BUDGET / (1 << 20))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--fx-rates", help="Local FX rate file (mock constant rates when omitted)")
+    parser.add_argument("--base-currency", default=DEFAULT_CURRENCY)
+    parser.add_argument("--out", help="Write the percentile bands CSV here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    path = args.portfolio
+    frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    holdings = Holdings.from_frame(frame).active()
+    provider = make_provider(None, args.prices, holdings)
+    symbols = list(holdings.symbols)
+    dates, closes = price_matrix(provider.load_window(symbols, args.end_date, args.months), symbols)
+    closes, missing = convert_matrix(make_fx(args.fx_rates), closes, holdings.currency_codes,
+                                     holdings.currency_labels, args.base_currency, dates)
+    for currency in missing:
+        print(f"no FX rates for {currency}; its holdings are left out", file=sys.stderr)
+    dates, closes, weights, dropped = prepare(dates, closes, current_weights(holdings, closes), symbols)
+    if dropped:
+        print(f"left out (no prices): {', '.join(dropped)}", file=sys.stderr)
+    mean, cov, observed = estimate_parameters(dates, closes)
+    result = project(mean, cov, weights, args.paths, args.years, args.seed, not args.buy_and_hold,
+                     int(args.memory_mb * (1 << 20)), args.workers, observed)
+    print(result.drawdown_frame().to_string(index=False), file=sys.stderr)
+    summary = result.summary()
+    print(f"{summary['paths']} paths from {observed} months of returns; median CAGR {summary['median_cagr']:.2f}%; "
+          f"seed entropy {result.entropy}", file=sys.stderr)
+    text = result.bands_frame().to_csv(index=False)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text, end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
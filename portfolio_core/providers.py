@@ -0,0 +1,352 @@
+"""
+Price providers for the portfolio analyzer.
+
+Every provider returns a full daily ``PriceSeries`` per symbol. The analysis
+loads each symbol's window once (``HISTORY_MONTHS`` back from the analysis end
+date) and reads every period's start/end price from that in-memory series,
+instead of asking the provider once per period.
+"""
+import json
+import os
+import urllib.parse
+
+import numpy as np
+
+# Longest performance period is 36 months; load that much history per symbol.
+HISTORY_MONTHS = 36
+
+SERIES_DTYPE = np.dtype([("date", "datetime64[D]"), ("close", "float64")])
+
+
+def window_start(end_date, months=HISTORY_MONTHS):
+    from dateutil.relativedelta import relativedelta # deferred: keeps import cheap
+    return end_date - relativedelta(months=months)
+
+
+class PriceSeries:
+    """Daily closing prices for a single symbol, sorted by date."""
+
+    __slots__ = ("symbol", "dates", "closes")
+
+    def __init__(self, symbol, dates, closes):
+        self.symbol = symbol
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.closes = np.asarray(closes, dtype="float64")
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_records(cls, symbol, records):
+        return cls(symbol, records["date"], records["close"])
+
+    def to_records(self):
+        records = np.empty(len(self), dtype=SERIES_DTYPE)
+        records["date"] = self.dates
+        records["close"] = self.closes
+        return records
+
+    def window(self, start_date, end_date):
+        """
+        Sub-series for ``start_date``..``end_date``. The last close before
+        ``start_date`` is kept so a period starting on a non-trading day
+        still has a start price.
+        """
+        lo = np.searchsorted(self.dates, np.datetime64(start_date, "D"), side="right") - 1
+        hi = np.searchsorted(self.dates, np.datetime64(end_date, "D"), side="right")
+        lo = max(lo, 0)
+        return PriceSeries(self.symbol, self.dates[lo:hi], self.closes[lo:hi])
+
+    def prices_at(self, dates):
+        """Closing price on or before each date (NaN when the series starts later)."""
+        idx = np.searchsorted(self.dates, np.asarray(dates, dtype="datetime64[D]"), side="right") - 1
+        out = np.full(idx.shape, np.nan)
+        valid = idx >= 0
+        out[valid] = self.closes[idx[valid]]
+        return out
+
+    def price_at(self, date):
+        price = self.prices_at([date])[0]
+        return None if np.isnan(price) else float(price)
+
+
+class PriceProvider:
+    """
+    Base class for price providers.
+
+    Subclasses implement ``load_series``; the rest of the app only uses
+    ``load_window`` (one load per symbol) and, for one-off lookups,
+    ``get_historical_data``.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        # symbol -> error message from the most recent load_window call
+        self.errors = {}
+
+    def load_series(self, symbol, start_date, end_date):
+        """Return a ``PriceSeries`` covering ``start_date``..``end_date`` or None."""
+        raise NotImplementedError
+
+    def load_window(self, symbols, end_date, months=HISTORY_MONTHS):
+        """
+        Load each distinct symbol's full history window once. A symbol that
+        fails to load maps to None and its error is kept in ``self.errors``.
+        """
+        start_date = window_start(end_date, months)
+        self.errors = {}
+        window = {}
+        for symbol in symbols:
+            if symbol in window:
+                continue
+            try:
+                window[symbol] = self.load_series(symbol, start_date, end_date)
+            except (OSError, ValueError) as e:
+                window[symbol] = None
+                self.errors[symbol] = str(e)
+        return window
+
+    def get_historical_data(self, symbol, start_date, end_date):
+        series = self.load_series(symbol, start_date, end_date)
+        if series is None or len(series) == 0:
+            return None
+        return {"start_price": series.price_at(start_date), "end_price": series.price_at(end_date)}
+
+
+class LocalPriceStore(PriceProvider):
+    """
+    On-disk store with one daily series per symbol.
+
+    ``<root>/<SYMBOL>.npy`` files (structured ``date``/``close`` arrays) are
+    memory-mapped, so reading a window never copies the whole file. Plain
+    ``<SYMBOL>.parquet`` or ``<SYMBOL>.csv`` files with ``date`` and ``close``
+    columns are accepted too, which is handy for offline test data.
+    """
+
+    name = "local"
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+
+    def _path(self, symbol, ext):
+        return os.path.join(self.root, f"{symbol}.{ext}")
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted({os.path.splitext(f)[0] for f in os.listdir(self.root)
+                       if f.endswith((".npy", ".parquet", ".csv"))})
+
+    def read_series(self, symbol):
+        """Return the full stored series for ``symbol`` or None."""
+        path = self._path(symbol, "npy")
+        if os.path.exists(path):
+            return PriceSeries.from_records(symbol, np.load(path, mmap_mode="r"))
+        for ext in ("parquet", "csv"):
+            path = self._path(symbol, ext)
+            if os.path.exists(path):
+                import pandas as pd
+                frame = pd.read_parquet(path) if ext == "parquet" else pd.read_csv(path)
+                frame = frame.sort_values("date")
+                return PriceSeries(symbol, pd.to_datetime(frame["date"]).values.astype("datetime64[D]"),
+                                   frame["close"].to_numpy(dtype="float64"))
+        return None
+
+    def load_series(self, symbol, start_date, end_date):
+        series = self.read_series(symbol)
+        if series is None:
+            return None
+        return series.window(start_date, end_date)
+
+    def write_series(self, series):
+        """Store ``series`` as a memory-mappable ``.npy`` file."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(series.symbol, "npy.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, series.to_records())
+        os.replace(tmp, self._path(series.symbol, "npy"))
+
+
+class NetworkPriceProvider(PriceProvider):
+    """
+    Base class for HTTP JSON providers.
+
+    ``load_window`` fetches all symbols concurrently through
+    ``portfolio_core.fetch.AsyncFetcher`` (pooled connections, batching,
+    rate limiting and retries). Subclasses describe the API with
+    ``request_url``, ``parse`` and ``is_throttled``; providers with the same
+    ``rate_limit_key`` share one rate limit across calls and sessions.
+    """
+
+    # Symbols per request; 1 when the API has no batch endpoint.
+    batch_size = 1
+    requests_per_minute = 60
+    burst = 1
+    max_connections = 4
+
+    def __init__(self, base_url=None, timeout=30):
+        super().__init__()
+        if base_url:
+            self.base_url = base_url
+        self.timeout = timeout
+        # Date range the current load needs; lets request_url ask for less history.
+        self.history_start = None
+        self.history_end = None
+
+    def request_url(self, symbols):
+        raise NotImplementedError
+
+    def parse(self, symbols, payload):
+        """Return ``{symbol: PriceSeries}`` for a decoded JSON response."""
+        raise NotImplementedError
+
+    def is_throttled(self, payload):
+        return False
+
+    def rate_limit_key(self):
+        """Requests with equal keys count against the same limit."""
+        return (self.name, self.base_url)
+
+    def load_series(self, symbol, start_date, end_date):
+        import time
+        import urllib.request
+        from portfolio_core.fetch import provider_bucket
+        self.history_start, self.history_end = start_date, end_date
+        time.sleep(provider_bucket(self).reserve())
+        with urllib.request.urlopen(self.request_url([symbol]), timeout=self.timeout) as resp:
+            payload = json.load(resp)
+        if self.is_throttled(payload):
+            raise ValueError(f"Rate limited while fetching {symbol}")
+        series = self.parse([symbol], payload).get(symbol)
+        return None if series is None else series.window(start_date, end_date)
+
+    def load_window(self, symbols, end_date, months=HISTORY_MONTHS):
+        from portfolio_core.fetch import fetch_all
+        start_date = window_start(end_date, months)
+        self.history_start, self.history_end = start_date, end_date
+        fetched, self.errors = fetch_all(
+            self, symbols, max_connections=self.max_connections, timeout=self.timeout
+        )
+        return {symbol: None if series is None else series.window(start_date, end_date)
+                for symbol, series in fetched.items()}
+
+
+class AlphaVantageProvider(NetworkPriceProvider):
+    """Alpha Vantage daily closes (``TIME_SERIES_DAILY``), one symbol per request."""
+
+    name = "alphavantage"
+    base_url = "https://www.alphavantage.co/query"
+    # Free-tier keys allow 5 requests per minute.
+    requests_per_minute = 5
+    burst = 5
+    # "compact" responses hold the latest 100 trading days (about 140 calendar
+    # days back from today); enough for short top-ups.
+    COMPACT_DAYS = 140
+
+    def __init__(self, api_key, base_url=None, timeout=30):
+        super().__init__(base_url, timeout)
+        self.api_key = api_key
+
+    def rate_limit_key(self):
+        # Alpha Vantage limits each API key.
+        return super().rate_limit_key() + (self.api_key,)
+
+    def request_url(self, symbols):
+        query = urllib.parse.urlencode({
+            "function": "TIME_SERIES_DAILY",
+            "symbol": symbols[0],
+            "outputsize": self._output_size(),
+            "apikey": self.api_key,
+        })
+        return f"{self.base_url}?{query}"
+
+    def _output_size(self):
+        """"compact" only when the whole requested range lies inside the latest 100 trading days."""
+        import datetime
+        if self.history_start is None or self.history_end is None:
+            return "full"
+        # A compact response always ends today: the window must be short and
+        # end recently enough to fall inside it.
+        short = (self.history_end - self.history_start).days <= self.COMPACT_DAYS
+        recent = (datetime.date.today() - self.history_start).days <= self.COMPACT_DAYS
+        return "compact" if short and recent else "full"
+
+    def is_throttled(self, payload):
+        return "Time Series (Daily)" not in payload and ("Note" in payload or "Information" in payload)
+
+    def parse(self, symbols, payload):
+        symbol = symbols[0]
+        daily = payload.get("Time Series (Daily)")
+        if not daily:
+            message = payload.get("Error Message") or payload.get("Note") or payload.get("Information")
+            raise ValueError(f"No daily series for {symbol}: {message}")
+        dates = sorted(daily)
+        return {symbol: PriceSeries(symbol, dates, [float(daily[d]["4. close"]) for d in dates])}
+
+
+class MockPriceProvider(PriceProvider):
+    """
+    *** MOCK: does NOT fetch real data. ***
+
+    Builds a synthetic daily series per symbol from its current price so the
+    app works without an API key or a local store. The series steps through
+    fixed price levels at the mock breakpoints and ends at the current price.
+    """
+
+    name = "mock"
+
+    def __init__(self, holdings):
+        super().__init__()
+        # Current prices are read straight from the holdings store.
+        self.holdings = holdings
+
+    def load_series(self, symbol, start_date, end_date):
+        reference = self.holdings.price_of(symbol) if self.holdings is not None else None
+        if reference is None:
+            return None # Should not happen if data is well-formed
+        current_p, currency = reference
+        dates = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        closes = self._levels(symbol, currency, current_p, dates)
+        if len(closes):
+            closes[-1] = current_p
+        return PriceSeries(symbol, dates, closes)
+
+    @staticmethod
+    def _levels(symbol, currency, current_p, dates):
+        d36, d24, d12, d3 = (np.datetime64(d, "D") for d in
+                             ("2022-06-27", "2023-06-27", "2024-06-27", "2025-03-27"))
+        if symbol == "NVDA":
+            conds = [dates <= d36, dates <= d24, dates <= d12, dates <= d3]
+            levels = [50.0, 80.0, 120.0, 140.0]
+            default = 0.98 * current_p
+        elif symbol == "BABA":
+            conds = [dates <= d36, dates <= d24, dates <= d12]
+            levels = [90.0, 100.0, 110.0]
+            default = 0.99 * current_p
+        elif currency == "KES": # Kenyan Stocks
+            conds = [dates <= d36]
+            levels = [current_p * 0.8]
+            default = current_p * 0.95
+        else: # Generic mock for other stocks
+            conds = [dates <= d36, dates <= d24, dates <= d12]
+            levels = [0.7 * current_p, 0.85 * current_p, 0.95 * current_p]
+            default = 0.98 * current_p
+        return np.select(conds, levels, default=default).astype("float64")
+
+
+def make_provider(api_key=None, store_dir=None, holdings=None, cache_dir=None):
+    """
+    Pick a provider: an API key selects the network provider (behind an
+    incremental on-disk cache when ``cache_dir`` is given), an existing local
+    store directory selects the on-disk store, otherwise mock data.
+    """
+    if api_key:
+        if cache_dir:
+            from portfolio_core.ingest import IncrementalPriceStore
+            return IncrementalPriceStore(cache_dir, AlphaVantageProvider(api_key))
+        return AlphaVantageProvider(api_key)
+    if store_dir and os.path.isdir(store_dir):
+        return LocalPriceStore(store_dir)
+    return MockPriceProvider(holdings)
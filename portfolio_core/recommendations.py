@@ -0,0 +1,59 @@
+"""
+Rule-of-thumb recommendations from numeric period returns.
+
+The thresholds and texts come from the rule file (see
+``portfolio_core.rules``); it is compiled once per file version.
+"""
+import functools
+import os
+
+import numpy as np
+
+from portfolio_core.periods import PERFORMANCE_PERIODS, PERIOD_12M
+from portfolio_core.rules import DEFAULT_RULES, RuleSet
+
+
+@functools.lru_cache(maxsize=8)
+def _compiled(path, mtime, period_names):
+    return RuleSet.load(path, period_names)
+
+
+def default_rules(period_names=None, path=None):
+    """``RuleSet`` for ``path`` (default: ``PORTFOLIO_RULES`` or the bundled file), recompiled when it changes."""
+    path = os.path.abspath(path or os.environ.get("PORTFOLIO_RULES") or DEFAULT_RULES)
+    names = tuple(PERFORMANCE_PERIODS if period_names is None else period_names)
+    return _compiled(path, os.path.getmtime(path), names)
+
+
+def get_recommendation(performance_data, rules=None):
+    """performance_data maps period name -> numeric % return (NaN when N/A)."""
+    rules = rules or default_rules()
+    row = [performance_data.get(name, np.nan) for name in rules.period_names]
+    _, texts = rules.classify(np.array([row], dtype="float64"))
+    return texts[0]
+
+
+def get_portfolio_recommendation(weighted_12m, rules=None):
+    """
+    Overall advice from the weighted 12-month portfolio return.
+    Returns ``(level, text)`` where level is "success", "info" or "warning".
+    """
+    rules = rules or default_rules()
+    row = np.full((1, len(rules.period_names)), np.nan)
+    row[0, rules.period_names.index(PERIOD_12M)] = weighted_12m
+    levels, _, texts = rules.classify_portfolios(row)
+    return levels[0], texts[0]
+
+
+def recommend_all(result, rules=None):
+    """Per-holding recommendation text for an ``AnalysisResult``, all rows at once."""
+    rules = rules or default_rules(result.period_names)
+    _, texts = rules.classify(result.returns)
+    return list(texts)
+
+
+def recommend_portfolio(result, rules=None):
+    """``(level, text)`` for an ``AnalysisResult``'s weighted returns."""
+    rules = rules or default_rules(result.period_names)
+    levels, _, texts = rules.classify_portfolios(result.weighted_returns[None, :])
+    return levels[0], texts[0]
@@ -0,0 +1,286 @@
+"""
+Portfolio risk: covariance, correlation, volatility, risk contributions and VaR.
+
+``RiskModel`` keeps exponentially weighted moment sums of the holdings'
+daily log returns::
+
+    S0 = sum(w_t)    S1 = sum(w_t x_t)    S2 = sum(w_t x_t x_t')    w_t = decay ** age
+
+so the covariance is ``S2/S0 - m m'`` with ``m = S1/S0``. ``decay`` 0.94 is
+the RiskMetrics EWMA estimator; ``decay`` 1 gives the plain sample
+covariance. Building from history is one weighted matrix product. After
+that the model is updated incrementally:
+
+* a new day of returns is a rank-1 update of ``S2`` (O(n^2), not
+  O(days x n^2)),
+* a new symbol adds one row and column from its returns against the stored
+  history (O(days x n)); a removed symbol drops its row and column,
+* ``sync`` brings a model up to a new price matrix with exactly those steps
+  and only rebuilds when the histories do not line up.
+
+Portfolio figures are annualized with ``TRADING_DAYS``; VaR is reported as a
+positive loss fraction.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+from portfolio_core.analytics import TRADING_DAYS
+
+RISKMETRICS_DECAY = 0.94
+VAR_CONFIDENCE = (0.95, 0.99)
+
+
+def log_returns(closes):
+    """(days - 1 x assets) daily log returns of a price matrix without gaps."""
+    return np.diff(np.log(np.asarray(closes, dtype="float64")), axis=0)
+
+
+class RiskModel:
+    """Incrementally updated EWMA (or sample) moments of daily log returns."""
+
+    def __init__(self, symbols, decay=RISKMETRICS_DECAY):
+        if not 0 < decay <= 1:
+            raise ValueError(f"decay must be in (0, 1], got {decay!r}")
+        self.decay = decay
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.s0 = 0.0
+        self.s1 = np.zeros(n)
+        self.s2 = np.zeros((n, n))
+        # Return history (needed to add symbols and for historical VaR);
+        # rows beyond ``len(self.dates)`` are spare capacity.
+        self.dates = np.array([], dtype="datetime64[D]")
+        self._returns = np.empty((0, n))
+        self.last_closes = None
+
+    @classmethod
+    def from_prices(cls, dates, closes, symbols, decay=RISKMETRICS_DECAY):
+        """Model over a (days x assets) price matrix without gaps (see ``backtest.prepare``)."""
+        model = cls(symbols, decay)
+        model.extend(np.asarray(dates, dtype="datetime64[D]")[1:], log_returns(closes))
+        model.last_closes = np.array(closes[-1], dtype="float64") if len(closes) else None
+        return model
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def returns(self):
+        return self._returns[:len(self.dates)]
+
+    def _age_weights(self, days):
+        return self.decay ** np.arange(days - 1, -1, -1, dtype="float64")
+
+    # --- Updates ---
+
+    def _store(self, dates, returns):
+        used = len(self.dates)
+        if used + len(returns) > len(self._returns):
+            grown = np.empty((max(2 * len(self._returns), used + len(returns), 64), len(self.symbols)))
+            grown[:used] = self._returns[:used]
+            self._returns = grown
+        self._returns[used:used + len(returns)] = returns
+        self.dates = np.concatenate([self.dates, np.asarray(dates, dtype="datetime64[D]")])
+
+    def extend(self, dates, returns):
+        """Add several days of returns at once (one weighted matrix product)."""
+        returns = np.atleast_2d(np.asarray(returns, dtype="float64"))
+        if not len(returns):
+            return self
+        weights = self._age_weights(len(returns))
+        aged = self.decay ** len(returns)
+        self.s0 = self.s0 * aged + weights.sum()
+        self.s1 = self.s1 * aged + weights @ returns
+        self.s2 = self.s2 * aged + (returns * weights[:, None]).T @ returns
+        self._store(dates, returns)
+        return self
+
+    def update(self, date, returns):
+        """Add one day of returns: a rank-1 update."""
+        x = np.asarray(returns, dtype="float64")
+        self.s0 = self.s0 * self.decay + 1.0
+        self.s1 *= self.decay
+        self.s1 += x
+        self.s2 *= self.decay
+        self.s2 += np.outer(x, x)
+        self._store([date], x[None, :])
+        return self
+
+    def update_prices(self, date, closes):
+        """Add one day from that day's closes (needs the previous closes)."""
+        closes = np.asarray(closes, dtype="float64")
+        if self.last_closes is None:
+            self.last_closes = closes
+            return self
+        self.update(date, np.log(closes / self.last_closes))
+        self.last_closes = closes
+        return self
+
+    def add_asset(self, symbol, returns, last_close=None):
+        """
+        Add ``symbol`` with its returns on the model's dates: one new row and
+        column of ``S2`` against the stored history.
+        """
+        y = np.asarray(returns, dtype="float64")
+        if y.shape != (len(self.dates),) or not np.isfinite(y).all():
+            raise ValueError(f"{symbol}: need one finite return per model date ({len(self.dates)})")
+        weights = self._age_weights(len(y))
+        cross = (y * weights) @ self.returns
+        n = len(self.symbols)
+        s2 = np.empty((n + 1, n + 1))
+        s2[:n, :n] = self.s2
+        s2[n, :n] = s2[:n, n] = cross
+        s2[n, n] = (weights * y) @ y
+        self.s2 = s2
+        self.s1 = np.append(self.s1, weights @ y)
+        history = np.empty((len(self._returns), n + 1))
+        history[:, :n] = self._returns
+        history[:len(y), n] = y
+        self._returns = history
+        self.symbols.append(symbol)
+        if self.last_closes is not None:
+            self.last_closes = np.append(self.last_closes, np.nan if last_close is None else last_close)
+        return self
+
+    def remove_asset(self, symbol):
+        i = self.symbols.index(symbol)
+        keep = np.arange(len(self.symbols)) != i
+        self.s2 = self.s2[np.ix_(keep, keep)]
+        self.s1 = self.s1[keep]
+        self._returns = self._returns[:, keep]
+        if self.last_closes is not None:
+            self.last_closes = self.last_closes[keep]
+        del self.symbols[i]
+        return self
+
+    def reorder(self, symbols):
+        order = [self.symbols.index(s) for s in symbols]
+        self.s2 = self.s2[np.ix_(order, order)]
+        self.s1 = self.s1[order]
+        self._returns = self._returns[:, order]
+        if self.last_closes is not None:
+            self.last_closes = self.last_closes[order]
+        self.symbols = list(symbols)
+        return self
+
+    def sync(self, dates, closes, symbols):
+        """
+        Bring the model up to a (days x assets) price matrix: drop symbols no
+        longer held, add new ones, append new days. With ``decay`` < 1 the
+        matrix may start later than the model (a rolling window); the older
+        days keep their, by then negligible, weight. Returns False if the
+        histories do not line up and the model was rebuilt instead.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        returns = log_returns(closes)
+        return_dates = dates[1:]
+        added = [s for s in symbols if s not in self.symbols]
+        aligned = False
+        if len(self.dates):
+            last = int(np.searchsorted(return_dates, self.dates[-1]))
+            first = last - len(self.dates) + 1
+            lo = max(first, 0)
+            aligned = (last < len(return_dates)
+                       and (first >= 0 or (self.decay < 1 and not added))
+                       and np.array_equal(return_dates[lo:last + 1], self.dates[lo - first:]))
+        if not aligned:
+            rebuilt = RiskModel.from_prices(dates, closes, symbols, self.decay)
+            self.__dict__.update(rebuilt.__dict__)
+            return False
+        column = {s: i for i, s in enumerate(symbols)}
+        for symbol in [s for s in self.symbols if s not in column]:
+            self.remove_asset(symbol)
+        for symbol in added:
+            self.add_asset(symbol, returns[first:last + 1, column[symbol]], closes[last + 1, column[symbol]])
+        self.reorder(list(symbols))
+        self.extend(return_dates[last + 1:], returns[last + 1:])
+        self.last_closes = np.array(closes[-1], dtype="float64")
+        return True
+
+    # --- Estimates ---
+
+    @property
+    def mean(self):
+        return self.s1 / self.s0 if self.s0 else np.full(len(self.symbols), np.nan)
+
+    @property
+    def covariance(self):
+        """Daily covariance (sample covariance with ``ddof=1`` when ``decay`` is 1)."""
+        if not self.s0:
+            return np.full((len(self.symbols),) * 2, np.nan)
+        m = self.mean
+        cov = self.s2 / self.s0 - np.outer(m, m)
+        if self.decay == 1 and self.s0 > 1:
+            cov *= self.s0 / (self.s0 - 1)
+        return cov
+
+    @property
+    def correlation(self):
+        cov = self.covariance
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return cov / np.outer(std, std)
+
+    def portfolio_volatility(self, weights):
+        """Annualized volatility of the portfolio at ``weights``."""
+        w = np.asarray(weights, dtype="float64")
+        return float(np.sqrt(max(w @ self.covariance @ w, 0.0) * TRADING_DAYS))
+
+    def risk_contributions(self, weights):
+        """
+        Per holding: ``(marginal, contribution, beta)`` - the change of the
+        annualized portfolio volatility per unit of weight, the holding's
+        share of that volatility (the contributions add up to it) and its
+        beta to the portfolio.
+        """
+        w = np.asarray(weights, dtype="float64")
+        cov_w = self.covariance @ w
+        variance = w @ cov_w
+        with np.errstate(divide="ignore", invalid="ignore"):
+            marginal = cov_w * TRADING_DAYS / np.sqrt(variance * TRADING_DAYS)
+            beta = cov_w / variance
+        return marginal, w * marginal, beta
+
+    def value_at_risk(self, weights, confidence=0.95, horizon_days=1):
+        """
+        ``(parametric, historical)`` VaR as a loss fraction of the portfolio:
+        normal VaR from the model's mean and covariance (square-root-of-time
+        for longer horizons), and the empirical quantile of the stored
+        one-day portfolio returns, scaled the same way.
+        """
+        w = np.asarray(weights, dtype="float64")
+        mean = float(w @ self.mean) * horizon_days
+        sd = float(np.sqrt(max(w @ self.covariance @ w, 0.0) * horizon_days))
+        parametric = -(mean - NormalDist().inv_cdf(confidence) * sd)
+        portfolio = np.expm1(self.returns) @ w
+        historical = (-np.quantile(portfolio, 1 - confidence) * np.sqrt(horizon_days)
+                      if len(portfolio) else np.nan)
+        return parametric, float(historical)
+
+    def risk_frame(self, weights, names=None):
+        """One row per holding: weight, volatility, beta and risk contributions (percent)."""
+        import pandas as pd
+        w = np.asarray(weights, dtype="float64")
+        marginal, contribution, beta = self.risk_contributions(w)
+        total = contribution.sum()
+        frame = pd.DataFrame({"Symbol": self.symbols})
+        if names is not None:
+            frame["Stock Name"] = list(names)
+        frame["Weight"] = w * 100
+        frame["Volatility"] = np.sqrt(np.clip(np.diag(self.covariance), 0, None) * TRADING_DAYS) * 100
+        frame["Beta to Portfolio"] = beta
+        frame["Marginal Risk"] = marginal * 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frame["Risk Contribution"] = contribution / total * 100 if total else np.nan
+        return frame
+
+    def summary(self, weights, confidence=VAR_CONFIDENCE):
+        """Portfolio volatility, 1-day VaR levels and the effective number of holdings."""
+        w = np.asarray(weights, dtype="float64")
+        out = {"days": len(self), "volatility": self.portfolio_volatility(w) * 100,
+               "effective_holdings": 1 / (w @ w) if w.any() else np.nan}
+        for level in confidence:
+            parametric, historical = self.value_at_risk(w, level)
+            out[f"var_{level:.0%}"] = (parametric * 100, historical * 100)
+        return out
@@ -0,0 +1,147 @@
+"""
+Declarative recommendation rules.
+
+Rules live in a JSON file (``rules.json`` next to this module by default, or
+the path in ``PORTFOLIO_RULES``) so thresholds can change without code
+changes. A rule set has ``holding`` and ``portfolio`` sections; each has
+ordered ``groups`` of rules and a ``fallback``. Within a group the first
+matching rule wins; the texts of the winning rules of all groups are joined,
+and the fallback applies when no group matched. Conditions are clauses
+joined by ``and``::
+
+    "12m > 20"            "3m > 10 and 12m < 0"            "36m available"
+
+where ``12m`` is an alias from the ``periods`` section (or a full period
+name) and the operators are ``> >= < <= == !=``. A missing (NaN) return
+never satisfies a comparison.
+
+``RuleSet`` compiles every condition once into column comparisons and
+evaluates them as boolean masks over a (rows x periods) returns matrix, so
+a whole book is classified with a handful of array operations.
+"""
+import json
+import operator
+import os
+
+import numpy as np
+
+DEFAULT_RULES = os.path.join(os.path.dirname(__file__), "rules.json")
+
+_OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt,
+    "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+}
+
+
+class RuleError(ValueError):
+    """A rule file that cannot be compiled."""
+
+
+class _Rule:
+    __slots__ = ("code", "text", "level", "clauses")
+
+    def __init__(self, spec, columns):
+        try:
+            self.code = spec["code"]
+            self.text = spec["text"]
+        except KeyError as e:
+            raise RuleError(f"rule {spec!r} is missing {e}") from None
+        self.level = spec.get("level")
+        self.clauses = [_compile_clause(c, columns) for c in spec.get("when", "").split(" and ") if c.strip()]
+
+    def mask(self, returns):
+        mask = np.ones(len(returns), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for column, op, value in self.clauses:
+                mask &= op(returns[:, column], value)
+        return mask
+
+
+def _compile_clause(clause, columns):
+    parts = clause.split()
+    if len(parts) == 2 and parts[1] == "available":
+        return columns(parts[0]), lambda values, _: ~np.isnan(values), None
+    if len(parts) != 3 or parts[1] not in _OPERATORS:
+        raise RuleError(f"cannot parse condition {clause!r}")
+    try:
+        value = float(parts[2])
+    except ValueError:
+        raise RuleError(f"threshold in {clause!r} is not a number") from None
+    return columns(parts[0]), _OPERATORS[parts[1]], value
+
+
+class _Section:
+    """Compiled groups and fallback for one section of the rule file."""
+
+    def __init__(self, spec, columns):
+        self.groups = [[_Rule(rule, columns) for rule in group] for group in spec.get("groups", [])]
+        self.fallback = _Rule(spec["fallback"], columns)
+
+    def evaluate(self, returns):
+        """(rows x groups) index of the winning rule per group, -1 where none matched."""
+        if not self.groups:
+            return np.empty((len(returns), 0), dtype=np.int16)
+        return np.column_stack([
+            np.select([rule.mask(returns) for rule in group], np.arange(len(group)), default=-1)
+            for group in self.groups
+        ]).astype(np.int16)
+
+    def outcome(self, winners):
+        """The rules behind one row of ``evaluate``'s output."""
+        fired = [self.groups[g][k] for g, k in enumerate(winners) if k >= 0]
+        return fired or [self.fallback]
+
+
+class RuleSet:
+    """A compiled rule file for a fixed list of period names."""
+
+    def __init__(self, spec, period_names):
+        self.spec = spec
+        self.period_names = list(period_names)
+        aliases = spec.get("periods", {})
+
+        def column(name):
+            period = aliases.get(name, name)
+            if period not in self.period_names:
+                raise RuleError(f"unknown period {name!r}")
+            return self.period_names.index(period)
+
+        self.holding = _Section(spec["holding"], column)
+        self.portfolio = _Section(spec["portfolio"], column)
+
+    @classmethod
+    def load(cls, path=None, period_names=None):
+        from portfolio_core.periods import PERFORMANCE_PERIODS
+        path = path or os.environ.get("PORTFOLIO_RULES") or DEFAULT_RULES
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec, PERFORMANCE_PERIODS if period_names is None else period_names)
+
+    def _labels(self, section, returns):
+        winners = section.evaluate(np.asarray(returns, dtype="float64").reshape(-1, len(self.period_names)))
+        # Text is built once per distinct combination of winning rules, not per
+        # row: each combination is packed into one integer key.
+        radix = max((len(group) for group in section.groups), default=0) + 1
+        keys = (winners.astype(np.int64) + 1) @ (radix ** np.arange(winners.shape[1], dtype=np.int64))
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        outcomes = [section.outcome(winners[i].tolist()) for i in first]
+        return outcomes, inverse.reshape(-1)
+
+    def classify(self, returns):
+        """
+        ``(codes, texts)`` object arrays, one entry per row of the (rows x
+        periods) ``returns`` matrix (percent, NaN where N/A). Codes of
+        several fired rules are joined with ``+``.
+        """
+        outcomes, inverse = self._labels(self.holding, returns)
+        codes = np.array(["+".join(r.code for r in rules) for rules in outcomes] or [""], dtype=object)
+        texts = np.array([" ".join(r.text for r in rules) for rules in outcomes] or [""], dtype=object)
+        return codes[inverse], texts[inverse]
+
+    def classify_portfolios(self, weighted_returns):
+        """``(levels, codes, texts)`` for a (portfolios x periods) matrix of weighted returns."""
+        outcomes, inverse = self._labels(self.portfolio, weighted_returns)
+        levels = np.array([rules[0].level or "info" for rules in outcomes] or [""], dtype=object)
+        codes = np.array(["+".join(r.code for r in rules) for rules in outcomes] or [""], dtype=object)
+        texts = np.array([" ".join(r.text for r in rules) for rules in outcomes] or [""], dtype=object)
+        return levels[inverse], codes[inverse], texts[inverse]
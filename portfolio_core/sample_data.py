@@ -0,0 +1,30 @@
+"""Sample holdings shown in the app's editor on first load."""
+
+# Default portfolio data with a placeholder for shares
+DEFAULT_PORTFOLIO = [
+    {"symbol": "CLOV", "stock": "CLOVER HEALTH INVESTMENTS CORP.", "current_price": 2.75, "shares": 100},
+    {"symbol": "PFFA", "stock": "VIRTUS INFRACAP US PFD ETF", "current_price": 20.83, "shares": 50},
+    {"symbol": "ABNB", "stock": "AIRBNB", "current_price": 133.97, "shares": 10},
+    {"symbol": "BABA", "stock": "ALIBABA GROUP", "current_price": 114.05, "shares": 15},
+    {"symbol": "FOUR", "stock": "SHIFT4 PAYMENTS", "current_price": 98.73, "shares": 12},
+    {"symbol": "CTXR", "stock": "CITIUS PHARMACEUTICALS INC.", "current_price": 1.67, "shares": 500},
+    {"symbol": "BIDU", "stock": "BAIDU INC.", "current_price": 85.73, "shares": 20},
+    {"symbol": "LGO", "stock": "LARGO RESOURCS LTD.", "current_price": 1.22, "shares": 800},
+    {"symbol": "EEMA", "stock": "MSCI EMERGING MARKETS ASIA ISHARES", "current_price": 82.74, "shares": 10},
+    {"symbol": "RTX", "stock": "RTX CORP", "current_price": 144.47, "shares": 8},
+    {"symbol": "JD", "stock": "JD COM INC", "current_price": 33.16, "shares": 30},
+    {"symbol": "NOK", "stock": "NOKIA CORP", "current_price": 5.17, "shares": 200},
+    {"symbol": "AMD", "stock": "ADVANCED MICRO DEVICES INC", "current_price": 143.94, "shares": 10},
+    {"symbol": "NXPI", "stock": "NXP SEMICONDUCTORS NV", "current_price": 218.06, "shares": 7},
+    {"symbol": "MOH", "stock": "MOLINA HELTHCARE INC", "current_price": 296.19, "shares": 5},
+    {"symbol": "NVDA", "stock": "NVIDIA CORPORATION", "current_price": 157.49, "shares": 9},
+    {"symbol": "PLD", "stock": "PROLOGIS INC", "current_price": 106.37, "shares": 11},
+    {"symbol": "QCOM", "stock": "QUALCOMM INC", "current_price": 158.94, "shares": 8},
+    {"symbol": "KXIN", "stock": "KAIXIN AUTO HOLDINGS", "current_price": 0.92, "shares": 1000},
+    {"symbol": "KEGN", "stock": "KENGEN", "current_price": 6.84, "currency": "KES", "shares": 500},
+    {"symbol": "KPLC", "stock": "KPLC", "current_price": 11.40, "currency": "KES", "shares": 400},
+    {"symbol": "CABL", "stock": "EAST AFRICA CABLES", "current_price": 1.00, "currency": "KES", "shares": 2000},
+    {"symbol": "UCHM", "stock": "UCHUMI", "current_price": 0.3, "currency": "KES", "shares": 5000},
+    {"symbol": "UNGA", "stock": "UNGA GROUP LTD", "current_price": 20.40, "currency": "KES", "shares": 100},
+    {"symbol": "ORCH", "stock": "KENYA ORCHADS LTD", "current_price": 19.50, "currency": "KES", "shares": 100},
+]
@@ -0,0 +1,229 @@
+"""
+Process-wide price-series cache shared by every app session.
+
+Each Streamlit session builds its own provider, so without this cache ten
+analysts looking at the same symbols cause ten identical fetches and hold ten
+copies of each series. ``SharedCache`` is meant to live once per process (the
+app creates it with ``st.cache_resource``):
+
+* values are stored once and handed to every session as-is; series arrays
+  are marked read-only so no session can change another's data,
+* entries expire after ``ttl`` seconds and the least recently used ones are
+  evicted to stay under ``max_bytes``,
+* concurrent misses for the same key wait for a single load (single flight).
+
+``SharedCacheProvider`` puts the cache in front of any ``PriceProvider``. It
+keeps one series per (source, symbol, end date) and serves shorter windows as
+views of a longer cached one.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from portfolio_core.providers import HISTORY_MONTHS, PriceProvider, window_start
+
+DEFAULT_TTL = 15 * 60
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "expires")
+
+    def __init__(self, value, nbytes, expires):
+        self.value = value
+        self.nbytes = nbytes
+        self.expires = expires
+
+
+class _Flight:
+    """A load in progress; waiters block on ``done``."""
+
+    __slots__ = ("done", "loaded", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.loaded = False
+        self.value = None
+        self.error = None
+
+
+def _nbytes(value):
+    return getattr(value, "nbytes", 0)
+
+
+class SharedCache:
+    """Thread-safe TTL + size-bounded LRU mapping with single-flight loading."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, sizeof=_nbytes, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clock = clock
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Lookups answered by another caller's in-flight load
+        self.waits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.nbytes -= entry.nbytes
+
+    def _store(self, key, value, now):
+        nbytes = self.sizeof(value)
+        if key in self._entries:
+            self._drop(key)
+        if nbytes > self.max_bytes:
+            return
+        while self._entries and self.nbytes + nbytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+        self._entries[key] = _Entry(value, nbytes, now + self.ttl)
+        self.nbytes += nbytes
+
+    def get_many(self, keys, load, usable=None):
+        """
+        Values for ``keys``, loading the missing ones with ``load(missing)``.
+
+        ``load`` returns ``(values, errors)`` dicts keyed like its argument;
+        keys in ``errors`` are handed to the callers waiting on this load but
+        not cached. ``usable(key, value)`` can reject a cached value (e.g. one
+        covering too short a window), which then counts as a miss. Returns
+        ``(values, errors)`` for ``keys``.
+        """
+        values, errors = {}, {}
+        pending = list(dict.fromkeys(keys))
+        while pending:
+            claimed, waiting = [], []
+            with self._lock:
+                now = self.clock()
+                for key in pending:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.expires <= now:
+                        self._drop(key)
+                        entry = None
+                    if entry is not None and (usable is None or usable(key, entry.value)):
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        values[key] = entry.value
+                    elif key in self._flights:
+                        self.waits += 1
+                        waiting.append((key, self._flights[key]))
+                    else:
+                        self.misses += 1
+                        self._flights[key] = _Flight()
+                        claimed.append(key)
+            if claimed:
+                self._load(claimed, load, values, errors)
+            pending = []
+            for key, flight in waiting:
+                flight.done.wait()
+                if flight.loaded and (flight.error is not None or usable is None or usable(key, flight.value)):
+                    values[key] = flight.value
+                    if flight.error is not None:
+                        errors[key] = flight.error
+                else:
+                    # The load raised or covered less than we need: try ourselves.
+                    pending.append(key)
+        return values, errors
+
+    def _load(self, keys, load, values, errors):
+        loaded, failed = {}, {}
+        try:
+            loaded, failed = load(keys)
+        finally:
+            with self._lock:
+                now = self.clock()
+                flights = [self._flights.pop(key) for key in keys]
+                for key, flight in zip(keys, flights):
+                    if key in loaded:
+                        flight.loaded = True
+                        flight.value = loaded[key]
+                        flight.error = failed.get(key)
+                        if flight.error is None:
+                            self._store(key, flight.value, now)
+            for flight in flights:
+                flight.done.set()
+        for key in keys:
+            values[key] = loaded.get(key)
+            if key in failed:
+                errors[key] = failed[key]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "waits": self.waits,
+                "evictions": self.evictions, "size": len(self), "bytes": self.nbytes}
+
+
+def _freeze(series):
+    """Mark a series' arrays read-only (they are shared between sessions)."""
+    if series is not None:
+        series.dates.flags.writeable = False
+        series.closes.flags.writeable = False
+    return series
+
+
+def _series_nbytes(value):
+    _, series = value
+    return 0 if series is None else series.dates.nbytes + series.closes.nbytes
+
+
+def series_cache(ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+    """``SharedCache`` sized by the price arrays it holds."""
+    return SharedCache(ttl, max_bytes, sizeof=_series_nbytes)
+
+
+class SharedCacheProvider(PriceProvider):
+    """
+    ``upstream`` behind a ``series_cache()``. Keeps the upstream's name and
+    store root, so session caches keyed by ``provider_key`` are unaffected.
+    """
+
+    def __init__(self, upstream, cache):
+        super().__init__()
+        self.upstream = upstream
+        self.cache = cache
+        self.name = upstream.name
+        self.root = getattr(upstream, "root", None)
+
+    def _key(self, symbol, end_date):
+        key = (self.name, self.root, symbol, str(end_date))
+        # Mock series are derived from the session's current price and currency.
+        holdings = getattr(self.upstream, "holdings", None)
+        return key + (holdings.price_of(symbol),) if holdings is not None else key
+
+    def load_window(self, symbols, end_date, months=HISTORY_MONTHS):
+        start_date = window_start(end_date, months)
+        keys = {symbol: self._key(symbol, end_date) for symbol in dict.fromkeys(symbols)}
+        by_key = {key: symbol for symbol, key in keys.items()}
+
+        def load(missing):
+            wanted = [by_key[key] for key in missing]
+            window = self.upstream.load_window(wanted, end_date, months)
+            loaded = {key: (start_date, _freeze(window.get(by_key[key]))) for key in missing}
+            failed = {key: self.upstream.errors[by_key[key]] for key in missing if by_key[key] in self.upstream.errors}
+            return loaded, failed
+
+        # A cached series loaded for an earlier start also answers this window.
+        values, errors = self.cache.get_many(list(keys.values()), load,
+                                             usable=lambda key, value: value[0] <= start_date)
+        self.errors = {by_key[key]: message for key, message in errors.items()}
+        window = {}
+        for symbol, key in keys.items():
+            _, series = values[key] or (None, None)
+            window[symbol] = None if series is None else series.window(start_date, end_date)
+        return window
+
+    def load_series(self, symbol, start_date, end_date):
+        return self.upstream.load_series(symbol, start_date, end_date)
@@ -0,0 +1,126 @@
+"""
+Static text for the app's strategy guide and research sections.
+
+Kept out of the Streamlit script so the guide is defined in one place and the
+analysis code stays readable.
+"""
+
+# --- 🧠 30-Year Portfolio Strategy Guide ---
+STRATEGY_GUIDE = """
+Inspired by: Warren Buffett (value investing, compounding) and Jim Simons (quantitative, data-driven rebalancing)
+
+### 🔍 1. Core Strategic Foundations
+
+| Principle       | Warren Buffett                          | Jim Simons                                    |
+| :-------------- | :-------------------------------------- | :-------------------------------------------- |
+| **Investment Philosophy** | Buy wonderful companies at fair prices  | Exploit short-term inefficiencies via data    |
+| **Holding Period** | Decades (compound over time)            | Often short-term, but repeatable patterns     |
+| **Focus** | Value, fundamentals, moat               | Math, signals, quantitative models            |
+
+### 🏗️ 2. Recommended Structure for a Long-Term Portfolio
+
+| Component             | Suggested Allocation | Strategy                                             |
+| :-------------------- | :------------------- | :--------------------------------------------------- |
+| **U.S. Blue-Chip Stocks** | 30–40%               | Long-term compounding (NVDA, AMD, MOH, QCOM)         |
+| **Dividend-Paying Stocks**| 10–15%               | Steady income (PFFA, PLD, RTX)                       |
+| **ETFs (U.S. + Emerging)** | 20–25%               | Broad diversification (EEMA, SPY, QQQ)               |
+| **Global Growth Stocks** | 10–15%               | Alibaba, JD for exposure to Asia’s growth            |
+| **Speculative or Small Caps** | 5–10%                | CTXR, CLOV, LGO—high-risk, monitor closely           |
+| **Kenyan Stocks** | <5% (or watchlist)   | Opportunistic; small allocation unless FX risk managed |
+
+### 📈 3. Return Optimization Tactics
+
+* Rebalance annually to maintain target weights
+* Add capital during dips in high-quality names (NVDA, ABNB, MOH)
+* Avoid overtrading: Let winners run unless fundamentals deteriorate
+* Monitor key metrics: PE ratios, ROE, earnings trends
+* Use rolling 5-year performance metrics to evaluate ETF or sector shifts
+
+### ⚠️ 4. Risk Management
+
+* Limit exposure to low-liquidity stocks (e.g. Kenyan microcaps)
+* Cap speculative holdings to <10% of total portfolio
+* Keep at least 20–25% in ETFs or blue-chips for downside protection
+* Consider FX exposure if investing in emerging markets directly
+
+### 🧭 5. Signals to Buy/Sell Based on Simons/Buffett Ideas
+
+**BUY when:**
+* Price dips >20% in high-quality stock (and fundamentals are intact)
+* Strong earnings revisions or momentum (Simons-style signal)
+* Long-term competitive moat remains intact (Buffett-style)
+
+**SELL/REDUCE when:**
+* Momentum breaks down + deteriorating earnings (Simons)
+* PE ratios extremely overextended vs. sector
+* Company loses moat or faces structural disruption (Buffett-style)
+
+### 📅 6. 30-Year Mindset
+
+* Think in 10-year blocks, not quarters
+* Focus on compound annual growth rate (CAGR), not absolute returns
+* Assume cyclical downturns every 7–10 years; position accordingly
+* Build core around high-quality, repeatable business models
+* Run the analysis to see a Monte Carlo projection of your own holdings: percentile bands and the chance of a downturn in each 10-year block
+"""
+
+# --- Advanced Strategy & Research Insights (Conceptual) ---
+RESEARCH_INTRO = "This section outlines advanced concepts used by professional investors. Implementing these fully requires integrating real-time data, complex models, and significant expertise. It serves as a guide for deeper exploration."
+
+# (expander title, markdown body, closing warning)
+RESEARCH_SECTIONS = [
+    (
+        "Quantitative Signals (Requires Real Data)",
+        """
+    Quantitative strategies rely on mathematical and statistical models to identify trading opportunities.
+    These typically require vast amounts of historical data (price, volume, fundamental, alternative data).
+
+    **Common Indicators (RSI, MACD and Bollinger Bands are calculated in the performance table):**
+    * **Relative Strength Index (RSI):** Measures the speed and change of price movements to identify overbought or oversold conditions (14-day, shown as `RSI (14)`).
+    * **Moving Average Convergence Divergence (MACD):** Reveals changes in the strength, direction, momentum, and duration of a trend (12/26-day EMAs with a 9-day signal line).
+    * **Bollinger Bands:** Measures market volatility and identify overbought or oversold levels (20-day, 2 standard deviations; `Bollinger %B` is 0 at the lower band and 1 at the upper band).
+    * **Volume Analysis:** Identifying patterns in trading volume that correlate with price movements (conceptual - not calculated here; price series carry closing prices only).
+    * **Factor Investing:** Screening stocks based on factors like Value (low P/E), Growth (high earnings growth), Quality (high ROE), Momentum (recent price trends), and Low Volatility.
+    * **Machine Learning Models:** Predicting future price movements, volatility, or sentiment using supervised or unsupervised learning.
+    """,
+        "The indicators are calculated from the daily closes the analysis loads; with mock data they only illustrate the mechanics. Volume, factor and machine-learning signals would additionally need volume and fundamental data and a backtesting framework.",
+    ),
+    (
+        "Fundamental Analysis Factors",
+        """
+    Fundamental analysis involves evaluating a company's financial health and intrinsic value.
+
+    **Key Metrics to Monitor:**
+    * **P/E Ratio (Price-to-Earnings):** Valuation metric comparing current share price to per-share earnings.
+    * **PEG Ratio (Price/Earnings to Growth):** Relates P/E to expected earnings growth.
+    * **ROE (Return on Equity):** Measures profitability in relation to shareholder equity.
+    * **Debt-to-Equity Ratio:** Indicates a company's leverage.
+    * **Revenue and Earnings Growth:** Tracking the rate at which a company's sales and profits are increasing.
+    * **Free Cash Flow:** Cash generated after accounting for capital expenditures.
+    * **Competitive Moat:** Sustainable competitive advantages (e.g., brand, patents, network effects).
+    * **Management Quality:** Experience, track record, and alignment with shareholder interests.
+    """,
+        "Integrating these metrics requires financial statement data from APIs (e.g., Yahoo Finance's detailed financials, Alpha Vantage, Finnhub's fundamental data endpoints).",
+    ),
+    (
+        "Sentiment Analysis (Conceptual)",
+        """
+    Sentiment analysis attempts to gauge the market's or public's emotional tone towards a stock or sector.
+
+    **Sources of Sentiment Data:**
+    * **News Headlines & Articles:** Analyzing financial news for positive, negative, or neutral sentiment.
+    * **Social Media (e.g., X/Twitter, Reddit):** Monitoring discussions for mentions and sentiment trends.
+    * **Analyst Ratings:** Aggregating buy/sell/hold recommendations from financial analysts.
+    * **Earnings Call Transcripts:** Analyzing language for management's tone and forward-looking statements.
+    """,
+        "Implementing sentiment analysis requires access to text-based data feeds and natural language processing (NLP) capabilities.",
+    ),
+    (
+        "Global Macro & Event-Driven Analysis",
+        """
+    * **Global Macro:** Investing based on broad economic trends, interest rate changes, currency movements, and geopolitical events.
+    * **Event-Driven:** Exploiting opportunities arising from specific corporate events like mergers, acquisitions, bankruptcies, or spin-offs.
+    """,
+        "These strategies require deep understanding of economics, geopolitics, and corporate finance, often relying on expert analysis rather than purely automated signals.",
+    ),
+]
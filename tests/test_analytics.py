@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from portfolio_core.analytics import TRADING_DAYS, SeriesAnalytics, price_matrix, traded_days
+from portfolio_core.providers import PriceSeries
+
+
+def _walk(n, seed, start=100.0):
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(0.0005, 0.02, n)))
+
+
+def _calendar(start, days, weekdays):
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + days)
+    weekday = (dates.astype("datetime64[D]").view("int64") - 4) % 7  # 0 = Monday
+    return dates[np.isin(weekday, weekdays)]
+
+
+def _volatility(closes):
+    return np.std(np.diff(np.log(closes)), ddof=1) * np.sqrt(TRADING_DAYS)
+
+
+def _drawdown(closes):
+    peak, worst = closes[0], 0.0
+    for price in closes:
+        peak = max(peak, price)
+        worst = min(worst, price / peak - 1)
+    return worst
+
+
+def test_window_metrics_match_direct_calculations():
+    dates = _calendar("2021-01-04", 1200, range(5))
+    closes = np.column_stack([_walk(len(dates), 0), _walk(len(dates), 1)])
+    analytics = SeriesAnalytics(dates, closes)
+    lo, hi = 100, len(dates) - 1
+    metrics = analytics.window_metrics(dates[lo], dates[hi])
+    years = (dates[hi] - dates[lo]).astype(float) / 365.25
+    for j in range(2):
+        path = closes[lo:hi + 1, j]
+        assert metrics["return"][j] == pytest.approx(path[-1] / path[0] - 1)
+        assert metrics["cagr"][j] == pytest.approx((path[-1] / path[0]) ** (1 / years) - 1)
+        assert metrics["volatility"][j] == pytest.approx(_volatility(path))
+        assert metrics["max_drawdown"][j] == pytest.approx(_drawdown(path))
+
+
+def test_closed_market_days_do_not_count_towards_volatility():
+    # One exchange trades Monday to Friday, the other Sunday to Thursday.
+    a_dates, b_dates = _calendar("2022-01-02", 800, [0, 1, 2, 3, 4]), _calendar("2022-01-02", 800, [6, 0, 1, 2, 3])
+    window = {"A": PriceSeries("A", a_dates, _walk(len(a_dates), 2)),
+              "B": PriceSeries("B", b_dates, _walk(len(b_dates), 3, start=50.0))}
+    dates, closes = price_matrix(window, ["A", "B"])
+    analytics = SeriesAnalytics(dates, closes, ["A", "B"], traded_days(window, ["A", "B"], dates))
+    start = max(a_dates[0], b_dates[0])
+    metrics = analytics.window_metrics(start, dates[-1])
+    for j, symbol in enumerate("AB"):
+        own = window[symbol].window(start, dates[-1]).closes
+        assert metrics["volatility"][j] == pytest.approx(_volatility(own))
+        assert metrics["max_drawdown"][j] == pytest.approx(_drawdown(own))
+    # Without the mask the forward-filled days count as zero returns.
+    unmasked = SeriesAnalytics(dates, closes).window_metrics(start, dates[-1])
+    assert (unmasked["volatility"] < metrics["volatility"]).all()
+
+
+def test_windows_are_never_quietly_shortened():
+    dates = _calendar("2024-01-01", 400, range(5))
+    closes = np.column_stack([_walk(len(dates), 4), _walk(len(dates), 5)])
+    closes[:50, 1] = np.nan
+    analytics = SeriesAnalytics(dates, closes)
+    before = analytics.window_metrics(dates[0] - 30, dates[-1])
+    assert all(np.isnan(values).all() for values in before.values())
+    late = analytics.window_metrics(dates[10], dates[-1])
+    assert np.isfinite(late["volatility"][0]) and np.isnan(late["volatility"][1])
+    assert np.isnan(late["max_drawdown"][1]) and np.isnan(late["return"][1])
+
+
+def test_rolling_metrics_match_windows():
+    dates = _calendar("2023-01-02", 700, range(5))
+    closes = _walk(len(dates), 6)[:, None]
+    analytics = SeriesAnalytics(dates, closes)
+    window, t = 60, 400
+    metrics = analytics.window_metrics(dates[t - window], dates[t])
+    assert analytics.rolling_returns(window)[t, 0] == pytest.approx(metrics["return"][0])
+    assert analytics.rolling_volatility(window)[t, 0] == pytest.approx(metrics["volatility"][0])
+    assert analytics.rolling_cagr(window)[t, 0] == pytest.approx(metrics["cagr"][0])
+    assert np.isnan(analytics.rolling_returns(window)[:window]).all()
@@ -0,0 +1,125 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_core.analytics import price_matrix
+from portfolio_core.backtest import (BacktestParams, main, parameter_grid, parse_targets, prepare, run_paths,
+                                     schedule_mask, sweep, target_weights)
+from portfolio_core.providers import LocalPriceStore, PriceSeries
+
+
+def _prices(days=400, assets=4, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2022-01-03"), np.datetime64("2022-01-03") + 2 * days)
+    dates = dates[np.is_busday(dates)][:days]
+    closes = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (days, assets)), axis=0))
+    return dates, closes
+
+
+def _reference_path(dates, closes, targets, params):
+    """One path, one day and one asset at a time."""
+    due = schedule_mask(dates, params.schedule)
+    units = [targets[i] / closes[0][i] for i in range(len(targets))]
+    equity, rebalances, turnover, costs = [], 0, 0.0, 0.0
+    for t in range(len(dates)):
+        values = [units[i] * closes[t][i] for i in range(len(units))]
+        total = sum(values)
+        trade = t > 0 and due[t]
+        if t > 0 and params.threshold:
+            trade = trade or max(abs(v / total - w) for v, w in zip(values, targets)) > params.threshold
+        if trade:
+            traded = sum(abs(w * total - v) for v, w in zip(values, targets))
+            cost = traded * params.cost_bps / 10_000
+            total -= cost
+            units = [targets[i] * total / closes[t][i] for i in range(len(units))]
+            rebalances += 1
+            turnover += traded / (total + cost)
+            costs += cost
+        equity.append(total)
+    return np.array(equity), rebalances, turnover, costs
+
+
+def test_run_paths_matches_single_path_loop():
+    dates, closes = _prices()
+    targets = np.array([0.4, 0.3, 0.2, 0.1])
+    params = parameter_grid(("never", "monthly", "quarterly", "annual"), (0, 0.03, 0.1), (0, 25))
+    equity, stats = run_paths(dates, closes, targets, params)
+    for j, p in enumerate(params):
+        ref_equity, rebalances, turnover, costs = _reference_path(dates, closes, targets, p)
+        np.testing.assert_allclose(equity[:, j], ref_equity, rtol=1e-12)
+        assert stats["rebalances"][j] == rebalances
+        assert stats["turnover"][j] == pytest.approx(turnover, rel=1e-12)
+        assert stats["costs"][j] == pytest.approx(costs, rel=1e-12, abs=1e-15)
+
+
+def test_never_rebalanced_path_is_buy_and_hold():
+    dates, closes = _prices(assets=3)
+    targets = np.array([0.5, 0.3, 0.2])
+    equity, stats = run_paths(dates, closes, targets, [BacktestParams("never", 0, 25)])
+    np.testing.assert_allclose(equity[:, 0], (targets / closes[0] * closes).sum(axis=1))
+    assert stats["rebalances"][0] == 0 and stats["costs"][0] == 0
+
+
+def test_schedule_mask_flags_first_trading_day_of_each_period():
+    dates = np.array(["2024-01-30", "2024-01-31", "2024-02-01", "2024-03-28", "2024-04-01", "2025-01-02"],
+                     dtype="datetime64[D]")
+    assert schedule_mask(dates, "monthly").tolist() == [False, False, True, True, True, True]
+    assert schedule_mask(dates, "quarterly").tolist() == [False, False, False, False, True, True]
+    assert schedule_mask(dates, "annual").tolist() == [False, False, False, False, False, True]
+    with pytest.raises(ValueError):
+        schedule_mask(dates, "weekly")
+
+
+def test_prepare_drops_unpriced_assets_and_leading_gaps():
+    dates, closes = _prices(days=10, assets=3)
+    closes[:4, 1] = np.nan
+    closes[:, 2] = np.nan
+    kept_dates, kept, targets, dropped = prepare(dates, closes, [0.5, 0.3, 0.2], ["A", "B", "C"])
+    assert dropped == ["C"]
+    assert kept_dates[0] == dates[4] and kept.shape == (6, 2)
+    np.testing.assert_allclose(targets, [0.625, 0.375])
+
+
+def test_parse_and_validate_target_weights():
+    assert parse_targets("AAA=0.6, CCC = 0.4,") == {"AAA": 0.6, "CCC": 0.4}
+    np.testing.assert_array_equal(target_weights({"AAA": 0.6, "CCC": 0.4}, ["AAA", "BBB", "CCC"]), [0.6, 0, 0.4])
+    for bad in ("AAA", "AAA=x", "=0.5"):
+        with pytest.raises(ValueError, match="SYMBOL=WEIGHT"):
+            parse_targets(bad)
+
+
+@pytest.mark.parametrize("targets, message", [
+    ({"AAA": 0.5, "ZZZ": 0.5}, "not in the portfolio"),
+    ({"AAA": 1.2, "BBB": -0.2}, "non-negative"),
+    ({"AAA": 0.5, "BBB": float("nan")}, "non-negative"),
+    ({"AAA": 0.5, "BBB": 0.4}, "sum to 1"),
+])
+def test_bad_target_weights_are_rejected(targets, message):
+    with pytest.raises(ValueError, match=message):
+        target_weights(targets, ["AAA", "BBB"])
+
+
+def test_cli_backtests_chosen_targets(tmp_path, capsys):
+    dates, closes = _prices(assets=3)
+    store = LocalPriceStore(str(tmp_path / "prices"))
+    for symbol, column in zip("ABC", closes.T):
+        store.write_series(PriceSeries(symbol, dates, column))
+    portfolio = tmp_path / "portfolio.csv"
+    # All of the current value is in A; the targets leave A out and add C, which is not held.
+    pd.DataFrame({"symbol": list("ABC"), "stock": list("ABC"), "current_price": 1.0,
+                  "shares": [10, 5, 0]}).to_csv(portfolio, index=False)
+    end = dates[-1].astype(object)
+    argv = [str(portfolio), "--prices", str(tmp_path / "prices"), "--end-date", str(end), "--months", "12",
+            "--schedules", "never", "quarterly"]
+    assert main(argv + ["--targets", "B=0.25,C=0.75"]) == 0
+    got = pd.read_csv(io.StringIO(capsys.readouterr().out))
+
+    kept, window = price_matrix(store.load_window(["B", "C"], end, 12), ["B", "C"])
+    expected = sweep(kept, window, np.array([0.25, 0.75]), parameter_grid(("never", "quarterly"), (0.0,), (10.0,)))
+    np.testing.assert_allclose(got["Final Value"], expected["Final Value"], rtol=1e-12)
+
+    with pytest.raises(SystemExit):
+        main(argv + ["--targets", "B=0.5,C=0.4"])
+    assert "sum to 1" in capsys.readouterr().err
@@ -0,0 +1,64 @@
+import datetime
+
+import numpy as np
+
+from portfolio_core.cache import AnalysisCache, LRUCache
+from portfolio_core.holdings import Holdings
+from portfolio_core.periods import PERFORMANCE_PERIODS
+from portfolio_core.providers import PriceProvider, PriceSeries
+
+END = datetime.date(2025, 6, 27)
+
+
+class FlakyProvider(PriceProvider):
+    """Daily prices for every symbol; symbols in ``failing`` raise once."""
+
+    name = "flaky"
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.loads = []
+
+    def load_series(self, symbol, start_date, end_date):
+        self.loads.append(symbol)
+        if symbol in self.failing:
+            self.failing.discard(symbol)
+            raise OSError("connection reset")
+        dates = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        return PriceSeries(symbol, dates, np.linspace(10, 20, len(dates)))
+
+
+def _holdings(shares=(10, 5)):
+    return Holdings(["AAA", "BBB"], ["A", "B"], [20.0, 20.0], list(shares))
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_share_edits_reuse_the_cached_prices():
+    cache, provider = AnalysisCache(), FlakyProvider()
+    first = cache.analyze(_holdings(), provider, PERFORMANCE_PERIODS, END)
+    second = cache.analyze(_holdings((1, 1)), provider, PERFORMANCE_PERIODS, END)
+    assert provider.loads == ["AAA", "BBB"]
+    np.testing.assert_array_equal(first.start_prices, second.start_prices)
+
+
+def test_failed_loads_are_retried_on_the_next_run():
+    cache, provider = AnalysisCache(), FlakyProvider(failing={"BBB"})
+    failed = cache.analyze(_holdings(), provider, PERFORMANCE_PERIODS, END)
+    assert list(provider.errors) == ["BBB"] and np.isnan(failed.start_prices[1]).all()
+
+    retried = cache.analyze(_holdings(), provider, PERFORMANCE_PERIODS, END)
+    # Only the failed symbol is loaded again.
+    assert provider.loads == ["AAA", "BBB", "BBB"]
+    assert provider.errors == {} and np.isfinite(retried.start_prices).all()
+    cache.analyze(_holdings(), provider, PERFORMANCE_PERIODS, END)
+    assert len(provider.loads) == 3
@@ -0,0 +1,45 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from portfolio_core.engine import BAD_START_PRICE, NO_DATA, OK, analyze, compute_returns, lookup_prices
+from portfolio_core.holdings import Holdings
+from portfolio_core.providers import PriceSeries
+
+END = datetime.date(2025, 6, 27)
+PERIODS = {"1m": lambda end: end - datetime.timedelta(days=30), "1y": lambda end: end - datetime.timedelta(days=365)}
+
+
+def _series(symbol, start, closes):
+    dates = np.datetime64(start) + np.arange(len(closes))
+    return PriceSeries(symbol, dates, closes)
+
+
+def test_lookup_takes_the_close_on_or_before_each_date():
+    window = {"A": _series("A", "2025-01-01", [1.0, 2.0, 3.0]), "B": None}
+    prices = lookup_prices(window, ["A", "B", "A"], ["2024-12-31", "2025-01-02", "2025-02-01"])
+    np.testing.assert_array_equal(prices[0], [np.nan, 2.0, 3.0])
+    assert np.isnan(prices[1]).all()
+    np.testing.assert_array_equal(prices[2], prices[0])
+
+
+def test_compute_returns_status_codes():
+    start = np.array([[10.0, 0.0, np.nan]])
+    status, returns, initial, final = compute_returns(start, np.array([[11.0, 5.0, 5.0]]), [2])
+    assert status.tolist() == [[OK, BAD_START_PRICE, NO_DATA]]
+    np.testing.assert_allclose(returns, [[10.0, np.nan, np.nan]])
+    assert initial.tolist() == [[20.0, 0.0, 0.0]] and final.tolist() == [[22.0, 0.0, 0.0]]
+
+
+def test_performance_frame_explains_missing_returns():
+    holdings = Holdings(["OLD", "NEW", "ZERO", "NONE"], list("ONZX"), [11.0, 11.0, 1.0, 5.0], [1, 1, 1, 1])
+    window = {"OLD": _series("OLD", "2024-01-01", np.full(600, 10.0)),
+              "NEW": _series("NEW", "2025-05-01", np.full(58, 10.0)),
+              "ZERO": _series("ZERO", "2024-01-01", np.r_[np.zeros(500), np.ones(100)])}
+    frame = analyze(holdings, window, PERIODS, END).performance_frame().set_index("Symbol")
+    assert frame.loc["OLD", "Data Status"] == ""
+    assert frame.loc["NEW", "Data Status"] == "N/A (Data not found): 1y"
+    assert frame.loc["ZERO", "Data Status"] == "N/A (Start price 0 or None): 1y"
+    assert frame.loc["NONE", "Data Status"] == "N/A (Data not found): all periods"
+    assert frame.loc["NEW", "1m"] == pytest.approx(0.0) and np.isnan(frame.loc["NEW", "1y"])
@@ -0,0 +1,156 @@
+import datetime
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from portfolio_core import fetch
+from portfolio_core.fetch import TokenBucket, fetch_all
+from portfolio_core.providers import AlphaVantageProvider, PriceSeries
+
+END = datetime.date(2025, 6, 27)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Local JSON price API. ``script[symbol]`` lists the statuses to answer
+    with before a normal reply; ``delay`` slows every reply down.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, script=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay = delay
+        self.script = {symbol: list(statuses) for symbol, statuses in (script or {}).items()}
+        self.lock = threading.Lock()
+        self.starts = []
+        self.hits = {}
+        self.active = self.max_active = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/query"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        symbol = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)["symbol"][0]
+        with server.lock:
+            server.starts.append(time.monotonic())
+            server.hits[symbol] = server.hits.get(symbol, 0) + 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            script = server.script.get(symbol)
+            status = script.pop(0) if script else 200
+        time.sleep(server.delay)
+        body = json.dumps({"Time Series (Daily)": {"2025-06-26": {"4. close": "10"}, "2025-06-27": {"4. close": "11"}}}
+                          if status == 200 else {}).encode()
+        with server.lock:
+            server.active -= 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Fresh rate limits: a later server may reuse an earlier one's port.
+    monkeypatch.setattr(fetch, "_buckets", {})
+    servers = []
+
+    def start(**options):
+        srv = StubServer(**options)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return srv
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _provider(url, per_minute=60_000, burst=100, connections=4):
+    class Stub(AlphaVantageProvider):
+        requests_per_minute = per_minute
+        max_connections = connections
+    Stub.burst = burst
+    return Stub("demo", base_url=url)
+
+
+def _gaps(starts):
+    starts = sorted(starts)
+    return [b - a for a, b in zip(starts, starts[1:])]
+
+
+def test_symbols_are_fetched_concurrently_over_pooled_connections(server):
+    srv = server(delay=0.2)
+    symbols = [f"S{i}" for i in range(8)]
+    began = time.monotonic()
+    window = _provider(srv.url, connections=4).load_window(symbols, END)
+    elapsed = time.monotonic() - began
+    assert all(isinstance(window[s], PriceSeries) and len(window[s]) == 2 for s in symbols)
+    assert srv.max_active == 4
+    assert elapsed < 8 * 0.2 * 0.75
+
+
+def test_token_bucket_spaces_requests(server):
+    srv = server()
+    _provider(srv.url, per_minute=600, burst=1).load_window([f"S{i}" for i in range(5)], END)
+    assert len(srv.starts) == 5
+    assert min(_gaps(srv.starts)) > 0.1 * 0.8
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(5)] == [0.0, 0.0, 0.0, 0.5, 1.0]
+    now[0] = 10.0
+    assert bucket.reserve() == 0.0
+
+
+def test_throttled_and_server_errors_are_retried_with_backoff(server):
+    srv = server(script={"FLAKY": [429, 503, 500], "GONE": [404], "DOWN": [503] * 10})
+    provider = _provider(srv.url)
+    provider.history_start, provider.history_end = END - datetime.timedelta(days=30), END
+    began = time.monotonic()
+    fetched, errors = fetch_all(provider, ["FLAKY", "GONE", "DOWN", "OK"], backoff=0.02, retries=3)
+    assert srv.hits == {"FLAKY": 4, "GONE": 1, "DOWN": 4, "OK": 1}
+    assert fetched["FLAKY"] is not None and fetched["OK"] is not None
+    assert fetched["GONE"] is None and "404" in errors["GONE"]
+    assert fetched["DOWN"] is None and "503" in errors["DOWN"]
+    # Three backoffs of at least 0.5 x 0.02 x (1, 2, 4) seconds
+    assert time.monotonic() - began >= 0.5 * 0.02 * 7
+
+
+def test_one_bucket_is_shared_across_calls_and_sessions(server):
+    srv = server()
+    sessions = [_provider(srv.url, per_minute=600, burst=1) for _ in range(2)]
+    threads = [threading.Thread(target=p.load_window, args=([f"{i}{s}" for s in "ABC"], END))
+               for i, p in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sessions[0].load_series("SYNC", END - datetime.timedelta(days=30), END)
+    assert len(srv.starts) == 7
+    assert min(_gaps(srv.starts)) > 0.1 * 0.8
+
+    # A different API key has its own limit.
+    other = _provider(srv.url, per_minute=600, burst=1)
+    other.api_key = "other"
+    began = time.monotonic()
+    other.load_window(["X"], END)
+    assert time.monotonic() - began < 0.1
+
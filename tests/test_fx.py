@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from portfolio_core.fx import FxRates, apply_rates, conversion_rates, convert_matrix, load_rates
+from portfolio_core.providers import PriceSeries
+
+DATES = np.array(["2025-06-24", "2025-06-26", "2025-06-27"], dtype="datetime64[D]")
+
+
+def _rates():
+    # Units per USD
+    return FxRates({"KES": PriceSeries("KES", DATES, [130.0, 129.0, 128.0]),
+                    "EUR": PriceSeries("EUR", DATES[1:], [0.9, 0.8])})
+
+
+def test_cross_rates_go_through_the_pivot():
+    fx = _rates()
+    query = np.array(["2025-06-23", "2025-06-25", "2025-06-26", "2025-06-27"], dtype="datetime64[D]")
+    np.testing.assert_allclose(fx.rates_at("KES", "USD", query), [np.nan, 1 / 130, 1 / 129, 1 / 128])
+    np.testing.assert_allclose(fx.rates_at("USD", "KES", query), [np.nan, 130, 129, 128])
+    # EUR -> KES on the union of both calendars, NaN before EUR's first quote
+    np.testing.assert_allclose(fx.rates_at("EUR", "KES", query), [np.nan, np.nan, 129 / 0.9, 128 / 0.8])
+    np.testing.assert_array_equal(fx.rates_at("EUR", "EUR", query), np.ones(4))
+    assert fx.pair("EUR", "KES") is fx.pair("EUR", "KES")
+
+
+def test_rate_file_is_read_per_currency(tmp_path):
+    path = tmp_path / "fx.csv"
+    path.write_text("date,kes,EUR\n2025-06-27,128,0.8\n2025-06-26,129,\n")
+    fx = load_rates(str(path))
+    assert fx.currencies == ["EUR", "KES", "USD"]
+    np.testing.assert_allclose(fx.rates_at("KES", "EUR", DATES[1:]), [np.nan, 0.8 / 128])
+    with pytest.raises(KeyError, match="No FX rates for GBP"):
+        fx.rates_at("GBP", "USD", DATES)
+
+
+def test_missing_currencies_are_reported_and_left_out():
+    fx = _rates()
+    labels = ["GBP", "KES", "USD"]
+    codes = np.array([1, 0, 2, 1])
+    start_rates, end_rates, missing = conversion_rates(fx, codes, labels, "USD", DATES[:1], DATES[-1])
+    assert missing == ["GBP"]
+    np.testing.assert_allclose(start_rates[:, 0], [1 / 130, np.nan, 1, 1 / 130])
+    np.testing.assert_allclose(end_rates[:, 0], [1 / 128, np.nan, 1, 1 / 128])
+    initial, final = apply_rates(np.full((4, 1), 1300.0), np.full((4, 1), 1280.0), start_rates, end_rates)
+    np.testing.assert_allclose(initial[:, 0], [10, 0, 1300, 10])
+    np.testing.assert_allclose(final[:, 0], [10, 0, 1280, 10])
+
+
+def test_convert_matrix_uses_each_days_rate():
+    closes = np.array([[130.0, 1.0, 5.0], [258.0, 2.0, 5.0], [128.0, 3.0, 5.0]])
+    out, missing = convert_matrix(_rates(), closes, np.array([1, 2, 0]), ["GBP", "KES", "USD"], "USD", DATES)
+    assert missing == ["GBP"]
+    np.testing.assert_allclose(out[:, 0], [1, 2, 1])
+    np.testing.assert_allclose(out[:, 1], [1, 2, 3])
+    assert np.isnan(out[:, 2]).all()
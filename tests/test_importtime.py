@@ -0,0 +1,14 @@
+import pkgutil
+
+import pytest
+
+import portfolio_core
+from portfolio_core.importtime import check
+
+MODULES = ["portfolio_core"] + [f"portfolio_core.{m.name}" for m in pkgutil.iter_modules(portfolio_core.__path__)]
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_stays_within_budget(module):
+    total_us, problems = check(module)
+    assert not problems, "; ".join(problems)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_core.indicators import INDICATOR_COLUMNS, latest_indicators, percent_b, rsi
+
+
+def _closes(days=120, assets=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, assets)), axis=0))
+
+
+def test_rsi_matches_wilder_smoothing_per_column():
+    closes = _closes()
+    for j in range(closes.shape[1]):
+        change = pd.Series(closes[:, j]).diff()
+        gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        np.testing.assert_allclose(rsi(closes)[:, j], 100 - 100 / (1 + gain / loss), rtol=1e-12)
+
+
+def test_percent_b_is_position_in_the_bands():
+    closes = _closes()
+    window = pd.Series(closes[-20:, 0])
+    mean, sd = window.mean(), window.std(ddof=0)
+    assert percent_b(closes)[-1, 0] == pytest.approx((closes[-1, 0] - (mean - 2 * sd)) / (4 * sd))
+
+
+@pytest.mark.parametrize("closes", [np.empty((0, 3)), np.full((5, 3), np.nan)])
+def test_latest_indicators_without_usable_rows_are_nan(closes):
+    values = latest_indicators(closes)
+    for column in INDICATOR_COLUMNS:
+        assert values[column].shape == (3,) and np.isnan(values[column]).all()
+    assert values["Technical Signal"] == ["N/A"] * 3
@@ -0,0 +1,98 @@
+import datetime
+import json
+import os
+
+import numpy as np
+
+from portfolio_core import ingest
+from portfolio_core.ingest import MANIFEST, IncrementalPriceStore
+from portfolio_core.providers import PriceProvider, PriceSeries
+
+END = datetime.date(2025, 6, 27)
+
+
+class Upstream(PriceProvider):
+    """Linear daily prices for any symbol; records what was asked for."""
+
+    name = "stub"
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def load_series(self, symbol, start_date, end_date):
+        self.requests.append((symbol, start_date, end_date))
+        dates = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        return PriceSeries(symbol, dates, (dates - np.datetime64("2000-01-01")).astype("float64"))
+
+
+def _other_process(monkeypatch, root):
+    """A store on ``root`` that shares no in-memory state with earlier ones."""
+    monkeypatch.setattr(ingest, "_states", {})
+    return IncrementalPriceStore(str(root), Upstream())
+
+
+def test_only_missing_bars_are_fetched(tmp_path):
+    store = IncrementalPriceStore(str(tmp_path), Upstream())
+    first = store.load_window(["AAA"], END - datetime.timedelta(days=30), months=12)["AAA"]
+    second = store.load_window(["AAA"], END, months=12)["AAA"]
+    # Whole months back from the last stored bar, not the 12-month window
+    assert store.upstream.requests[1][1] == datetime.date(2025, 4, 27)
+    assert second.dates[-1] == np.datetime64(END) and np.all(np.diff(second.dates) > np.timedelta64(0))
+    np.testing.assert_array_equal(second.closes[:len(first) - 30], first.closes[30:])
+    store.load_window(["AAA"], END, months=12)
+    assert len(store.upstream.requests) == 2
+
+
+def test_another_process_top_up_is_picked_up(tmp_path, monkeypatch):
+    app = IncrementalPriceStore(str(tmp_path), Upstream())
+    app.load_window(["AAA"], END - datetime.timedelta(days=30), months=12)
+
+    top_up = _other_process(monkeypatch, tmp_path)
+    top_up.update(["AAA"], END, months=12)
+    assert len(top_up.upstream.requests) == 1
+
+    # The app sees the new bars instead of fetching them again.
+    series = app.load_window(["AAA"], END, months=12)["AAA"]
+    assert len(app.upstream.requests) == 1 and series.dates[-1] == np.datetime64(END)
+
+
+def test_stale_copies_do_not_clobber_each_other(tmp_path, monkeypatch):
+    app = IncrementalPriceStore(str(tmp_path), Upstream())
+    app.load_window(["AAA", "BBB"], END - datetime.timedelta(days=30), months=12)
+    app.manifest  # read once, then left alone while the other process writes
+    top_up = _other_process(monkeypatch, tmp_path)
+    top_up.update(["AAA"], END, months=12)
+    app.update(["BBB"], END, months=12)
+
+    with open(os.path.join(tmp_path, MANIFEST)) as f:
+        manifest = json.load(f)
+    assert manifest["AAA"]["checked"] == manifest["BBB"]["checked"] == END.isoformat()
+    for symbol, entry in manifest.items():
+        assert len(set(entry["chunks"])) == len(entry["chunks"]) == 2
+        assert sum(len(np.load(tmp_path / symbol / name)) for name in entry["chunks"]) == entry["rows"]
+    fresh = _other_process(monkeypatch, tmp_path)
+    assert fresh.read_series("AAA").dates[-1] == np.datetime64(END)
+
+
+def test_compaction_by_another_process_is_followed(tmp_path, monkeypatch):
+    app = IncrementalPriceStore(str(tmp_path), Upstream())
+    app.load_window(["AAA"], END - datetime.timedelta(days=30), months=12)
+    app.load_window(["AAA"], END, months=12)
+    before = app.read_series("AAA")
+    app._state.series.clear()
+
+    assert _other_process(monkeypatch, tmp_path).compact("AAA")
+    after = app.read_series("AAA")
+    np.testing.assert_array_equal(after.closes, before.closes)
+    assert app.manifest["AAA"]["chunks"] == ["000002.npy"]
+
+
+def test_a_lock_left_by_a_crashed_process_is_broken(tmp_path):
+    lock = tmp_path / (MANIFEST + ".lock")
+    lock.write_text("")
+    old = lock.stat().st_mtime - 2 * ingest.LOCK_STALE_SECONDS
+    os.utime(lock, (old, old))
+    store = IncrementalPriceStore(str(tmp_path), Upstream())
+    store.update(["AAA"], END, months=1)
+    assert not lock.exists() and "AAA" in store.manifest
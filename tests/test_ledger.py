@@ -0,0 +1,149 @@
+import datetime
+import io
+
+import numpy as np
+import pytest
+
+from portfolio_core.fx import FxRates
+from portfolio_core.ledger import import_ledger, irr_period_returns
+from portfolio_core.providers import PriceSeries
+
+END = datetime.date(2025, 6, 27)
+
+LEDGER = """date,symbol,type,quantity,price,fees
+2021-01-04,AAA,buy,100,10,1
+2022-01-03,AAA,buy,50,20,1
+2023-01-03,AAA,sell,120,30,1
+2023-06-01,AAA,split,2,,
+2024-01-02,AAA,dividend,60,0.5,
+2024-07-01,BBB,buy,10,100,0
+2025-01-02,BBB,sell,10,110,0
+"""
+
+
+def _book(text, chunk_rows=100_000):
+    return import_ledger(io.StringIO(text), END, chunk_rows=chunk_rows)
+
+
+def _bisect(v0, v1, flows, u):
+    """Period growth G solving v0 G + sum(c G^u) = v1, by plain bisection."""
+    def f(g):
+        return v0 * g + sum(c * g ** k for c, k in zip(flows, u)) - v1
+    lo, hi = 1e-6, 1e4
+    for _ in range(200):
+        mid = (lo * hi) ** 0.5
+        if (f(mid) > 0) == (f(hi) > 0):
+            hi = mid
+        else:
+            lo = mid
+    return mid - 1
+
+
+def test_irr_matches_hand_built_cash_flows():
+    # 100 invested at the start, 100 more half-way, 220 at the end.
+    r = irr_period_returns(np.array([100.0]), np.array([220.0]), np.array([0]), np.array([100.0]),
+                           np.array([0.5]), 1.0)[0]
+    g = 1 + r
+    assert 100 * g + 100 * g ** 0.5 == pytest.approx(220)
+    assert r == pytest.approx(_bisect(100, 220, [100], [0.5]), rel=1e-9)
+    # No flows: the plain period return
+    assert irr_period_returns(np.array([100.0]), np.array([110.0]), np.array([], dtype=int), np.array([]),
+                              np.array([]), 1.0)[0] == pytest.approx(0.1)
+
+
+def test_irr_solves_many_positions_at_once():
+    rng = np.random.default_rng(0)
+    n = 50
+    v0 = rng.uniform(0, 1000, n)
+    ids = np.repeat(np.arange(n), 3)
+    flows = rng.uniform(10, 500, 3 * n)
+    tau = rng.uniform(0, 2, 3 * n)
+    v1 = (v0 + np.bincount(ids, flows, minlength=n)) * rng.uniform(0.5, 2.0, n)
+    got = irr_period_returns(v0, v1, ids, flows, tau, 2.0)
+    for i in range(n):
+        rows = ids == i
+        assert got[i] == pytest.approx(_bisect(v0[i], v1[i], flows[rows], tau[rows] / 2.0), rel=1e-8, abs=1e-10)
+
+
+def test_irr_is_nan_without_investment():
+    got = irr_period_returns(np.array([0.0, np.nan]), np.array([0.0, 100.0]), np.array([], dtype=int),
+                             np.array([]), np.array([]), 1.0)
+    assert np.isnan(got).all()
+
+
+def test_fifo_lots_split_and_dividend():
+    frame = _book(LEDGER).cost_basis_frame().set_index("Symbol")
+    aaa = frame.loc["AAA"]
+    # Sold 120: all 100 of the first lot (10.01 each) and 20 of the second (20.02 each).
+    assert aaa["Realized Gain"] == pytest.approx(120 * 30 - 1 - (100 * 10.01 + 20 * 20.02))
+    # 30 shares left at 20.02, split 2-for-1
+    assert aaa["Shares Held"] == 60
+    assert aaa["Cost Basis"] == pytest.approx(30 * 20.02)
+    assert aaa["Average Cost"] == pytest.approx(10.01)
+    assert aaa["Dividends"] == pytest.approx(30)
+    assert aaa["Fees"] == pytest.approx(3)
+    assert frame.loc["BBB", "Realized Gain"] == pytest.approx(100)
+
+
+def test_chunk_size_does_not_change_the_book():
+    one = _book(LEDGER, chunk_rows=1).cost_basis_frame()
+    whole = _book(LEDGER).cost_basis_frame()
+    assert one.equals(whole)
+
+
+def test_zero_quantity_buy_is_a_fee():
+    book = _book("date,symbol,type,quantity,price,fees\n"
+                 "2024-01-02,AAA,buy,10,5,1\n2024-02-01,AAA,buy,0,,2.5\n")
+    row = book.cost_basis_frame().iloc[0]
+    assert row["Shares Held"] == 10 and row["Cost Basis"] == pytest.approx(51)
+    assert row["Fees"] == pytest.approx(3.5) and row["Realized Gain"] == pytest.approx(-2.5)
+    assert book.holdings_frame()["current_price"].tolist() == [5]
+
+
+@pytest.mark.parametrize("row, message", [
+    ("2024-02-01,AAA,buy,,5,0", "quantity"),
+    ("2024-02-01,AAA,sell,3,,0", "price"),
+    ("2024-02-01,AAA,dividend,,,", "dividend"),
+    ("2024-02-01,AAA,split,,,", "split ratio"),
+])
+def test_rows_with_missing_values_are_rejected(row, message):
+    text = "date,symbol,type,quantity,price,fees\n" + "2024-01-02,AAA,buy,10,5,1\n" * 3 + row + "\n"
+    with pytest.raises(ValueError, match=f"ledger row 4 .*{message}"):
+        _book(text, chunk_rows=2)
+
+
+def test_overselling_is_rejected():
+    with pytest.raises(ValueError, match="only 10 are held"):
+        _book("date,symbol,type,quantity,price\n2024-01-02,AAA,buy,10,5\n2024-02-01,AAA,sell,11,6\n")
+
+
+def test_money_weighted_return_over_the_time_held():
+    book = _book(LEDGER)
+    dates = np.arange(np.datetime64("2020-01-01"), np.datetime64("2025-06-28"))
+    prices = {"AAA": PriceSeries("AAA", dates, np.full(len(dates), 30.0)),
+              "BBB": PriceSeries("BBB", dates, np.full(len(dates), 105.0))}
+    periods = {"12m": lambda end: end - datetime.timedelta(days=365),
+               "6m": lambda end: datetime.date(2024, 12, 27)}
+    frame, _ = book.money_weighted_returns(prices, periods, END)
+    frame = frame.set_index("Symbol")
+    # Bought at 100 and sold at 110 inside the period: 10% over the time held.
+    assert frame.loc["BBB", "12m"] == pytest.approx(10)
+    # Held at 105 at the period start, sold at 110 six days later.
+    assert frame.loc["BBB", "6m"] == pytest.approx((110 / 105 - 1) * 100)
+    # Flat price and no flows in the last year (the dividend is older)
+    assert frame.loc["AAA", "12m"] == pytest.approx(0, abs=1e-9)
+
+
+def test_positions_without_fx_rates_are_left_out_of_the_portfolio():
+    book = _book("date,symbol,type,quantity,price,currency\n"
+                 "2024-01-02,AAA,buy,10,100,usd\n2024-01-02,EEE,buy,10,50,EUR\n")
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2025-06-28"))
+    prices = {"AAA": PriceSeries("AAA", dates, np.linspace(100, 200, len(dates))),
+              "EEE": PriceSeries("EEE", dates, np.linspace(50, 10, len(dates)))}
+    periods = {"12m": lambda end: end - datetime.timedelta(days=365)}
+    frame, portfolio = book.money_weighted_returns(prices, periods, END, FxRates.constant({"KES": 129.0}), "USD")
+    frame = frame.set_index("Symbol")
+    assert book.missing_currencies == ["EUR"]
+    # EEE keeps its own-currency return; the portfolio is AAA alone.
+    assert frame.loc["EEE", "12m"] < 0
+    assert portfolio["12m"] == pytest.approx(frame.loc["AAA", "12m"])
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from portfolio_core.projection import estimate_parameters, portfolio_moments, project
+
+
+def _prices(days=800, assets=3, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2022-01-03"), np.datetime64("2022-01-03") + 2 * days)
+    dates = dates[np.is_busday(dates)][:days]
+    closes = 50 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, (days, assets)), axis=0))
+    return dates, closes
+
+
+def test_monthly_parameters_from_month_end_closes():
+    dates, closes = _prices()
+    mean, cov, months = estimate_parameters(dates, closes)
+    month = dates.astype("datetime64[M]")
+    month_end = [np.flatnonzero(month == m)[-1] for m in np.unique(month)]
+    returns = np.diff(np.log(closes[month_end]), axis=0)
+    assert months == len(returns)
+    np.testing.assert_allclose(mean, returns.mean(axis=0))
+    np.testing.assert_allclose(cov, np.cov(returns, rowvar=False))
+
+
+@pytest.mark.parametrize("days, assets", [(0, 3), (40, 3), (800, 0)])
+def test_too_little_history_raises_value_error(days, assets):
+    dates, closes = _prices(days=max(days, 1), assets=assets)
+    with pytest.raises(ValueError):
+        estimate_parameters(dates[:days], closes[:days])
+
+
+def test_rebalanced_moments_match_simulated_gross_returns():
+    mean, cov = np.array([0.01, 0.005]), np.array([[0.004, 0.001], [0.001, 0.002]])
+    w = np.array([0.6, 0.4])
+    draws = np.exp(np.random.default_rng(0).multivariate_normal(mean, cov, 400_000)) @ w
+    log_mean, log_variance = portfolio_moments(mean, cov, w)
+    assert np.exp(log_mean + log_variance / 2) == pytest.approx(draws.mean(), rel=1e-3)
+    assert np.expm1(log_variance) * np.exp(2 * log_mean + log_variance) == pytest.approx(draws.var(), rel=2e-2)
+
+
+def test_a_seed_is_bit_identical_for_any_memory_budget():
+    mean, cov, _ = estimate_parameters(*_prices())
+    w = np.full(3, 1 / 3)
+    runs = [project(mean, cov, w, paths=1500, years=12, seed=7, rebalance=False, memory_budget=budget)
+            for budget in (16 << 10, 1 << 20, 64 << 20)]
+    for run in runs[1:]:
+        np.testing.assert_array_equal(run.values, runs[0].values)
+        np.testing.assert_array_equal(run.drawdowns, runs[0].drawdowns)
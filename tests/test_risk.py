@@ -0,0 +1,100 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from portfolio_core.analytics import TRADING_DAYS
+from portfolio_core.risk import RiskModel, log_returns
+
+
+def _prices(days=300, assets=5, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2023-01-02"), np.datetime64("2023-01-02") + days)
+    mixing = rng.normal(0, 0.01, (assets, assets))
+    closes = 100 * np.exp(np.cumsum(rng.standard_normal((days, assets)) @ mixing, axis=0))
+    return dates, closes
+
+
+def _ewma_covariance(returns, decay):
+    """Weighted mean and covariance written out directly."""
+    weights = decay ** np.arange(len(returns) - 1, -1, -1)
+    mean = weights @ returns / weights.sum()
+    centered = returns - mean
+    return (centered * weights[:, None]).T @ centered / weights.sum()
+
+
+def test_sample_covariance_matches_np_cov():
+    dates, closes = _prices()
+    model = RiskModel.from_prices(dates, closes, list("ABCDE"), decay=1.0)
+    np.testing.assert_allclose(model.covariance, np.cov(log_returns(closes), rowvar=False), rtol=1e-9)
+    np.testing.assert_allclose(model.correlation, np.corrcoef(log_returns(closes), rowvar=False), rtol=1e-9)
+
+
+def test_ewma_covariance_matches_direct_weights():
+    dates, closes = _prices()
+    model = RiskModel.from_prices(dates, closes, list("ABCDE"))
+    np.testing.assert_allclose(model.covariance, _ewma_covariance(log_returns(closes), 0.94), rtol=1e-9)
+
+
+@pytest.mark.parametrize("decay", [1.0, 0.94])
+def test_rank_one_updates_match_a_batch_build(decay):
+    dates, closes = _prices()
+    batch = RiskModel.from_prices(dates, closes, list("ABCDE"), decay)
+    model = RiskModel.from_prices(dates[:100], closes[:100], list("ABCDE"), decay)
+    for t in range(100, len(dates)):
+        model.update_prices(dates[t], closes[t])
+    np.testing.assert_allclose(model.covariance, batch.covariance, rtol=1e-9)
+    np.testing.assert_array_equal(model.dates, batch.dates)
+
+
+@pytest.mark.parametrize("decay", [1.0, 0.94])
+def test_sync_adds_removes_and_extends_like_a_fresh_build(decay):
+    dates, closes = _prices(assets=6)
+    symbols = list("ABCDEF")
+    model = RiskModel.from_prices(dates[:200], closes[:200, :4], symbols[:4], decay)
+    # Drop B, add E and F, reorder, and append 100 days.
+    held = ["D", "A", "F", "C", "E"]
+    columns = [symbols.index(s) for s in held]
+    assert model.sync(dates, closes[:, columns], held)
+    fresh = RiskModel.from_prices(dates, closes[:, columns], held, decay)
+    assert model.symbols == held
+    np.testing.assert_allclose(model.covariance, fresh.covariance, rtol=1e-9)
+    np.testing.assert_allclose(model.mean, fresh.mean, rtol=1e-9)
+    if decay == 1.0:
+        np.testing.assert_allclose(model.covariance, np.cov(log_returns(closes[:, columns]), rowvar=False),
+                                   rtol=1e-9)
+
+
+def test_sync_rebuilds_when_histories_do_not_line_up():
+    dates, closes = _prices()
+    model = RiskModel.from_prices(dates[:100], closes[:100], list("ABCDE"))
+    shifted = dates + np.timedelta64(1000, "D")
+    assert not model.sync(shifted, closes, list("ABCDE"))
+    np.testing.assert_allclose(model.covariance, RiskModel.from_prices(shifted, closes, list("ABCDE")).covariance)
+
+
+def test_risk_contributions_add_up_to_volatility():
+    dates, closes = _prices()
+    model = RiskModel.from_prices(dates, closes, list("ABCDE"))
+    w = np.array([0.3, 0.25, 0.2, 0.15, 0.1])
+    marginal, contribution, beta = model.risk_contributions(w)
+    volatility = model.portfolio_volatility(w)
+    assert volatility == pytest.approx(np.sqrt(w @ model.covariance @ w * TRADING_DAYS))
+    assert contribution.sum() == pytest.approx(volatility)
+    assert w @ beta == pytest.approx(1)
+    # Marginal risk is the gradient of the volatility
+    eps = 1e-7
+    for i in range(len(w)):
+        bumped = w.copy()
+        bumped[i] += eps
+        assert marginal[i] == pytest.approx((model.portfolio_volatility(bumped) - volatility) / eps, rel=1e-4)
+
+
+def test_value_at_risk():
+    dates, closes = _prices()
+    model = RiskModel.from_prices(dates, closes, list("ABCDE"), decay=1.0)
+    w = np.full(5, 0.2)
+    parametric, historical = model.value_at_risk(w, 0.99)
+    mean, sd = w @ model.mean, np.sqrt(w @ model.covariance @ w)
+    assert parametric == pytest.approx(NormalDist().inv_cdf(0.99) * sd - mean)
+    assert historical == pytest.approx(-np.quantile(np.expm1(log_returns(closes)) @ w, 0.01))
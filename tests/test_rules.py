@@ -0,0 +1,94 @@
+import json
+import math
+import operator
+
+import numpy as np
+import pytest
+
+from portfolio_core.periods import PERFORMANCE_PERIODS
+from portfolio_core.rules import DEFAULT_RULES, RuleError, RuleSet
+
+PERIODS = list(PERFORMANCE_PERIODS)
+_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+
+
+def _load_spec():
+    with open(DEFAULT_RULES) as f:
+        return json.load(f)
+
+
+def _matches(when, row, aliases):
+    """Evaluate one rule condition for one row of returns."""
+    for clause in [c for c in when.split(" and ") if c.strip()]:
+        parts = clause.split()
+        value = row[PERIODS.index(aliases.get(parts[0], parts[0]))]
+        if parts[1] == "available":
+            ok = not math.isnan(value)
+        else:
+            ok = not math.isnan(value) and _OPS[parts[1]](value, float(parts[2]))
+        if not ok:
+            return False
+    return True
+
+
+def _reference(section, row, aliases):
+    fired = []
+    for group in section.get("groups", []):
+        for rule in group:
+            if _matches(rule.get("when", ""), row, aliases):
+                fired.append(rule)
+                break
+    return fired or [section["fallback"]]
+
+
+def _returns(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Integers hit the thresholds exactly; NaN marks missing periods.
+    returns = rng.integers(-40, 40, (rows, len(PERIODS))).astype("float64")
+    returns[rng.random(returns.shape) < 0.15] = np.nan
+    return returns
+
+
+def test_compiled_holding_rules_match_row_by_row_evaluation():
+    spec = _load_spec()
+    returns = _returns()
+    codes, texts = RuleSet(spec, PERIODS).classify(returns)
+    for row, code, text in zip(returns.tolist(), codes, texts):
+        fired = _reference(spec["holding"], row, spec.get("periods", {}))
+        assert code == "+".join(r["code"] for r in fired)
+        assert text == " ".join(r["text"] for r in fired)
+
+
+def test_compiled_portfolio_rules_match_row_by_row_evaluation():
+    spec = _load_spec()
+    returns = _returns(500, seed=1)
+    levels, codes, _ = RuleSet(spec, PERIODS).classify_portfolios(returns)
+    for row, level, code in zip(returns.tolist(), levels, codes):
+        fired = _reference(spec["portfolio"], row, spec.get("periods", {}))
+        assert code == "+".join(r["code"] for r in fired)
+        assert level == (fired[0].get("level") or "info")
+
+
+def test_multi_clause_and_available_conditions():
+    spec = {
+        "periods": {"3m": PERIODS[0], "12m": PERIODS[3]},
+        "holding": {
+            "groups": [[{"code": "BOTH", "when": "3m > 10 and 12m < 0", "text": "both"},
+                        {"code": "HAS_12M", "when": "12m available", "text": "has"}]],
+            "fallback": {"code": "NONE", "text": "none"},
+        },
+        "portfolio": {"fallback": {"code": "P", "text": "p"}},
+    }
+    returns = np.full((3, len(PERIODS)), np.nan)
+    returns[0, [0, 3]] = 11, -1
+    returns[1, [0, 3]] = 10, -1
+    codes, _ = RuleSet(spec, PERIODS).classify(returns)
+    assert codes.tolist() == ["BOTH", "HAS_12M", "NONE"]
+
+
+@pytest.mark.parametrize("when", ["12m >> 5", "12m > high", "soon > 5"])
+def test_bad_conditions_raise_rule_error(when):
+    spec = _load_spec()
+    spec["holding"]["groups"][0][0]["when"] = when
+    with pytest.raises(RuleError):
+        RuleSet(spec, PERIODS)
@@ -0,0 +1,104 @@
+import datetime
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from portfolio_core.providers import PriceProvider, PriceSeries
+from portfolio_core.shared_cache import SharedCache, SharedCacheProvider, series_cache
+
+END = datetime.date(2025, 6, 27)
+
+
+class Upstream(PriceProvider):
+    name = "stub"
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.loads = []
+
+    def load_series(self, symbol, start_date, end_date):
+        self.loads.append((symbol, start_date))
+        if symbol in self.failing:
+            raise OSError("timed out")
+        dates = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        return PriceSeries(symbol, dates, np.linspace(1, 2, len(dates)))
+
+
+def test_concurrent_misses_share_one_load():
+    cache = SharedCache()
+    calls, release = [], threading.Event()
+
+    def load(keys):
+        calls.append(list(keys))
+        release.wait(5)
+        return {key: f"value of {key}" for key in keys}, {}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_many(["k"], load))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    while cache.misses + cache.waits < 10:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [["k"]]
+    assert (cache.misses, cache.waits) == (1, 9)
+    assert results == [({"k": "value of k"}, {})] * 10
+
+
+def test_failed_loads_reach_waiters_but_are_not_cached():
+    cache = SharedCache()
+    values, errors = cache.get_many(["a", "b"], lambda keys: ({k: None for k in keys}, {"b": "boom"}))
+    assert errors == {"b": "boom"} and len(cache) == 1
+    values, errors = cache.get_many(["a", "b"], lambda keys: ({k: keys for k in keys}, {}))
+    assert values == {"a": None, "b": ["b"]} and errors == {}
+
+
+def test_a_raising_load_is_retried_by_the_next_caller():
+    cache = SharedCache()
+
+    def broken(keys):
+        raise OSError("down")
+    with pytest.raises(OSError):
+        cache.get_many(["k"], broken)
+    assert cache.get_many(["k"], lambda keys: ({"k": 1}, {})) == ({"k": 1}, {})
+
+
+def test_entries_expire_and_are_evicted_least_recently_used_first():
+    now = [0.0]
+    cache = SharedCache(ttl=10, max_bytes=10, sizeof=len, clock=lambda: now[0])
+    load = lambda keys: ({k: "x" * 4 for k in keys}, {})  # noqa: E731
+    cache.get_many(["a", "b"], load)
+    cache.get_many(["a"], load)
+    cache.get_many(["c"], load)
+    assert set(cache._entries) == {"a", "c"} and cache.evictions == 1 and cache.nbytes == 8
+    # Too big to keep at all
+    cache.get_many(["huge"], lambda keys: ({"huge": "x" * 11}, {}))
+    assert "huge" not in cache._entries
+    # Both entries are past their ttl; the reloaded one is fresh again.
+    now[0] = 11
+    cache.get_many(["a"], load)
+    cache.get_many(["a", "c"], load)
+    assert (cache.hits, cache.misses) == (2, 6)
+
+
+def test_sessions_share_series_and_shorter_windows_are_views():
+    cache = series_cache()
+    upstream = Upstream(failing={"BAD"})
+    sessions = [SharedCacheProvider(upstream, cache) for _ in range(3)]
+    first = sessions[0].load_window(["AAA", "BAD"], END, months=24)
+    assert sessions[0].errors == {"BAD": "timed out"} and first["BAD"] is None
+    for session in sessions[1:]:
+        window = session.load_window(["AAA"], END, months=12)
+        assert window["AAA"].dates[0] <= np.datetime64(END - datetime.timedelta(days=365))
+    assert [symbol for symbol, _ in upstream.loads] == ["AAA", "BAD"]
+    assert np.shares_memory(window["AAA"].closes, first["AAA"].closes)
+    with pytest.raises(ValueError):
+        window["AAA"].closes[0] = 0
+    # A longer window than cached is loaded again; the failed symbol is retried.
+    sessions[2].load_window(["AAA", "BAD"], END, months=36)
+    assert [symbol for symbol, _ in upstream.loads] == ["AAA", "BAD", "AAA", "BAD"]